@@ -0,0 +1,196 @@
+''' Database engines and locks shared by the weather and CO2 cache stores,
+so that the stores can be used from several threads and processes at once.
+'''
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# seconds a SQLite connection waits for another writer to finish before
+# raising "database is locked".
+SQLITE_BUSY_TIMEOUT = 60
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# locks serializing fetches of each key within a process, along with the
+# number of threads holding or waiting on them; a lock is dropped once no
+# thread uses it.
+_key_locks = {}  # lock file name -> [lock, n users]
+_key_locks_lock = threading.Lock()
+
+
+def get_lock_directory():
+    ''' Directory in which fetch lock files are kept. Set with the
+    EEMETER_CACHE_LOCK_DIRECTORY environment variable; defaults to
+    :code:`~/.eemeter/cache/locks`.
+    '''
+    directory = os.environ.get("EEMETER_CACHE_LOCK_DIRECTORY")
+    if directory is None:
+        directory = os.path.join(
+            os.path.expanduser('~'), '.eemeter', 'cache', 'locks')
+    return directory
+
+
+def _configure_sqlite(engine, busy_timeout):
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # let SQLAlchemy, rather than the sqlite3 module, issue BEGIN (see
+        # below); statements outside transactions are committed on their
+        # own.
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA busy_timeout = {}".format(
+            int(busy_timeout * 1000)))
+        # readers don't block the writer (or each other) in WAL mode.
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        # take the write lock up front, so that transactions which read
+        # before writing wait for each other instead of failing.
+        connection.connection.execute("BEGIN IMMEDIATE")
+
+
+def get_engine(url, busy_timeout=SQLITE_BUSY_TIMEOUT):
+    ''' Get the SQLAlchemy engine (and so the connection pool) shared by all
+    stores in this process which use a database URL.
+
+    SQLite databases are used in WAL journal mode, transactions take the
+    write lock when they begin, and connections wait up to
+    :code:`busy_timeout` seconds for other writers.
+
+    Parameters
+    ----------
+    url : str
+        SQLAlchemy compatible database URL.
+    busy_timeout : float, default 60
+        Seconds a SQLite connection waits on a locked database. Only used
+        when the engine is created.
+
+    Returns
+    -------
+    engine : sqlalchemy.engine.Engine
+    '''
+    # engines are not shared with forked processes, which would otherwise
+    # inherit pooled connections.
+    key = (os.getpid(), url)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            if url.startswith("sqlite"):
+                engine = create_engine(url, connect_args={
+                    "timeout": busy_timeout,
+                    "check_same_thread": False,
+                })
+                _configure_sqlite(engine, busy_timeout)
+            else:
+                engine = create_engine(url)
+            _engines[key] = engine
+        return engine
+
+
+def upsert(engine, table, where, values, retries=3):
+    ''' Atomically update the row of :code:`table` matching :code:`where`,
+    or insert it if there isn't one.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        Engine to use.
+    table : sqlalchemy.Table
+        Table to write to.
+    where : sqlalchemy.sql.ClauseElement
+        Condition matching the row to update.
+    values : dict
+        Column values of the row.
+    retries : int, default 3
+        Number of times to retry if a concurrent insert of the same row
+        violates a unique constraint.
+    '''
+    for attempt in range(retries + 1):
+        try:
+            with engine.begin() as conn:
+                result = conn.execute(
+                    table.update().where(where).values(**values))
+                if result.rowcount == 0:
+                    conn.execute(table.insert().values(**values))
+            return
+        except IntegrityError:
+            # another connection inserted the row first; update it instead.
+            if attempt == retries:
+                raise
+
+
+@contextmanager
+def key_lock(url, key):
+    ''' Hold an exclusive lock on a cache key, across the threads and
+    processes of this host, e.g., while fetching the data for the key so
+    that it is only fetched once. Callers which waited on the lock should
+    check the cache again once they hold it.
+
+    Locks are lock files in the directory given by
+    :code:`get_lock_directory`. If lock files can't be used, the lock only
+    holds within this process.
+
+    Parameters
+    ----------
+    url : str
+        Database URL of the cache.
+    key : str
+        Cache key.
+    '''
+    name = hashlib.sha1(
+        "{}\n{}".format(url, key).encode('utf-8')).hexdigest()
+    with _key_locks_lock:
+        thread_lock = _key_locks.get(name)
+        if thread_lock is None:
+            thread_lock = _key_locks[name] = [threading.Lock(), 0]
+        thread_lock[1] += 1
+
+    try:
+        with thread_lock[0]:
+            f = _open_lock_file(name)
+            try:
+                if f is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                yield
+            finally:
+                if f is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    f.close()
+    finally:
+        with _key_locks_lock:
+            thread_lock[1] -= 1
+            if thread_lock[1] == 0:
+                del _key_locks[name]
+
+
+def _open_lock_file(name):
+    if fcntl is None:
+        return None
+    directory = get_lock_directory()
+    try:
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+        return open(os.path.join(directory, name + ".lock"), 'a')
+    except (OSError, IOError) as e:
+        logger.warn(
+            "Could not create lock file in {}: {}".format(directory, e))
+        return None
@@ -5,6 +5,7 @@ import errno
 import json
 import logging
 import os
+import sys
 
 import click
 import pytz
@@ -19,6 +20,12 @@ from eemeter.processors.dispatchers import (
     get_approximate_frequency,
 )
 from eemeter.modeling.models.caltrack import CaltrackMonthlyModel
+from eemeter.weather.cache import get_weather_cache_store
+from eemeter.weather.importer import import_weather_files
+from eemeter.weather.warm import (
+    plan_weather_cache_warmup,
+    warm_weather_cache,
+)
 
 
 logging.basicConfig()
@@ -69,6 +76,12 @@ def cli():
        the pre- and post-intervention usage time series. To ignore this
        requirement, pass the option "--ignore-data-sufficiency".
 
+       Weather data is fetched and cached as needed during analysis. To
+       fill the weather cache ahead of time, use:
+
+       \b
+           eemeter weather warm /path/to/input/data/projects.csv
+
     '''
 
 
@@ -430,3 +443,206 @@ def analyze(inputs_path, ignore_data_sufficiency, full_output, output_dir):
     options = {'ignore_data_sufficiency': ignore_data_sufficiency,
                'full_output': full_output, 'output_dir': output_dir}
     _analyze(inputs_path, options=options)
+
+
+@cli.group()
+def weather():
+    ''' Manage the weather data cache.
+    '''
+
+
+def _warm_targets(targets, start_year, end_year):
+    current_year = datetime.datetime.now().year
+    if end_year is None:
+        default_end_year = current_year
+    else:
+        default_end_year = end_year
+    if start_year is None:
+        default_start_year = default_end_year - 1
+    else:
+        default_start_year = start_year
+
+    result = []
+    for target in targets:
+        if os.path.isfile(target):
+            for project in read_csv(target):
+                project_start = flexible_date_reader(project['project_start'])
+                project_end = flexible_date_reader(project['project_end'])
+                # a year of baseline data and a year of reporting data.
+                result.append((
+                    project['zipcode'],
+                    project_start.year - 1 if start_year is None
+                    else start_year,
+                    min(project_end.year + 1, current_year)
+                    if end_year is None else end_year,
+                ))
+        else:
+            result.append((target, default_start_year, default_end_year))
+    return result
+
+
+def _format_item(item):
+    return " ".join(str(i) for i in item)
+
+
+@weather.command()
+@click.argument('targets', nargs=-1, required=True)
+@click.option('--start-year', type=int, default=None,
+              help='First year of ISD data to fetch. Defaults to a year'
+                   ' before each project start, or to the year before'
+                   ' --end-year.')
+@click.option('--end-year', type=int, default=None,
+              help='Last year of ISD data to fetch. Defaults to a year after'
+                   ' each project end, or to the current year.')
+@click.option('--normals/--no-normals', default=True,
+              help='Also fetch weather normals.')
+@click.option('--cz2010', is_flag=True, default=False,
+              help='Use CZ2010 stations and weather normals.')
+@click.option('--workers', type=int, default=8,
+              help='Number of concurrent fetches.')
+@click.option('--cache-url', default=None,
+              help='Weather cache database URL. Defaults to'
+                   ' EEMETER_WEATHER_CACHE_URL or the local SQLite cache.')
+@click.option('--mirror-directory', default=None,
+              help='Local mirror of weather data files to read instead of'
+                   ' the remote sources. Defaults to'
+                   ' EEMETER_WEATHER_MIRROR_DIRECTORY, if set.')
+def warm(targets, start_year, end_year, normals, cz2010, workers,
+         cache_url, mirror_directory):
+    '''
+       Prefetch weather data into the weather cache.
+
+       \b
+       Example usage:
+           eemeter weather warm 60640 94110
+           eemeter weather warm 725300 --start-year 2010 --end-year 2016
+           eemeter weather warm /path/to/input/data/projects.csv
+
+       TARGETS are ZIP codes, USAF stations or paths to projects.csv files.
+       ZIP codes are mapped to ISD and TMY3 (or CZ2010) stations as in a
+       meter run; all uncached ISD years and weather normals are then
+       fetched concurrently.
+    '''
+    isd_station_years, normal_stations, unresolved = \
+        plan_weather_cache_warmup(
+            _warm_targets(targets, start_year, end_year),
+            normals=normals, use_cz2010=cz2010)
+
+    for target in unresolved:
+        click.echo("Could not find a weather station for {}.".format(target))
+
+    def progress(item, n_done, n_total, error):
+        if error is None:
+            status = "ok"
+        else:
+            status = "failed ({})".format(error)
+        click.echo("[{}/{}] {}: {}".format(
+            n_done, n_total, _format_item(item), status))
+
+    report = warm_weather_cache(isd_station_years, normal_stations,
+                                use_cz2010=cz2010, cache_url=cache_url,
+                                max_workers=workers, progress=progress,
+                                mirror_directory=mirror_directory)
+
+    click.echo(
+        "Fetched {} items ({:.1f} MB); {} already cached; {} failed."
+        .format(len(report["fetched"]),
+                report["bytes_transferred"] / 1e6,
+                len(report["cached"]),
+                len(report["failures"]))
+    )
+    for item, error in report["failures"].items():
+        click.echo("  {}: {}".format(_format_item(item), error))
+
+    if report["failures"] or unresolved:
+        sys.exit(1)
+
+
+@weather.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--workers', type=int, default=None,
+              help='Number of parsing processes. Defaults to the number of'
+                   ' CPUs.')
+@click.option('--batch-size', type=int, default=200,
+              help='Number of station-years written per transaction.')
+@click.option('--hash', 'use_hash', is_flag=True, default=False,
+              help='Detect changed files by hash instead of size and'
+                   ' modification time.')
+@click.option('--force', is_flag=True, default=False,
+              help='Import all files, including unchanged ones.')
+@click.option('--cache-url', default=None,
+              help='Weather cache database URL. Defaults to'
+                   ' EEMETER_WEATHER_CACHE_URL or the local SQLite cache.')
+def import_(directory, workers, batch_size, use_hash, force, cache_url):
+    '''
+       Import raw NOAA weather files into the weather cache.
+
+       \b
+       Example usage:
+           eemeter weather import /path/to/noaa/mirror
+
+       DIRECTORY is searched recursively for ISD (<usaf>-<wban>-<year>.gz)
+       and GSOD (<usaf>-<wban>-<year>.op.gz) files. Files are parsed in
+       parallel; files unchanged since they were last imported are skipped.
+    '''
+    def progress(item, n_done, n_total, error):
+        if error is not None:
+            click.echo("[{}/{}] {}: failed ({})".format(
+                n_done, n_total, _format_item(item), error))
+        elif n_done % 100 == 0 or n_done == n_total:
+            click.echo("[{}/{}] {}: ok".format(
+                n_done, n_total, _format_item(item)))
+
+    report = import_weather_files(directory, cache_url=cache_url,
+                                  max_workers=workers, batch_size=batch_size,
+                                  use_hash=use_hash, force=force,
+                                  progress=progress)
+
+    click.echo(
+        "Imported {} items; {} unchanged; {} failed."
+        .format(len(report["imported"]),
+                len(report["skipped"]),
+                len(report["failures"]))
+    )
+    for item, error in report["failures"].items():
+        if isinstance(item, tuple):
+            item = _format_item(item)
+        click.echo("  {}: {}".format(item, error))
+
+    if report["failures"]:
+        sys.exit(1)
+
+
+@weather.command()
+@click.option('--max-size-mb', type=float, default=None,
+              help='Evict least recently used station-years until cached'
+                   ' data is below this size. Defaults to'
+                   ' EEMETER_WEATHER_CACHE_MAX_SIZE_MB.')
+@click.option('--max-age-days', type=float, default=None,
+              help='Evict station-years not accessed for this many days.'
+                   ' Defaults to EEMETER_WEATHER_CACHE_MAX_AGE_DAYS.')
+@click.option('--cache-url', default=None,
+              help='Weather cache database URL. Defaults to'
+                   ' EEMETER_WEATHER_CACHE_URL or the local SQLite cache.')
+def compact(max_size_mb, max_age_days, cache_url):
+    '''
+       Evict stale weather data and compact the weather cache.
+
+       \b
+       Example usage:
+           eemeter weather compact
+           eemeter weather compact --max-size-mb 500 --max-age-days 90
+
+       Weather normals are never evicted.
+    '''
+    store = get_weather_cache_store(cache_url)
+    max_size = None if max_size_mb is None else int(max_size_mb * 1e6)
+    max_age = None if max_age_days is None \
+        else datetime.timedelta(days=max_age_days)
+    report = store.compact(max_size, max_age)
+
+    click.echo("Evicted {} items ({:.1f} MB).".format(
+        len(report["evicted"]), report["bytes_freed"] / 1e6))
+    if report["size_before"] is not None:
+        click.echo("Database size: {:.1f} MB -> {:.1f} MB.".format(
+            report["size_before"] / 1e6, report["size_after"] / 1e6))
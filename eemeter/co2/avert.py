@@ -17,7 +17,12 @@ class AVERTSource(object):
         self._check_for_data()
 
     def _check_for_data(self):
-        if not self.co2_store.key_exists(self.year, self.region):
+        if self.co2_store.key_exists(self.year, self.region):
+            return
+        with self.co2_store.fetch_lock(self.year, self.region):
+            # another worker may have fetched the data while this one waited.
+            if self.co2_store.key_exists(self.year, self.region):
+                return
             co2_by_load, load_by_hour = self.client.read_rdf_file(
                 self.year, self.region)
             if len(co2_by_load) > 0 and len(load_by_hour) > 0:
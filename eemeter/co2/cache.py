@@ -1,18 +1,33 @@
 import os
 import json
 from sqlalchemy import (
-    create_engine,
     Table,
     MetaData,
     Column,
+    Index,
     Integer,
     String,
+    inspect,
 )
-from sqlalchemy.sql import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import func, select
 import pandas as pd
 
+from eemeter.cache import get_engine, key_lock, upsert
+
 
 class SqlCO2Store(object):
+    ''' Cache of AVERT CO2 data by year and region.
+
+    Stores for the same database URL share an engine (see
+    :code:`eemeter.cache.get_engine`), and writes are atomic, so stores can
+    be used from several threads and processes at once.
+
+    Parameters
+    ----------
+    url : str, default None
+        SQLAlchemy compatible database URL.
+    '''
 
     def __init__(self, url=None):
         self._prepare_db(url)
@@ -35,8 +50,9 @@ class SqlCO2Store(object):
 
         self.url = url
 
-        eng = create_engine(url)
+        eng = get_engine(url)
         metadata = MetaData(eng)
+        self.engine = eng
 
         tbl_items = Table(
             "items",
@@ -45,12 +61,39 @@ class SqlCO2Store(object):
             Column("year", Integer),
             Column("region", String),
             Column("co2_by_load", String),
-            Column("load_by_hour", String)
+            Column("load_by_hour", String),
+            Index("ix_items_year_region", "year", "region", unique=True),
         )
 
         tbl_items.create(checkfirst=True)
 
         self.items = tbl_items
+        self._add_unique_index()
+
+    def _add_unique_index(self):
+        # caches created before rows were unique by year and region.
+        index, = self.items.indexes
+
+        def _exists():
+            return index.name in [
+                i["name"] for i in inspect(self.engine).get_indexes(
+                    self.items.name)]
+
+        if _exists():
+            return
+
+        try:
+            with self.engine.begin() as conn:
+                # keep the most recently inserted of any duplicated rows.
+                keep = select([func.max(self.items.c.id)]).group_by(
+                    self.items.c.year, self.items.c.region)
+                conn.execute(self.items.delete().where(
+                    ~self.items.c.id.in_(keep)))
+                index.create(conn)
+        except DBAPIError:
+            # another process may have added it first.
+            if not _exists():
+                raise
 
     def key_exists(self, year, region):
         s = select([self.items.c.year, self.items.c.region]).where(
@@ -58,22 +101,23 @@ class SqlCO2Store(object):
         result = s.execute()
         return result.fetchone() is not None
 
+    def fetch_lock(self, year, region):
+        ''' Context manager holding an exclusive lock on the data for a year
+        and region across threads and processes (see
+        :code:`eemeter.cache.key_lock`), so that only one worker fetches it
+        while others wait.
+        '''
+        return key_lock(self.url, "{}-{}".format(year, region))
+
     def save_json(self, year, region, co2_by_load, load_by_hour):
         co2_by_load = json.dumps({str(k): v for k, v in
                                   co2_by_load.to_dict().items()})
         load_by_hour = json.dumps({str(k): v for k, v in
                                    load_by_hour.to_dict().items()})
-        if self.key_exists(year, region):
-            s = self.items.update().where(
-                (self.items.c.year == year) &
-                (self.items.c.region == region)).values(
-                year=year, region=region, co2_by_load=co2_by_load,
-                load_by_hour=load_by_hour)
-        else:
-            s = self.items.insert().values(
-                year=year, region=region, co2_by_load=co2_by_load,
-                load_by_hour=load_by_hour)
-        s.execute()
+        upsert(self.engine, self.items,
+               (self.items.c.year == year) & (self.items.c.region == region),
+               dict(year=year, region=region, co2_by_load=co2_by_load,
+                    load_by_hour=load_by_hour))
 
     def retrieve_co2_by_load(self, year, region):
         s = select([self.items.c.co2_by_load]).where(
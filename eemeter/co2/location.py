@@ -1,20 +1,13 @@
-import json
-from pkg_resources import resource_stream
+from eemeter.resources.loader import load_resource
 
 
 resources = {}
 
 
-def _get_json_resource(filename):
-    with resource_stream('eemeter.resources', filename) as f:
-        resource = json.loads(f.read().decode('utf-8'))
-    return resource
-
-
 def _load_resource(name, filename):
     global resources
     if resources.get(name, None) is None:
-        resources[name] = _get_json_resource(filename)
+        resources[name] = load_resource(filename)
     return resources[name]
 
 
@@ -5,6 +5,9 @@ import patsy
 import eemeter.modeling.exceptions as model_exceptions
 from eemeter.modeling.models.caltrack_helpers import \
     _fit_intercept, _fit_cdd_only, _fit_hdd_only, _fit_full
+from eemeter.modeling.models.design import build_design_matrix
+from eemeter.modeling.models.variance import prediction_variance
+from eemeter.weather.degree_days import DegreeDayIndex
 
 
 class CaltrackMonthlyModel(object):
@@ -86,92 +89,41 @@ class CaltrackMonthlyModel(object):
             raise model_exceptions.DataSufficiencyException(
                 "No temperature data after resampling")
 
-        # get daily mean values
-        upd_data_daily_mean_values = [
-            value / (e - s).days for value, s, e in
-            zip(energy_data, energy_data.index, energy_data.index[1:])
-        ] + [np.nan]  # add missing last data point, which is null by convention anyhow
-        usage_data_daily_mean_values = [
-            value for value, s, e in
-            zip(energy_data, energy_data.index, energy_data.index[1:])
-        ] + [np.nan]  # add missing last data point, which is null by convention anyhow
-
-        # Create arrays to hold computed CDD and HDD for each
-        # balance point temperature.
-        cdd = {i: [0] for i in self.bp_cdd}
-        hdd = {i: [0] for i in self.bp_hdd}
-        for bp in self.bp_cdd:
-            cdd[bp] = pd.Series(
-                np.maximum(temp_data_daily - bp, 0),
-                index=temp_data_daily.index)
-        for bp in self.bp_hdd:
-            hdd[bp] = pd.Series(
-                np.maximum(bp - temp_data_daily, 0),
-                index=temp_data_daily.index)
-
-        ndays_data_daily_mean_values = []
-        hdd_data_daily_mean_values = {}
-        cdd_data_daily_mean_values = {}
-
-        for s, e in zip(energy_data.index, energy_data.index[1:]):
-            thisn = np.sum(np.isfinite(temp_data_daily[s:e]))
-            ndays_data_daily_mean_values.append(thisn)
-            if thisn >= 15:
-                for bp in self.bp_cdd:
-                    thismean = np.nanmean(cdd[bp][s:e])
-                    if bp not in cdd_data_daily_mean_values.keys():
-                        cdd_data_daily_mean_values[bp] = []
-                    cdd_data_daily_mean_values[bp].append(thismean)
-                for bp in self.bp_hdd:
-                    thismean = np.nanmean(hdd[bp][s:e])
-                    if bp not in hdd_data_daily_mean_values.keys():
-                        hdd_data_daily_mean_values[bp] = []
-                    hdd_data_daily_mean_values[bp].append(thismean)
-            else:
-                for bp in self.bp_cdd:
-                    if bp not in cdd_data_daily_mean_values.keys():
-                        cdd_data_daily_mean_values[bp] = []
-                    cdd_data_daily_mean_values[bp].append(np.nan)
-                for bp in self.bp_hdd:
-                    if bp not in hdd_data_daily_mean_values.keys():
-                        hdd_data_daily_mean_values[bp] = []
-                    hdd_data_daily_mean_values[bp].append(np.nan)
+        # get daily mean values; the last data point is null by convention
+        usage = energy_data.values.astype(float)
+        period_days = (energy_data.index[1:] - energy_data.index[:-1]).days
+        with np.errstate(divide='ignore', invalid='ignore'):
+            upd = np.r_[usage[:-1] / period_days.values, np.nan]
+        usage = np.r_[usage[:-1], np.nan]
+
+        # Mean CDD and HDD for each balance point temperature over each
+        # period, which covers the days between its start and end, inclusive.
+        bp_cdd, bp_hdd = list(self.bp_cdd), list(self.bp_hdd)
+        degree_days = DegreeDayIndex(
+            temp_data_daily, bp_cdd, bp_hdd).intervals(
+            energy_data.index[:-1], energy_data.index[1:], mean=True,
+            inclusive=True)
+
+        ndays = degree_days['ndays'].values.astype(float)
+        means = degree_days.values[:, 1:].astype(float)
+        means[ndays < 15] = np.nan
 
         # spread out over the month
-        upd_data = pd.Series(
-            upd_data_daily_mean_values,
-            index=energy_data.index
-            )
-        usage_data = pd.Series(
-            usage_data_daily_mean_values,
-            index=energy_data.index
-            )
-        ndays_data = pd.Series(
-            ndays_data_daily_mean_values + [np.nan],
-            index=energy_data.index
-            )
-        cdd_data = {}
-        hdd_data = {}
-        for bp in self.bp_cdd:
-            cdd_data[bp] = pd.Series(
-                cdd_data_daily_mean_values[bp] + [np.nan],
-                index=energy_data.index
-                )
-        for bp in self.bp_hdd:
-            hdd_data[bp] = pd.Series(
-                hdd_data_daily_mean_values[bp] + [np.nan],
-                index=energy_data.index
-                )
+        ndays = np.r_[ndays, np.nan]
+        means = np.vstack([means, np.tile(np.nan, (1, means.shape[1]))])
 
         model_data = {
-            'upd': upd_data,
-            'usage': usage_data,
-            'ndays': ndays_data,
+            'upd': pd.Series(upd, index=energy_data.index),
+            'usage': pd.Series(usage, index=energy_data.index),
+            'ndays': pd.Series(ndays, index=energy_data.index),
         }
         model_data.update({'CDD_' + str(bp):
-                          cdd_data[bp] for bp in cdd_data.keys()})
+                          pd.Series(means[:, i], index=energy_data.index)
+                          for i, bp in enumerate(bp_cdd)})
         model_data.update({'HDD_' + str(bp):
-                          hdd_data[bp] for bp in hdd_data.keys()})
+                          pd.Series(means[:, len(bp_cdd) + i],
+                                    index=energy_data.index)
+                          for i, bp in enumerate(bp_hdd)})
 
         return pd.DataFrame(model_data)
 
@@ -204,71 +156,64 @@ class CaltrackMonthlyModel(object):
         # Throw out any duplicate indices
         df = df[~df.index.duplicated(keep='last')].sort_index()
 
-        # Create arrays to hold computed CDD and HDD for each
-        # balance point temperature.
-        cdd = {i: [0] for i in self.bp_cdd}
-        hdd = {i: [0] for i in self.bp_hdd}
-
         # If there isn't any data, throw an exception
         if len(df.index) == 0:
             raise model_exceptions.DataSufficiencyException("No energy trace data")
 
-        # Create the arrays to hold our monthly output
-        ndays, usage, upd, output_index = [0], [0], [0], [df.index[0]]
-        this_yr, this_mo = output_index[0].year, output_index[0].month
-
         # Check whether we are creating a demand fixture.
         is_demand_fixture = 'energy' not in df.columns
 
-        # TODO use groupby here? e.g. df.groupby(pd.TimeGrouper('MS'))
-        # Loop through the daily input data frame populating monthly arrays
-        for idx, row in df.iterrows():
-            # Check whether we are in a new month.
-            new_month = (this_yr != idx.year or this_mo != idx.month)
-            if new_month:
-                ndays.append(0)
-                usage.append(0)
-                upd.append(0)
-                for i in cdd.keys():
-                    cdd[i].append(0)
-                for i in hdd.keys():
-                    hdd[i].append(0)
-                this_yr, this_mo = idx.year, idx.month
-                output_index.append(idx)
-
-            # If this day is valid, add it to the usage and CDD/HDD arrays.
-            day_is_valid = (
-                (is_demand_fixture or
-                 (np.isfinite(row['energy']) and row['energy'] >= 0)) and np.isfinite(row['tempF']))
-            if day_is_valid:
-                ndays[-1] = ndays[-1] + 1
-                usage[-1] = usage[-1] + (
-                    row['energy'] if not is_demand_fixture else 0)
-                for bp in cdd.keys():
-                    cdd[bp][-1] += np.maximum(row['tempF'] - bp, 0)
-                for bp in hdd.keys():
-                    hdd[bp][-1] += np.maximum(bp - row['tempF'], 0)
+        # Label days by calendar month; months are contiguous runs of the
+        # sorted index, each labeled by its first day.
+        month = df.index.year * 12 + df.index.month
+        starts = np.flatnonzero(np.r_[True, month[1:] != month[:-1]])
+        lengths = np.diff(np.r_[starts, len(df.index)])
+        output_index = df.index[starts]
+
+        # Daily columns: valid flag, usage, then CDD and HDD for each
+        # balance point temperature, zeroed on invalid days.
+        tempF = df['tempF'].values.astype(float)
+        valid = np.isfinite(tempF)
+        if is_demand_fixture:
+            energy = np.zeros(tempF.shape)
+        else:
+            energy = df['energy'].values.astype(float)
+            with np.errstate(invalid='ignore'):
+                valid &= np.isfinite(energy) & (energy >= 0)
+        bp_cdd, bp_hdd = list(self.bp_cdd), list(self.bp_hdd)
+        daily = np.column_stack([
+            valid.astype(float),
+            energy,
+            np.maximum(tempF[:, np.newaxis] - np.array(bp_cdd, dtype=float), 0),
+            np.maximum(np.array(bp_hdd, dtype=float) - tempF[:, np.newaxis], 0),
+        ])
+        daily[~valid] = 0
+
+        # Lay days out as (month, day of month, column) and sum over days.
+        # Reducing over the middle axis adds days in order, matching a
+        # running total exactly.
+        day = np.arange(len(df.index)) - np.repeat(starts, lengths)
+        by_month = np.zeros((len(starts), lengths.max(), daily.shape[1]))
+        by_month[np.repeat(np.arange(len(starts)), lengths), day] = daily
+        totals = by_month.sum(axis=1)
+
+        ndays = totals[:, 0].astype(int)
+        usage = totals[:, 1]
+        if is_demand_fixture or ndays.sum() == 0:
+            usage = usage.astype(int)
 
         # Caltrack sufficiency requirement of >=15 days per month
-        for i in range(len(usage)):
-            misses_req = (ndays[i] < 15)
-            if misses_req:
-                upd[i] = np.nan
-                for bp in cdd.keys():
-                    cdd[bp][i] = np.nan
-                for bp in hdd.keys():
-                    hdd[bp][i] = np.nan
-            else:
-                upd[i] = (usage[i] / ndays[i])
-                for bp in cdd.keys():
-                    cdd[bp][i] = cdd[bp][i] / ndays[i]
-                for bp in hdd.keys():
-                    hdd[bp][i] = hdd[bp][i] / ndays[i]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = totals[:, 1:] / ndays[:, np.newaxis]
+        means[ndays < 15] = np.nan
 
         # Create output data frame
-        df_dict = {'upd': upd, 'usage': usage, 'ndays': ndays}
-        df_dict.update({'CDD_' + str(bp): cdd[bp] for bp in cdd.keys()})
-        df_dict.update({'HDD_' + str(bp): hdd[bp] for bp in hdd.keys()})
+        n_cdd = len(bp_cdd)
+        df_dict = {'upd': means[:, 0], 'usage': usage, 'ndays': ndays}
+        df_dict.update({'CDD_' + str(bp): means[:, 1 + i]
+                        for i, bp in enumerate(bp_cdd)})
+        df_dict.update({'HDD_' + str(bp): means[:, 1 + n_cdd + i]
+                        for i, bp in enumerate(bp_hdd)})
         output = pd.DataFrame(df_dict, index=output_index)
         return output
 
@@ -599,24 +544,21 @@ class CaltrackMonthlyModel(object):
         if params is None:
             params = self.params
 
-        formula = params["formula"]
-
         demand_fixture_index = demand_fixture_data.index.copy()
         demand_fixture_data = self.add_cols_to_demand_fixture(demand_fixture_data)
         dfd = demand_fixture_data.dropna()
 
-        _, X = patsy.dmatrices(formula, dfd,
-                               return_type='dataframe')
+        X = build_design_matrix(params["X_design_info"], dfd)
 
         try:
-            predicted = self.model_res.predict(X)
+            predicted = self.model_res.predict(X, transform=False)
             predicted = pd.Series(predicted, index=dfd.index)
             variance = copy.deepcopy(predicted)
             # Get parameter covariance matrix
             cov = self.model_res.cov_params()
             # Get prediction errors for each data point
-            prediction_var = self.model_res.mse_resid + \
-                (X * np.dot(cov, X.T).T).sum(1)
+            prediction_var = prediction_variance(
+                X, cov, self.model_res.mse_resid)
             predicted_baseline_use, predicted_baseline_use_var = 0.0, 0.0
         except:
             raise model_exceptions.ModelPredictException(
@@ -4,6 +4,8 @@ import patsy
 import eemeter.modeling.exceptions as model_exceptions
 from eemeter.modeling.models.caltrack_helpers import \
     _fit_intercept, _fit_cdd_only, _fit_hdd_only, _fit_full
+from eemeter.modeling.models.design import build_design_matrix
+from eemeter.modeling.models.variance import prediction_variance
 
 
 class CaltrackDailyModel(object):
@@ -309,19 +311,18 @@ class CaltrackDailyModel(object):
 
         dfd = self.ami_to_daily(demand_fixture_data)
 
-        formula = params["formula"]
-
-        _, X = patsy.dmatrices(formula, dfd,
-                               return_type='dataframe')
+        # As in fitting, days without usage are left out.
+        X = build_design_matrix(params["X_design_info"],
+                                dfd[dfd.upd.notnull()])
 
         try:
-            predicted = self.model_res.predict(X)
+            predicted = self.model_res.predict(X, transform=False)
             predicted = pd.Series(predicted, index=dfd.index)
             # Get parameter covariance matrix
             cov = self.model_res.cov_params()
             # Get prediction errors for each data point
-            prediction_var = self.model_res.mse_resid + \
-                (X * np.dot(cov, X.T).T).sum(1)
+            prediction_var = prediction_variance(
+                X, cov, self.model_res.mse_resid)
         except:
             raise model_exceptions.ModelPredictException(
                 "Prediction failed!")
@@ -1,4 +1,5 @@
 import numpy as np
+from scipy import stats
 import statsmodels.formula.api as smf
 
 
@@ -19,74 +20,240 @@ def _fit_intercept(df, weighted=False):
     return int_formula, int_mod, int_res, int_rsquared, int_qualified
 
 
-def _fit_cdd_only(df, weighted=False):
+class _DegreeDayGridFit(object):
+    ''' Closed-form (weighted) least squares fits of usage per day
+    (:code:`upd`) on an intercept and one or two degree day columns, batched
+    over candidate balance points.
 
-    bps = [i[4:] for i in df.columns if i[:3] == 'CDD']
-    best_bp, best_rsquared, best_mod, best_res = None, -9e9, None, None
-    best_formula, cdd_qualified = None, False
+    The degree day columns of :code:`df` are assembled into one matrix, and
+    all candidates are solved together from stacked normal equations. Only
+    the selected candidate, along with any candidate too close to a
+    selection threshold or to the best adjusted R-squared to decide reliably
+    in closed form, is fit with statsmodels, so selections match those of
+    fitting every candidate with statsmodels.
 
-    try:  # TODO: fix big try block anti-pattern
-        for bp in bps:
-            candidate_cdd_formula = 'upd ~ CDD_' + bp
-            if (np.nansum(df['CDD_' + bp] > 0) < 10) or \
-               (np.nansum(df['CDD_' + bp]) < 20):
-                continue
-            if weighted:
-                candidate_cdd_mod = smf.wls(formula=candidate_cdd_formula, data=df,
-                                            weights=df['ndays'])
-            else:
-                candidate_cdd_mod = smf.ols(formula=candidate_cdd_formula, data=df)
-            candidate_cdd_res = candidate_cdd_mod.fit()
-            candidate_cdd_rsquared = candidate_cdd_res.rsquared_adj
-            if (candidate_cdd_rsquared > best_rsquared and
-                    candidate_cdd_res.params['Intercept'] >= 0 and
-                    candidate_cdd_res.params['CDD_' + bp] >= 0 and
-                    candidate_cdd_res.pvalues['CDD_' + bp] < 0.1):
-                best_bp, best_rsquared = int(bp), candidate_cdd_rsquared
-                best_mod, best_res = candidate_cdd_mod, candidate_cdd_res
-                cdd_qualified = True
-                best_formula = 'upd ~ CDD_' + bp
-    except:  # TODO: catch specific error
-        best_rsquared, cdd_qualified = 0, False
-        best_formula, best_mod, best_res = None, None, None
-        best_bp = None
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Data with :code:`upd`, :code:`ndays` and :code:`CDD_<bp>`/
+        :code:`HDD_<bp>` columns.
+    weighted : bool, default False
+        If True, fits are weighted by :code:`ndays`.
+    '''
 
-    return best_formula, best_mod, best_res, best_rsquared, cdd_qualified, best_bp
+    # tolerances within which closed-form results are checked with
+    # statsmodels.
+    rsquared_tolerance = 1e-9
+    threshold_tolerance = 1e-8
 
+    def __init__(self, df, weighted=False):
+        self.df = df
+        self.weighted = weighted
+        self.columns = [c for c in df.columns if c[:3] in ('CDD', 'HDD')]
+        self.positions = {c: i for i, c in enumerate(self.columns)}
+        self.degree_days = df[self.columns].values.astype(float)
 
-def _fit_hdd_only(df, weighted=False):
+        # rows with missing values are dropped, as by patsy/statsmodels.
+        self.y = df['upd'].values.astype(float)
+        valid = ~np.isnan(self.y)
+        if weighted:
+            weights = df['ndays'].values.astype(float)
+            valid &= ~np.isnan(weights)
+        else:
+            weights = np.ones(self.y.shape[0])
+        self.valid = valid
+        self.weights = np.where(valid, weights, 0.)
+
+    def usable(self, column):
+        ''' Whether a degree day column has the minimum number of positive
+        values (10) and total degree days (20) to be a candidate.
+        '''
+        values = self.df[column]
+        return not ((np.nansum(values > 0) < 10) or (np.nansum(values) < 20))
+
+    def fit(self, candidates):
+        ''' Fit candidates in closed form.
+
+        Parameters
+        ----------
+        candidates : list of tuple of str
+            Degree day columns of each candidate; all candidates must have
+            the same number of columns.
+
+        Returns
+        -------
+        params, pvalues : numpy.ndarray
+            Intercepts and coefficients (in column order), and their
+            p-values, one row per candidate.
+        rsquared_adj : numpy.ndarray
+            Adjusted R-squared of each candidate.
+        singular : numpy.ndarray of bool
+            Candidates for which the normal equations are (nearly) singular
+            and the results above are not meaningful.
+        '''
+        columns = np.array([[self.positions[c] for c in candidate]
+                            for candidate in candidates])
+        regressors = np.transpose(self.degree_days[:, columns], (1, 0, 2))
+        n_candidates, n_rows, n_regressors = regressors.shape
+
+        mask = self.valid & ~np.isnan(regressors).any(axis=2)
+        weights = np.where(mask, self.weights, 0.)
+        y = np.where(mask, self.y, 0.)
+        design = np.concatenate([
+            np.ones((n_candidates, n_rows, 1)),
+            np.where(mask[:, :, np.newaxis], regressors, 0.),
+        ], axis=2)
+
+        # stacked normal equations.
+        gram = np.einsum('kni,kn,knj->kij', design, weights, design)
+        moments = np.einsum('kni,kn,kn->ki', design, weights, y)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            singular = ~(np.linalg.cond(gram) < 1e10)
+            gram[singular] = np.eye(n_regressors + 1)
+            gram_inv = np.linalg.inv(gram)
+            params = np.einsum('kij,kj->ki', gram_inv, moments)
+
+            resid = y - np.einsum('kni,ki->kn', design, params)
+            ssr = (weights * resid ** 2).sum(axis=1)
+            y_mean = (weights * y).sum(axis=1) / weights.sum(axis=1)
+            centered_tss = (
+                weights * (y - y_mean[:, np.newaxis]) ** 2).sum(axis=1)
+            nobs = mask.sum(axis=1).astype(float)
+            df_resid = nobs - (n_regressors + 1)
+            rsquared_adj = 1 - (nobs - 1) / df_resid * (ssr / centered_tss)
+
+            scale = ssr / df_resid
+            bse = np.sqrt(scale[:, np.newaxis] *
+                          np.diagonal(gram_inv, axis1=1, axis2=2))
+            pvalues = 2 * stats.t.sf(np.abs(params / bse),
+                                     df_resid[:, np.newaxis])
+
+        return params, pvalues, rsquared_adj, singular
+
+    def formula(self, candidate):
+        ''' Formula of a candidate, e.g., :code:`"upd ~ CDD_70 + HDD_60"`.
+        '''
+        return 'upd ~ ' + ' + '.join(candidate)
+
+    def _fit_statsmodels(self, candidate):
+        formula = self.formula(candidate)
+        if self.weighted:
+            mod = smf.wls(formula=formula, data=self.df,
+                          weights=self.df['ndays'])
+        else:
+            mod = smf.ols(formula=formula, data=self.df)
+        res = mod.fit()
+        qualified = res.params['Intercept'] >= 0 and all(
+            res.params[c] >= 0 and res.pvalues[c] < 0.1 for c in candidate)
+        return mod, res, res.rsquared_adj, qualified
+
+    def _select_statsmodels(self, candidates):
+        # fits every candidate with statsmodels; the first candidate with
+        # the highest adjusted R-squared of those qualifying wins.
+        best = None
+        for i, candidate in enumerate(candidates):
+            mod, res, rsquared, qualified = self._fit_statsmodels(candidate)
+            if qualified and rsquared > (-9e9 if best is None else best[0]):
+                best = (rsquared, i, mod, res)
+        return None if best is None else best[1:]
 
-    bps = [i[4:] for i in df.columns if i[:3] == 'HDD']
-    best_bp, best_rsquared, best_mod, best_res = None, -9e9, None, None
-    best_formula, hdd_qualified = None, False
+    def select(self, candidates):
+        ''' Select the candidate with the highest adjusted R-squared among
+        those with non-negative coefficients and coefficient p-values
+        below 0.1 (ties go to the first such candidate).
+
+        Parameters
+        ----------
+        candidates : list of tuple of str
+            Degree day columns of each candidate.
+
+        Returns
+        -------
+        selected : tuple or None
+            :code:`(index, model, result)` of the selected candidate, with
+            the statsmodels model and fit result, or None if no candidate
+            qualifies.
+        '''
+        if len(candidates) == 0:
+            return None
+
+        params, pvalues, rsquared, singular = self.fit(candidates)
+        qualified = (
+            (params >= 0).all(axis=1) &
+            (pvalues[:, 1:] < 0.1).all(axis=1) &
+            (rsquared > -9e9)
+        )
+
+        # results too close to a threshold to decide in closed form.
+        y_scale = np.abs(self.y[self.valid]).max() if self.valid.any() else 1.
+        tolerance = self.threshold_tolerance
+        ambiguous = (
+            singular |
+            ~np.isfinite(params).all(axis=1) |
+            ~np.isfinite(pvalues[:, 1:]).all(axis=1) |
+            ~np.isfinite(rsquared) |
+            (np.abs(params) < tolerance * max(y_scale, 1.)).any(axis=1) |
+            (np.abs(pvalues[:, 1:] - 0.1) < tolerance).any(axis=1)
+        )
+
+        fits = {}
+
+        def _refit(i):
+            if i not in fits:
+                fits[i] = self._fit_statsmodels(candidates[i])
+                rsquared[i], qualified[i] = fits[i][2], fits[i][3]
+
+        for i in np.flatnonzero(ambiguous):
+            _refit(i)
+
+        if not qualified.any():
+            return None
+
+        # candidates which might have the highest adjusted R-squared.
+        best_rsquared = rsquared[qualified].max()
+        ties = np.flatnonzero(
+            qualified &
+            (rsquared >= best_rsquared - self.rsquared_tolerance))
+        for i in ties:
+            _refit(i)
+
+        selected = None
+        for i in ties:
+            if qualified[i] and (selected is None or
+                                 rsquared[i] > rsquared[selected]):
+                selected = i
+        if selected is None:
+            return self._select_statsmodels(candidates)
+
+        mod, res = fits[selected][:2]
+        return selected, mod, res
+
+
+def _fit_degree_day_only(df, prefix, weighted=False):
+    bps = [i[4:] for i in df.columns if i[:3] == prefix]
 
     try:  # TODO: fix big try block anti-pattern
-        for bp in bps:
-            candidate_hdd_formula = 'upd ~ HDD_' + bp
-            if (np.nansum(df['HDD_' + bp] > 0) < 10) or \
-               (np.nansum(df['HDD_' + bp]) < 20):
-                continue
-            if weighted:
-                candidate_hdd_mod = smf.wls(formula=candidate_hdd_formula, data=df,
-                                            weights=df['ndays'])
-            else:
-                candidate_hdd_mod = smf.ols(formula=candidate_hdd_formula, data=df)
-            candidate_hdd_res = candidate_hdd_mod.fit()
-            candidate_hdd_rsquared = candidate_hdd_res.rsquared_adj
-            if (candidate_hdd_rsquared > best_rsquared and
-                    candidate_hdd_res.params['Intercept'] >= 0 and
-                    candidate_hdd_res.params['HDD_' + bp] >= 0 and
-                    candidate_hdd_res.pvalues['HDD_' + bp] < 0.1):
-                best_bp, best_rsquared = int(bp), candidate_hdd_rsquared
-                best_mod, best_res = candidate_hdd_mod, candidate_hdd_res
-                hdd_qualified = True
-                best_formula = 'upd ~ HDD_' + bp
+        grid = _DegreeDayGridFit(df, weighted)
+        candidates = [(prefix + '_' + bp,) for bp in bps
+                      if grid.usable(prefix + '_' + bp)]
+        selected = grid.select(candidates)
+        if selected is None:
+            return None, None, None, -9e9, False, None
+        i, best_mod, best_res = selected
+        best_bp = candidates[i][0][4:]
+        return (grid.formula(candidates[i]), best_mod, best_res,
+                best_res.rsquared_adj, True, int(best_bp))
     except:  # TODO: catch specific error
-        best_rsquared, hdd_qualified = 0, False
-        best_formula, best_mod, best_res = None, None, None
-        best_bp = None
+        return None, None, None, 0, False, None
+
+
+def _fit_cdd_only(df, weighted=False):
+    return _fit_degree_day_only(df, 'CDD', weighted)
+
 
-    return best_formula, best_mod, best_res, best_rsquared, hdd_qualified, best_bp
+def _fit_hdd_only(df, weighted=False):
+    return _fit_degree_day_only(df, 'HDD', weighted)
 
 
 def _fit_full(df, weighted=False):
@@ -94,44 +261,21 @@ def _fit_full(df, weighted=False):
     hdd_bps = [i[4:] for i in df.columns if i[:3] == 'HDD']
     cdd_bps = [i[4:] for i in df.columns if i[:3] == 'CDD']
 
-    best_hdd_bp, best_cdd_bp, best_rsquared, best_mod, best_res = \
-        None, None, -9e9, None, None
-    best_formula, full_qualified = None, False
-
     try:  # TODO: fix big try block anti-pattern
-        for hdd_bp in hdd_bps:
-            for cdd_bp in cdd_bps:
-                if cdd_bp < hdd_bp:
-                    continue
-                candidate_full_formula = 'upd ~ CDD_' + cdd_bp + \
-                                         ' + HDD_' + hdd_bp
-                if (np.nansum(df['HDD_' + hdd_bp] > 0) < 10) or \
-                   (np.nansum(df['HDD_' + hdd_bp]) < 20):
-                    continue
-                if (np.nansum(df['CDD_' + cdd_bp] > 0) < 10) or \
-                   (np.nansum(df['CDD_' + cdd_bp]) < 20):
-                    continue
-                if weighted:
-                    candidate_full_mod = smf.wls(formula=candidate_full_formula, data=df,
-                                                 weights=df['ndays'])
-                else:
-                    candidate_full_mod = smf.ols(formula=candidate_full_formula, data=df)
-                candidate_full_res = candidate_full_mod.fit()
-                candidate_full_rsquared = candidate_full_res.rsquared_adj
-                if (candidate_full_rsquared > best_rsquared and
-                        candidate_full_res.params['Intercept'] >= 0 and
-                        candidate_full_res.params['HDD_' + hdd_bp] >= 0 and
-                        candidate_full_res.params['CDD_' + cdd_bp] >= 0 and
-                        candidate_full_res.pvalues['HDD_' + hdd_bp] < 0.1 and
-                        candidate_full_res.pvalues['CDD_' + cdd_bp] < 0.1):
-                    best_hdd_bp, best_cdd_bp, best_rsquared = \
-                        int(hdd_bp), int(cdd_bp), candidate_full_rsquared
-                    best_mod, best_res = candidate_full_mod, candidate_full_res
-                    full_qualified = True
-                    best_formula = 'upd ~ CDD_' + cdd_bp + ' + HDD_' + hdd_bp
+        grid = _DegreeDayGridFit(df, weighted)
+        candidates = [
+            ('CDD_' + cdd_bp, 'HDD_' + hdd_bp)
+            for hdd_bp in hdd_bps for cdd_bp in cdd_bps
+            if not cdd_bp < hdd_bp and
+            grid.usable('HDD_' + hdd_bp) and grid.usable('CDD_' + cdd_bp)
+        ]
+        selected = grid.select(candidates)
+        if selected is None:
+            return None, None, None, -9e9, False, None, None
+        i, best_mod, best_res = selected
+        cdd_column, hdd_column = candidates[i]
+        return (grid.formula(candidates[i]), best_mod, best_res,
+                best_res.rsquared_adj, True, int(hdd_column[4:]),
+                int(cdd_column[4:]))
     except:  # TODO: catch specific error
-        best_rsquared, full_qualified = 0, False
-        best_formula, best_mod, best_res = None, None, None
-        best_hdd_bp, best_hdd_bp = None, None
-
-    return best_formula, best_mod, best_res, best_rsquared, full_qualified, best_hdd_bp, best_cdd_bp
+        return None, None, None, 0, False, None, None
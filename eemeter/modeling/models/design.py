@@ -0,0 +1,210 @@
+import itertools
+import re
+import weakref
+
+import numpy as np
+import pandas as pd
+import patsy
+
+
+_NAME = r'[A-Za-z_]\w*'
+
+# Factor expressions evaluated without patsy: a column of the data, or a
+# calendar attribute of the index of a column.
+_COLUMN_RE = re.compile(r'^({})$'.format(_NAME))
+_INDEX_ATTRIBUTE_RE = re.compile(
+    r'^({})\.index\.(year|month|day|hour|weekday|dayofweek)$'.format(_NAME))
+_CATEGORICAL_RE = re.compile(r'^C\((.+)\)$')
+
+# Builders compiled so far, held for as long as their design info is.
+_builders = weakref.WeakKeyDictionary()
+
+
+def _compile_expression(code):
+    match = _COLUMN_RE.match(code)
+    if match:
+        name = match.group(1)
+        return lambda data: np.asarray(data[name])
+
+    match = _INDEX_ATTRIBUTE_RE.match(code)
+    if match:
+        name, attribute = match.groups()
+        return lambda data: np.asarray(getattr(data[name].index, attribute))
+
+    return None
+
+
+class DesignMatrixBuilder(object):
+    ''' Builds design matrices for a fitted patsy formula directly from
+    arrays, without re-evaluating the formula through patsy.
+
+    Supports formulas made of an intercept, numerical columns, categorical
+    columns or calendar attributes of a column's index (e.g.
+    :code:`C(tempF.index.month)`), and interactions of these. Columns are
+    produced in patsy's order with patsy's contrast matrices, and rows with
+    missing values are dropped, as by patsy.
+
+    Parameters
+    ----------
+    design_info : patsy.DesignInfo
+        Design info of a design matrix built during model fit.
+
+    Raises
+    ------
+    ValueError
+        If the formula uses factors that this builder does not support.
+    '''
+
+    def __init__(self, design_info):
+        self.design_info = design_info
+        self.column_names = list(design_info.column_names)
+
+        self.factors = []  # (factor, evaluate, categories or None)
+        for factor, factor_info in design_info.factor_infos.items():
+            code = factor.code
+            if factor_info.type == 'categorical':
+                match = _CATEGORICAL_RE.match(code)
+                if match is not None:
+                    code = match.group(1)
+                categories = pd.Index(factor_info.categories)
+            elif factor_info.num_columns == 1:
+                categories = None
+            else:
+                categories = None
+                code = None
+            evaluate = None if code is None else _compile_expression(code)
+            if evaluate is None:
+                message = 'Unsupported design factor "{}".'.format(
+                    factor.code)
+                raise ValueError(message)
+            self.factors.append((factor, evaluate, categories))
+
+        # For each column, the factor columns to multiply: (factor, matrix
+        # or None, column). As in patsy, the left-most factor iterates
+        # fastest.
+        self.columns = []
+        for term, subterms in design_info.term_codings.items():
+            for subterm in subterms:
+                factor_columns = []
+                for factor in subterm.factors:
+                    if factor in subterm.contrast_matrices:
+                        matrix = subterm.contrast_matrices[factor].matrix
+                        factor_columns.append(
+                            [(factor, matrix, i)
+                             for i in range(matrix.shape[1])])
+                    else:
+                        factor_columns.append([(factor, None, 0)])
+                for combination in itertools.product(
+                        *reversed(factor_columns)):
+                    self.columns.append(combination[::-1])
+
+        if len(self.columns) != len(self.column_names):
+            raise ValueError('Unsupported design.')
+
+    def build(self, data):
+        ''' Build the design matrix for data.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Data with the columns used by the formula.
+
+        Returns
+        -------
+        X : pandas.DataFrame
+            Design matrix, indexed by the rows of :code:`data` without
+            missing values.
+
+        Raises
+        ------
+        ValueError
+            If categorical data contains levels not seen during fit.
+        '''
+        n = len(data.index)
+        keep = np.ones(n, dtype=bool)
+        values = {}
+        for factor, evaluate, categories in self.factors:
+            factor_values = evaluate(data)
+            missing = pd.isnull(factor_values)
+            if categories is None:
+                factor_values = factor_values.astype(float)
+            else:
+                factor_values = categories.get_indexer(factor_values)
+                if (factor_values[~missing] < 0).any():
+                    message = 'Unexpected levels in "{}".'.format(
+                        factor.code)
+                    raise ValueError(message)
+            keep &= ~missing
+            values[factor] = factor_values
+
+        if not keep.all():
+            values = {factor: factor_values[keep]
+                      for factor, factor_values in values.items()}
+        n_rows = int(keep.sum())
+
+        X = np.ones((n_rows, len(self.columns)))
+        for i, combination in enumerate(self.columns):
+            for factor, matrix, column in combination:
+                if matrix is None:
+                    X[:, i] *= values[factor]
+                else:
+                    X[:, i] *= matrix[values[factor], column]
+
+        return pd.DataFrame(X, index=data.index[keep],
+                            columns=self.column_names)
+
+
+def get_design_matrix_builder(design_info):
+    ''' Design matrix builder compiled once per design info.
+
+    Parameters
+    ----------
+    design_info : patsy.DesignInfo
+        Design info of a design matrix built during model fit.
+
+    Returns
+    -------
+    builder : DesignMatrixBuilder or None
+        None if the formula must be built with patsy.
+    '''
+    try:
+        return _builders[design_info]
+    except KeyError:
+        pass
+    except TypeError:  # not a design info.
+        return None
+
+    try:
+        builder = DesignMatrixBuilder(design_info)
+    except ValueError:
+        builder = None
+    _builders[design_info] = builder
+    return builder
+
+
+def build_design_matrix(design_info, data):
+    ''' Design matrix for data using a compiled builder, falling back to
+    patsy for formulas the builder does not support.
+
+    Parameters
+    ----------
+    design_info : patsy.DesignInfo
+        Design info of a design matrix built during model fit.
+    data : pandas.DataFrame
+        Data with the columns used by the formula.
+
+    Returns
+    -------
+    X : pandas.DataFrame
+        Design matrix, indexed by the rows of :code:`data` without missing
+        values.
+    '''
+    builder = get_design_matrix_builder(design_info)
+    if builder is not None:
+        try:
+            return builder.build(data)
+        except (KeyError, ValueError, TypeError):
+            pass  # let patsy handle or report it.
+    (X,) = patsy.build_design_matrices([design_info], data,
+                                       return_type='dataframe')
+    return X
@@ -6,6 +6,8 @@ import patsy
 from scipy.stats import chi2
 from sklearn import linear_model
 
+from eemeter.modeling.models.design import build_design_matrix
+
 
 class ElasticNetCVBaseModel(object):
     """
@@ -239,9 +241,7 @@ class ElasticNetCVBaseModel(object):
         model_data = self._model_data_from_demand_fixture_data(
             demand_fixture_data)
 
-        (X,) = patsy.build_design_matrices([design_info],
-                                           model_data,
-                                           return_type='dataframe')
+        X = build_design_matrix(design_info, model_data)
 
         model_obj = linear_model.ElasticNetCV(l1_ratio=self.l1_ratio,
                                               fit_intercept=False)
@@ -1,8 +1,9 @@
 import pandas as pd
 import numpy as np
 import statsmodels.formula.api as smf
-import patsy
 import eemeter.modeling.exceptions as model_exceptions
+from eemeter.modeling.models.design import build_design_matrix
+from eemeter.modeling.models.variance import prediction_variance
 
 
 class HourlyDayOfWeekModel(object):
@@ -48,11 +49,8 @@ class HourlyDayOfWeekModel(object):
         A new datafarame with two more columns:
         hour_of_day and day_of_week
         """
-        hour_of_day = []
-        day_of_week = []
-        for index, row in df.iterrows():
-            hour_of_day.append(str(index.hour))
-            day_of_week.append(str(index.dayofweek))
+        hour_of_day = df.index.hour.astype(str)
+        day_of_week = df.index.dayofweek.astype(str)
 
         new_df = df.assign(hour_of_day=hour_of_day,
                            day_of_week=day_of_week)
@@ -171,25 +169,22 @@ class HourlyDayOfWeekModel(object):
         }
         return output
 
+    def _design_matrix(self, model, df):
+        return build_design_matrix(model.data.design_info, df)
+
     def compute_variance(self, df):
         weekday_df = df.loc[df['day_of_week'].isin(self.weekdays)]
         weekend_df = df.loc[df['day_of_week'].isin(self.weekends)]
 
-        _, weekday_X = patsy.dmatrices(self.formula,
-                                       weekday_df,
-                                       return_type='dataframe')
-
-        cov = self.model_res_weekday.cov_params()
-
-        weekday_var = self.model_res_weekday.mse_resid + (weekday_X * np.dot(cov, weekday_X.T).T).sum(1)
+        weekday_X = self._design_matrix(self.model_weekday, weekday_df)
+        weekday_var = prediction_variance(
+            weekday_X, self.model_res_weekday.cov_params(),
+            self.model_res_weekday.mse_resid)
 
-        _, weekend_X = patsy.dmatrices(self.formula,
-                                       weekend_df,
-                                       return_type='dataframe')
-
-        cov = self.model_res_weekend.cov_params()
-        weekend_var = self.model_res_weekend.mse_resid + (weekend_X *
-                                                          np.dot(cov, weekend_X.T).T).sum(1)
+        weekend_X = self._design_matrix(self.model_weekend, weekend_df)
+        weekend_var = prediction_variance(
+            weekend_X, self.model_res_weekend.cov_params(),
+            self.model_res_weekend.mse_resid)
         weekend_var = pd.Series(weekend_var, index=weekend_df.index)
         weekday_var = pd.Series(weekday_var, index=weekday_df.index)
 
@@ -210,19 +205,15 @@ class HourlyDayOfWeekModel(object):
         test_df = self.add_hdd(test_df)
         test_df = self.add_cdd(test_df)
 
-        # We energy is what we predict, we don't require this column
-        # except in compute_variance function which deconstructs dataframe
-        # using patsy and use it to compute variancee. If this column
-        # is not there then we just construct dummy here so that
-        # compute_variance succeed.
-        if 'energy' not in test_df:
-            test_df = test_df.assign(energy=[0.0 for xx in test_df['tempF']])
-
         weekday_df = test_df.loc[test_df['day_of_week'].isin(self.weekdays)]
-        weekday_pred = self.model_res_weekday.predict(weekday_df)
+        weekday_pred = self.model_res_weekday.predict(
+            self._design_matrix(self.model_weekday, weekday_df),
+            transform=False)
 
         weekend_df = test_df.loc[test_df['day_of_week'].isin(self.weekends)]
-        weekend_pred = self.model_res_weekend.predict(weekend_df)
+        weekend_pred = self.model_res_weekend.predict(
+            self._design_matrix(self.model_weekend, weekend_df),
+            transform=False)
 
         # A series DS
         prediction = pd.concat([weekday_pred, weekend_pred])
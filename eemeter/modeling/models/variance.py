@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+
+# Rows of the design matrix handled at a time; the working set is about
+# chunk_size * n_params floats.
+PREDICTION_VARIANCE_CHUNK_SIZE = 1024
+
+
+def prediction_variance(X, cov, mse_resid, chunk_size=None):
+    ''' Variance of linear model predictions, :code:`mse_resid` plus the
+    diagonal of :code:`X * cov * X^T`.
+
+    The diagonal is computed over blocks of rows on raw arrays, so memory
+    use is bounded by the chunk size rather than growing with the number of
+    rows of :code:`X`.
+
+    Parameters
+    ----------
+    X : pandas.DataFrame or numpy.ndarray
+        Design matrix with one column per model parameter.
+    cov : pandas.DataFrame or numpy.ndarray
+        Parameter covariance matrix, in the column order of :code:`X`.
+    mse_resid : float
+        Mean squared error of the model residuals.
+    chunk_size : int, default None
+        Number of rows per block. Defaults to
+        :code:`PREDICTION_VARIANCE_CHUNK_SIZE`.
+
+    Returns
+    -------
+    variance : pandas.Series or numpy.ndarray
+        Prediction variances; a Series with the index of :code:`X` if
+        :code:`X` is a DataFrame.
+    '''
+    if chunk_size is None:
+        chunk_size = PREDICTION_VARIANCE_CHUNK_SIZE
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive.')
+
+    values = np.asarray(X, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+
+    variance = np.empty(values.shape[0])
+    for start in range(0, values.shape[0], chunk_size):
+        block = values[start:start + chunk_size]
+        variance[start:start + chunk_size] = np.einsum(
+            'ij,ij->i', np.dot(block, cov), block)
+    variance += mse_resid
+
+    if isinstance(X, pd.DataFrame):
+        return pd.Series(variance, index=X.index)
+    return variance
@@ -9,12 +9,14 @@ from eemeter.co2.location import zipcode_to_avert_region
 from eemeter.weather.noaa import ISDWeatherSource
 from eemeter.weather.tmy3 import TMY3WeatherSource
 from eemeter.weather.cz2010 import CZ2010WeatherSource
+from eemeter.weather.clients import get_mirror_directory
+from eemeter.weather.registry import weather_source_registry
 from eemeter.co2.avert import AVERTSource
 
 logger = logging.getLogger(__name__)
 
 
-def get_weather_source(site, use_cz2010=False):
+def get_weather_source(site, use_cz2010=False, mirror_directory=None):
     ''' Finds most relevant WeatherSource given project site.
 
     Parameters
@@ -23,6 +25,14 @@ def get_weather_source(site, use_cz2010=False):
         Site to match to weather source data.
     use_cz2010 : boolean, default False
         Indicates whether or not to use CZ2010 mapping.
+    mirror_directory : str, default None
+        Root directory of a local mirror of weather data files to read
+        instead of remote sources. If None, uses the
+        EEMETER_WEATHER_MIRROR_DIRECTORY environment variable, if set.
+
+    Sources are shared through
+    :code:`eemeter.weather.registry.weather_source_registry`, so repeated
+    calls for the same station return the same, already loaded, instance.
 
     Returns
     -------
@@ -52,7 +62,9 @@ def get_weather_source(site, use_cz2010=False):
     )
 
     try:
-        weather_source = ISDWeatherSource(station)
+        weather_source = weather_source_registry.get(
+            ISDWeatherSource, station,
+            mirror_directory=get_mirror_directory(mirror_directory))
     except ValueError:
         logger.error(
             "Could not create ISDWeatherSource for station {}."
@@ -65,7 +77,8 @@ def get_weather_source(site, use_cz2010=False):
     return weather_source
 
 
-def get_weather_normal_source(site, use_cz2010=False):
+def get_weather_normal_source(site, use_cz2010=False,
+                              mirror_directory=None):
     ''' Finds most relevant WeatherSource given project site.
 
     Parameters
@@ -74,6 +87,14 @@ def get_weather_normal_source(site, use_cz2010=False):
         Site to match to weather source data.
     use_cz2010 : boolean, default False
         Indicates whether or not to use CZ2010 mapping.
+    mirror_directory : str, default None
+        Root directory of a local mirror of weather data files to read
+        instead of remote sources. If None, uses the
+        EEMETER_WEATHER_MIRROR_DIRECTORY environment variable, if set.
+
+    Sources are shared through
+    :code:`eemeter.weather.registry.weather_source_registry`, so repeated
+    calls for the same station return the same, already loaded, instance.
 
     Returns
     -------
@@ -108,7 +129,9 @@ def get_weather_normal_source(site, use_cz2010=False):
 
     if use_cz2010:
         try:
-            weather_normal_source = CZ2010WeatherSource(station)
+            weather_normal_source = weather_source_registry.get(
+                CZ2010WeatherSource, station,
+                mirror_directory=get_mirror_directory(mirror_directory))
         except ValueError:
             logger.error(
                 "Could not create CZ2010WeatherSource for station {}."
@@ -118,7 +141,9 @@ def get_weather_normal_source(site, use_cz2010=False):
     else:
 
         try:
-            weather_normal_source = TMY3WeatherSource(station)
+            weather_normal_source = weather_source_registry.get(
+                TMY3WeatherSource, station,
+                mirror_directory=get_mirror_directory(mirror_directory))
         except ValueError:
             logger.error(
                 'Could not create TMY3WeatherSource for station {}.'
@@ -0,0 +1,251 @@
+try:
+    from collections.abc import Mapping
+except ImportError:  # python 2
+    from collections import Mapping
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from pkg_resources import resource_filename, resource_stream
+
+logger = logging.getLogger(__name__)
+
+_string_types = (str, type(u''))
+
+
+def get_resource_cache_directory():
+    ''' Directory in which binary forms of JSON resources are kept. Set with
+    the EEMETER_RESOURCE_CACHE_DIRECTORY environment variable; defaults to
+    :code:`~/.eemeter/cache/resources`.
+    '''
+    directory = os.environ.get("EEMETER_RESOURCE_CACHE_DIRECTORY")
+    if directory is None:
+        directory = os.path.join(
+            os.path.expanduser('~'), '.eemeter', 'cache', 'resources')
+    return directory
+
+
+class ResourceIndex(Mapping):
+    ''' Read-only mapping over a lookup resource stored as arrays rather
+    than as a dict of python objects.
+
+    Keys are kept in the order of the source resource, along with the
+    permutation which sorts them, so lookups are binary searches. Values
+    are either strings, fixed-length lists of floats (e.g., lat/lng
+    pairs), variable-length lists of strings (stored flattened, with
+    offsets), or absent, for resources which are lists of supported keys.
+
+    Parameters
+    ----------
+    arrays : dict of numpy.ndarray
+        :code:`"keys"` and :code:`"sorter"`, and optionally :code:`"values"`
+        and :code:`"offsets"`; possibly memory-mapped.
+    '''
+
+    def __init__(self, arrays):
+        self._keys = arrays["keys"]
+        self._sorter = arrays["sorter"]
+        self._values = arrays.get("values")
+        self._offsets = arrays.get("offsets")
+
+    def __repr__(self):
+        return 'ResourceIndex({} keys)'.format(len(self))
+
+    def __len__(self):
+        return self._keys.shape[0]
+
+    def __iter__(self):
+        return iter(_to_list(self._keys))
+
+    def _position(self, key):
+        n = self._keys.shape[0]
+        if n == 0 or not isinstance(key, _string_types):
+            return None
+        if self._keys.dtype.kind == 'S':
+            try:
+                key = key.encode('ascii')
+            except UnicodeError:
+                return None
+        i = np.searchsorted(self._keys, key, sorter=self._sorter)
+        if i < n:
+            position = self._sorter[i]
+            if self._keys[position] == key:
+                return position
+        return None
+
+    def __contains__(self, key):
+        return self._position(key) is not None
+
+    def _value(self, position):
+        if self._values is None:
+            return None
+        elif self._offsets is not None:
+            start, end = self._offsets[position:position + 2]
+            return _to_list(self._values[start:end])
+        elif self._values.dtype.kind == 'S':
+            return self._values[position].decode('ascii')
+        else:
+            return self._values[position].tolist()
+
+    def __getitem__(self, key):
+        position = self._position(key)
+        if position is None:
+            raise KeyError(key)
+        return self._value(position)
+
+    def values(self):
+        return [self._value(i) for i in range(len(self))]
+
+    def items(self):
+        return list(zip(_to_list(self._keys), self.values()))
+
+
+def _to_list(array):
+    values = array.tolist()
+    if array.dtype.kind == 'S':
+        values = [v.decode('ascii') for v in values]
+    return values
+
+
+def _string_array(strings):
+    # one byte per character where possible; strings are typically ZIP
+    # codes and station identifiers.
+    try:
+        return np.array([s.encode('ascii') for s in strings],
+                        dtype=np.bytes_).reshape((-1,))
+    except UnicodeError:
+        return np.array(strings, dtype=np.str_).reshape((-1,))
+
+
+def _encode_resource(resource):
+    # arrays for a decoded JSON resource, or None if it isn't supported.
+    if isinstance(resource, list):
+        keys, values = resource, None
+    elif isinstance(resource, dict):
+        keys, values = list(resource.keys()), list(resource.values())
+    else:
+        return None
+
+    if not all(isinstance(k, _string_types) for k in keys):
+        return None
+
+    arrays = {"keys": _string_array(keys)}
+    arrays["sorter"] = np.argsort(arrays["keys"], kind='mergesort') \
+        .astype(np.int32)
+
+    if values is None or len(values) == 0:
+        return arrays
+
+    if all(isinstance(v, _string_types) for v in values):
+        arrays["values"] = _string_array(values)
+    elif all(isinstance(v, list) for v in values):
+        flat = [x for v in values for x in v]
+        lengths = [len(v) for v in values]
+        if all(isinstance(x, _string_types) for x in flat):
+            arrays["values"] = _string_array(flat)
+            arrays["offsets"] = np.concatenate(
+                [[0], np.cumsum(lengths)]).astype(np.int64)
+        elif all(isinstance(x, (int, float)) for x in flat) and \
+                len(set(lengths)) == 1:
+            if all(isinstance(x, int) for x in flat):
+                arrays["values"] = np.array(values, dtype=np.int64)
+            else:
+                arrays["values"] = np.array(values, dtype=float)
+        else:
+            return None
+    else:
+        return None
+    return arrays
+
+
+def _get_binary_directory(filename):
+    stat = os.stat(resource_filename('eemeter.resources', filename))
+    signature = "{:x}-{:x}".format(stat.st_size, int(stat.st_mtime))
+    name = "{}-{}".format(os.path.splitext(filename)[0], signature)
+    return os.path.join(get_resource_cache_directory(), name)
+
+
+def _read_binary_resource(directory):
+    arrays = {}
+    for filename in os.listdir(directory):
+        name, extension = os.path.splitext(filename)
+        if extension == '.npy':
+            arrays[name] = np.load(os.path.join(directory, filename),
+                                   mmap_mode='r')
+    return arrays
+
+
+def _write_binary_resource(directory, arrays):
+    # write to a temporary directory and rename it into place, so that
+    # concurrent processes never see a partially written resource.
+    parent = os.path.dirname(directory)
+    if not os.path.exists(parent):
+        os.makedirs(parent)
+    tmp_directory = tempfile.mkdtemp(dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_directory, name + '.npy'), array)
+        os.rename(tmp_directory, directory)
+    except OSError:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        if not os.path.exists(directory):
+            raise
+
+
+def load_json_resource(filename):
+    ''' Decode a JSON resource from :code:`eemeter.resources`.
+    '''
+    with resource_stream('eemeter.resources', filename) as f:
+        resource = json.loads(f.read().decode('utf-8'))
+    return resource
+
+
+def load_resource(filename):
+    ''' Load a lookup resource from :code:`eemeter.resources`.
+
+    The first time a JSON resource is loaded, it is converted to a binary
+    form in the resource cache directory (see
+    :code:`get_resource_cache_directory`). The binary form is then opened
+    memory-mapped, so processes share the pages holding it and never decode
+    the JSON again. If the cache directory can't be written, the binary
+    form is kept in memory instead.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the JSON resource, e.g.,
+        :code:`"zipcode_centroid_lat_lngs.json"`.
+
+    Returns
+    -------
+    resource : eemeter.resources.loader.ResourceIndex or dict or list
+        Resource as a read-only mapping (which supports :code:`in`
+        for list resources), or as decoded JSON if its structure isn't
+        supported in binary form.
+    '''
+    try:
+        directory = _get_binary_directory(filename)
+    except (OSError, IOError) as e:
+        logger.debug("No binary form for {}: {}".format(filename, e))
+        return load_json_resource(filename)
+
+    if os.path.exists(directory):
+        return ResourceIndex(_read_binary_resource(directory))
+
+    resource = load_json_resource(filename)
+    arrays = _encode_resource(resource)
+    if arrays is None:
+        return resource
+
+    try:
+        _write_binary_resource(directory, arrays)
+    except (OSError, IOError) as e:
+        logger.warn(
+            "Could not cache binary form of {} in {}: {}"
+            .format(filename, directory, e)
+        )
+        return ResourceIndex(arrays)
+    return ResourceIndex(_read_binary_resource(directory))
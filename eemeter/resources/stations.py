@@ -0,0 +1,86 @@
+import threading
+
+from .loader import load_resource
+
+
+class StationCatalog(object):
+    ''' Read-only catalog of weather station identifiers, loaded lazily
+    from an :code:`eemeter.resources` file the first time it is used and
+    shared by every client and lookup function in the process.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.resources.stations import isd_stations
+        >>> "722880" in isd_stations
+        True
+        >>> isd_stations.aliases("722880")
+        ['722880-23152', '722880-99999']
+
+    Parameters
+    ----------
+    filename : str
+        Resource holding either a list of station identifiers or lists of
+        alias identifiers keyed by station identifier.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return 'StationCatalog("{}")'.format(self.filename)
+
+    def _load(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    index = load_resource(self.filename)
+                    if isinstance(index, list):
+                        # station identifiers without aliases.
+                        index = dict.fromkeys(index)
+                    self._index = index
+        return self._index
+
+    def __contains__(self, station):
+        return station in self._load()
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def aliases(self, station):
+        ''' Identifiers under which data for a station is published, in
+        order of preference.
+
+        Parameters
+        ----------
+        station : str
+            Station identifier.
+
+        Returns
+        -------
+        aliases : list of str
+            Alias identifiers (e.g., USAF-WBAN identifiers for a USAF
+            station), or just :code:`[station]` if the catalog doesn't map
+            the station to aliases.
+        '''
+        aliases = self._load().get(station)
+        if aliases is None:
+            return [station]
+        return aliases
+
+
+#: USAF stations with data in the NOAA ISD and GSOD datasets, with the
+#: USAF-WBAN identifiers of their files.
+isd_stations = StationCatalog('GSOD-ISD_station_index.json')
+
+#: Stations with TMY3 weather normals.
+tmy3_stations = StationCatalog('supported_tmy3_stations.json')
+
+#: Stations with CZ2010 weather normals.
+cz2010_stations = StationCatalog('supported_cz2010_stations.json')
@@ -1,9 +1,13 @@
-from datetime import datetime, date
-
+import numpy as np
 import pandas as pd
-import pytz
 
-from .cache import SqlJSONStore
+from .cache import get_weather_cache_store
+from .clients import get_mirror_client, get_mirror_directory
+from .parsers import (
+    NORMAL_YEAR_HOURS,
+    NORMAL_YEAR_MONTH_START_HOURS,
+    normal_year_hourly_index,
+)
 
 
 class WeatherSourceBase(object):
@@ -12,6 +16,22 @@ class WeatherSourceBase(object):
         self.station = station
         self.tempC = pd.Series(dtype=float)
 
+    @property
+    def json_store(self):
+        ''' Deprecated alias of :code:`cache_store`, the weather cache
+        store, which may not be a JSON store.
+        '''
+        return self.cache_store
+
+    @json_store.setter
+    def json_store(self, store):
+        self.cache_store = store
+
+    def nbytes(self):
+        ''' Approximate memory held by loaded temperature data, in bytes.
+        '''
+        return int(self.tempC.memory_usage(index=True))
+
     @staticmethod
     def _unit_convert(x, unit):
         if unit is None or unit == "degC":
@@ -29,8 +49,12 @@ class WeatherSourceBase(object):
 class NormalHourlyWeatherSourceBase(WeatherSourceBase):
     '''Base class for hourly-frequency normal weather sources.
 
-    Must define station_type and client class attributes. See TMY3WeatherSource
-    or CZ2010 classes as examples.
+    Must define station_type, client and mirror_client_class class
+    attributes. See TMY3WeatherSource or CZ2010 classes as examples.
+
+    If a mirror directory is given (or set with the
+    EEMETER_WEATHER_MIRROR_DIRECTORY environment variable), data is read
+    from the local mirror with :code:`mirror_client_class` instead.
     '''
 
     cache_date_format = "%Y%m%d%H"
@@ -38,12 +62,18 @@ class NormalHourlyWeatherSourceBase(WeatherSourceBase):
     freq = "H"
     # station_type = '...'  # inheriting classes should define this
     # client = XXXClient()  # client must define client.get_hourly_weather_normal_data(station)
+    # mirror_client_class = MirrorXXXClient  # takes a mirror directory
 
-    def __init__(self, station, cache_url=None, preload=True):
+    def __init__(self, station, cache_url=None, preload=True,
+                 cache_backend=None, mirror_directory=None):
         super(NormalHourlyWeatherSourceBase, self).__init__(station)
 
         self.station = station
-        self.json_store = SqlJSONStore(cache_url)
+        self.mirror_directory = get_mirror_directory(mirror_directory)
+        if self.mirror_directory is not None:
+            self.client = get_mirror_client(self.mirror_client_class,
+                                            self.mirror_directory)
+        self.cache_store = get_weather_cache_store(cache_url, cache_backend)
 
         self._check_station(station)
 
@@ -54,11 +84,27 @@ class NormalHourlyWeatherSourceBase(WeatherSourceBase):
         return '{}WeatherSource("{}")'.format(self.station_type, self.station)
 
     def _load_data(self):
-        if self.json_store.key_exists(self._get_cache_key()):
+        key = self._get_cache_key()
+        if self.cache_store.key_exists(key):
             self.tempC = self._load_cached_series()
-        else:
-            self.tempC = self.client.get_hourly_weather_normal_data(self.station)
-            self._save_series(self.tempC)
+            return
+        with self.cache_store.fetch_lock(key):
+            # another worker may have fetched the data while this one waited.
+            if self.cache_store.key_exists(key):
+                self.tempC = self._load_cached_series()
+            else:
+                self.tempC = self.client.get_hourly_weather_normal_data(
+                    self.station)
+                self._save_series(self.tempC)
+
+    @property
+    def tempC(self):
+        return self._tempC
+
+    @tempC.setter
+    def tempC(self, series):
+        self._tempC = series
+        self._aggregates = {}
 
     def _check_station(self, station):
         index = self.client._load_station_index()
@@ -70,41 +116,42 @@ class NormalHourlyWeatherSourceBase(WeatherSourceBase):
             raise ValueError(message)
 
     def _load_cached_series(self):
-        data = self.json_store.retrieve_json(self._get_cache_key())
-
-        index = pd.to_datetime([d[0] for d in data],
-                               format=self.cache_date_format, utc=True)
-        values = [d[1] for d in data]
-
-        # changed for pandas > 0.18
-        return pd.Series(values, index=index, dtype=float) \
-            .sort_index().resample(self.freq).mean()
+        return self.cache_store.retrieve_series(
+            self._get_cache_key(), self.freq, self.cache_date_format)
 
     def _save_series(self, series):
-        data = [
-            [
-                d.strftime(self.cache_date_format), t
-                if pd.notnull(t) else None
-            ]
-            for d, t in series.iteritems()
-        ]
-        self.json_store.save_json(self._get_cache_key(), data)
+        self.cache_store.save_series(self._get_cache_key(), series,
+                                     self.freq, self.cache_date_format)
 
     def _get_cache_key(self):
         return self.cache_key_format.format(self.station_type, self.station)
 
     @staticmethod
-    def _normalize_datetime(dt, year_offset=0):
-        return datetime(1900 + year_offset, dt.month, dt.day, dt.hour,
-                        dt.minute, dt.second, tzinfo=pytz.UTC)
-
-    @staticmethod
-    def _get_loffset(timestamp):
-        t = timestamp.time()
-        return datetime.combine(date(1, 1, 1), t) - datetime(1, 1, 1, 0, 0, 0)
-
-    def _normalize_index(self, index):
-        return pd.DatetimeIndex([self._normalize_datetime(dt) for dt in index])
+    def _normal_year_positions(index, freq):
+        # positions of index timestamps in the hourly ('H') or daily ('D')
+        # arrays of normal year (1900) values, using month, day and hour
+        # fields in the time zone of the index. Returns positions along with
+        # a mask of the timestamps which have a matching normal year value.
+        months = np.asarray(index.month)
+        days = np.asarray(index.day)
+        if np.any((months == 2) & (days == 29)):
+            raise ValueError("day is out of range for month")
+
+        hours = np.asarray(index.hour)
+        day_positions = NORMAL_YEAR_MONTH_START_HOURS[months - 1] // 24 + \
+            days - 1
+        offsets = (
+            (np.asarray(index.minute) * 60 + np.asarray(index.second)) *
+            1000000 + np.asarray(index.microsecond)
+        )
+
+        if freq == 'H':
+            return day_positions * 24 + hours, offsets == 0
+        else:
+            # daily values are labeled with the time of day of the first
+            # timestamp.
+            offsets = offsets + hours * 3600000000
+            return day_positions, offsets == offsets[0]
 
     def indexed_temperatures(self, index, unit):
         ''' Return average temperatures over the given index.
@@ -135,16 +182,34 @@ class NormalHourlyWeatherSourceBase(WeatherSourceBase):
             )
             raise ValueError(message)
 
+    def _aggregate(self, freq, unit):
+        # normal year hourly or daily values as an array, cached until tempC
+        # is replaced.
+        key = (freq, unit)
+        if key not in self._aggregates:
+            hourly = self.tempC.reindex(normal_year_hourly_index())
+            values = hourly.values.astype(float)
+            if freq == 'D':
+                # mean of non-null hourly values in each day.
+                shape = (NORMAL_YEAR_HOURS // 24, 24)
+                notnull = ~np.isnan(values)
+                sums = np.where(notnull, values, 0).reshape(shape).sum(axis=1)
+                counts = notnull.reshape(shape).sum(axis=1)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values = sums / counts
+            self._aggregates[key] = self._unit_convert(values, unit)
+        return self._aggregates[key]
+
+    def _normal_year_indexed_temperatures(self, index, unit, freq):
+        temps = np.empty(index.shape[0])
+        temps.fill(np.nan)
+        if index.shape[0] > 0:
+            positions, valid = self._normal_year_positions(index, freq)
+            temps[valid] = self._aggregate(freq, unit)[positions[valid]]
+        return pd.Series(temps, index=index, dtype=float)
+
     def _daily_indexed_temperatures(self, index, unit):
-        normalized_index = self._normalize_index(index)
-        loffset = self._get_loffset(normalized_index[0])
-        tempC = self.tempC.resample('D', loffset=loffset) \
-            .mean()[normalized_index]
-        tempC.index = index
-        return self._unit_convert(tempC, unit)
+        return self._normal_year_indexed_temperatures(index, unit, 'D')
 
     def _hourly_indexed_temperatures(self, index, unit):
-        normalized_index = self._normalize_index(index)
-        tempC = self.tempC.resample('H').mean()[normalized_index]
-        tempC.index = index
-        return self._unit_convert(tempC, unit)
+        return self._normal_year_indexed_temperatures(index, unit, 'H')
@@ -1,20 +1,119 @@
+from contextlib import contextmanager
+from datetime import timedelta
 import os
 import json
+import re
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytz
 from sqlalchemy import (
-    create_engine,
+    inspect,
     Table,
     MetaData,
     Column,
     Integer,
+    LargeBinary,
     String,
     DateTime,
 )
-from sqlalchemy.sql import select, func
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import cast, select, func
+
+from eemeter.cache import get_engine, key_lock, upsert
+
+
+def get_weather_cache_store(url=None, backend=None):
+    ''' Create the weather cache store for a cache database.
+
+    Parameters
+    ----------
+    url : str, default None
+        SQLAlchemy compatible database URL. If None, uses the
+        EEMETER_WEATHER_CACHE_URL environment variable or the default SQLite
+        database at :code:`~/.eemeter/cache/weather_cache.db`.
+    backend : str, {"binary", "json"}, default None
+        Storage format for cached series. If None, uses the
+        EEMETER_WEATHER_CACHE_BACKEND environment variable, falling back to
+        "binary".
+
+    Returns
+    -------
+    store : eemeter.weather.cache.SqlBinaryStore or eemeter.weather.cache.SqlJSONStore
+    '''
+    if backend is None:
+        backend = os.environ.get("EEMETER_WEATHER_CACHE_BACKEND", "binary")
+
+    if backend == "binary":
+        return SqlBinaryStore(url)
+    elif backend == "json":
+        return SqlJSONStore(url)
+    else:
+        message = (
+            'Weather cache backend not supported ({}).'
+            ' Use "binary" or "json".'
+            .format(backend)
+        )
+        raise ValueError(message)
 
 
 class SqlJSONStore(object):
+    ''' Weather cache store which keeps each series as JSON.
+
+    Stores for the same database URL share an engine (see
+    :code:`eemeter.cache.get_engine`), and writes are atomic, so stores can
+    be used from several threads and processes at once.
+
+    The time each key was last accessed is recorded, so that the cache can
+    be kept under a size or age cap by evicting the least recently used
+    station-years (see :code:`evict`). Weather normals are never evicted.
+
+    Parameters
+    ----------
+    url : str, default None
+        SQLAlchemy compatible database URL.
+    max_size : int, default None
+        Cap on the total size of cached data, in bytes. If None, uses the
+        EEMETER_WEATHER_CACHE_MAX_SIZE_MB environment variable (in
+        megabytes), if set.
+    max_age : datetime.timedelta, default None
+        Cap on the time since cached data was last accessed. If None, uses
+        the EEMETER_WEATHER_CACHE_MAX_AGE_DAYS environment variable, if set.
+    '''
+
+    # bound on the number of keys in a single IN clause; SQLite limits the
+    # number of query parameters.
+    max_keys_per_query = 500
+
+    # keys of weather normals, which are never evicted.
+    pinned_key_prefixes = ("TMY3-", "CZ2010-")
+
+    # keys belonging to a station-year, which are evicted together.
+    station_year_key_pattern = re.compile(
+        r'^(?:import-)?((?:ISD|GSOD)-[^-]+-\d{4})')
+
+    # seconds between updates of the recorded access time of a key by a
+    # store.
+    access_resolution = 3600
+
+    # number of writes between checks of the size and age caps.
+    eviction_interval = 100
 
-    def __init__(self, url=None):
+    def __init__(self, url=None, max_size=None, max_age=None):
+        if max_size is None:
+            max_size_mb = os.environ.get("EEMETER_WEATHER_CACHE_MAX_SIZE_MB")
+            if max_size_mb is not None:
+                max_size = int(float(max_size_mb) * 1e6)
+        if max_age is None:
+            max_age_days = os.environ.get("EEMETER_WEATHER_CACHE_MAX_AGE_DAYS")
+            if max_age_days is not None:
+                max_age = timedelta(days=float(max_age_days))
+        self.max_size = max_size
+        self.max_age = max_age
+        self._accessed = {}
+        self._writes = 0
         self._prepare_db(url)
 
     def __repr__(self):
@@ -35,8 +134,9 @@ class SqlJSONStore(object):
 
         self.url = url
 
-        eng = create_engine(url)
+        eng = get_engine(url)
         metadata = MetaData(eng)
+        self.engine = eng
 
         tbl_items = Table(
             "items",
@@ -44,26 +144,137 @@ class SqlJSONStore(object):
             Column("id", Integer, primary_key=True),
             Column("data", String),
             Column("key", String, unique=True),
-            Column("dt", DateTime)
+            Column("dt", DateTime),
+            Column("accessed", DateTime)
         )
 
         tbl_items.create(checkfirst=True)
+        self._add_missing_columns(tbl_items)
 
         self.items = tbl_items
+        self.tables = [tbl_items]
+
+    def _add_missing_columns(self, table):
+        # columns added since the table was created in an existing cache.
+        def _missing():
+            existing = set(
+                c["name"] for c in inspect(self.engine).get_columns(table.name))
+            return [c for c in table.columns if c.name not in existing]
+
+        for column in _missing():
+            try:
+                self.engine.execute("ALTER TABLE {} ADD COLUMN {} {}".format(
+                    table.name, column.name,
+                    column.type.compile(dialect=self.engine.dialect)))
+            except DBAPIError:
+                # another process may have added it first.
+                if column.name in [c.name for c in _missing()]:
+                    raise
+
+    def _record_access(self, table, key):
+        # throttled, so that reads rarely cause writes.
+        now = time.time()
+        last = self._accessed.get((table.name, key))
+        if last is None or now - last > self.access_resolution:
+            s = table.update().where(table.c.key == key) \
+                .values(accessed=func.now())
+            self.engine.execute(s)
+            self._accessed[(table.name, key)] = now
+
+    def _after_write(self, n=1):
+        self._writes += n
+        if self._writes >= self.eviction_interval:
+            self._writes = 0
+            if self.max_size is not None or self.max_age is not None:
+                self.evict()
 
     def key_exists(self, key):
         s = select([self.items.c.key]).where(self.items.c.key == key)
         result = s.execute()
         return result.fetchone() is not None
 
+    def existing_keys(self, keys):
+        ''' Return the subset of :code:`keys` which are in the store.
+        '''
+        return self._existing_keys(self.items, keys)
+
+    def _existing_keys(self, table, keys):
+        keys = list(keys)
+        existing = set()
+        for i in range(0, len(keys), self.max_keys_per_query):
+            chunk = keys[i:i + self.max_keys_per_query]
+            s = select([table.c.key]).where(table.c.key.in_(chunk))
+            existing.update(row[0] for row in s.execute())
+        return existing
+
+    def _replace_rows(self, table, rows, conn=None):
+        # delete and reinsert all rows in a single transaction, or in the
+        # given one.
+        if len(rows) == 0:
+            return
+        if conn is None:
+            with self.transaction() as conn:
+                self._replace_rows(table, rows, conn)
+            return
+        keys = [row["key"] for row in rows]
+        for i in range(0, len(keys), self.max_keys_per_query):
+            chunk = keys[i:i + self.max_keys_per_query]
+            conn.execute(table.delete().where(table.c.key.in_(chunk)))
+        conn.execute(
+            table.insert().values(dt=func.now(), accessed=func.now()),
+            rows)
+        self._writes += len(rows)
+
+    @contextmanager
+    def transaction(self):
+        ''' Context manager for a transaction in which several
+        :code:`save_json_many` and :code:`save_series_many` writes are
+        committed together, e.g.:
+
+        .. code-block:: python
+
+            >>> with store.transaction() as conn:
+            ...     store.save_series_many(series_items, 'H', date_format,
+            ...                            conn=conn)
+            ...     store.save_json_many(json_items, conn=conn)
+
+        Yields
+        ------
+        conn : sqlalchemy.engine.Connection
+            Connection to pass to the writes.
+        '''
+        with self.engine.begin() as conn:
+            yield conn
+        # size and age caps are checked once the writes are committed.
+        self._after_write(0)
+
+    def fetch_lock(self, key):
+        ''' Context manager holding an exclusive lock on :code:`key` across
+        threads and processes (see :code:`eemeter.cache.key_lock`), so that
+        only one worker fetches the data for a key while others wait.
+        '''
+        return key_lock(self.url, key)
+
     def save_json(self, key, data):
         data = json.dumps(data)
-        if self.key_exists(key):
-            s = self.items.update().where(self.items.c.key == key).values(
-                key=key, data=data, dt=func.now())
-        else:
-            s = self.items.insert().values(key=key, data=data, dt=func.now())
-        s.execute()
+        upsert(self.engine, self.items, self.items.c.key == key,
+               dict(key=key, data=data, dt=func.now(), accessed=func.now()))
+        self._after_write()
+
+    def save_json_many(self, items, conn=None):
+        ''' Save many JSON-serializable values in a single transaction.
+
+        Parameters
+        ----------
+        items : list of (str, object)
+            :code:`(key, data)` pairs.
+        conn : sqlalchemy.engine.Connection, default None
+            Connection of a transaction (see :code:`transaction`) to write
+            in. If None, the values are committed in a transaction of their
+            own.
+        '''
+        rows = [dict(key=key, data=json.dumps(data)) for key, data in items]
+        self._replace_rows(self.items, rows, conn)
 
     def retrieve_json(self, key):
         s = select([self.items.c.data]).where(self.items.c.key == key)
@@ -72,8 +283,23 @@ class SqlJSONStore(object):
         if data is None:
             return None
         else:
+            self._record_access(self.items, key)
             return json.loads(data[0])
 
+    def retrieve_json_many(self, keys):
+        ''' Return stored values keyed by key for those of :code:`keys`
+        which are in the store.
+        '''
+        keys = list(keys)
+        result = {}
+        for i in range(0, len(keys), self.max_keys_per_query):
+            chunk = keys[i:i + self.max_keys_per_query]
+            s = select([self.items.c.key, self.items.c.data]) \
+                .where(self.items.c.key.in_(chunk))
+            for key, data in s.execute():
+                result[key] = json.loads(data)
+        return result
+
     def retrieve_datetime(self, key):
         s = select([self.items.c.dt]).where(self.items.c.key == key)
         result = s.execute()
@@ -83,9 +309,482 @@ class SqlJSONStore(object):
         else:
             return data[0]
 
+    @staticmethod
+    def _series_to_json(series, date_format):
+        return [
+            [
+                d.strftime(date_format), t
+                if pd.notnull(t) else None
+            ]
+            for d, t in series.items()
+        ]
+
+    def save_series(self, key, series, freq, date_format):
+        self.save_json(key, self._series_to_json(series, date_format))
+
+    def save_series_many(self, items, freq, date_format, conn=None):
+        ''' Save many series in a single transaction.
+
+        Parameters
+        ----------
+        items : list of (str, pandas.Series)
+            :code:`(key, series)` pairs.
+        conn : sqlalchemy.engine.Connection, default None
+            Connection of a transaction (see :code:`transaction`) to write
+            in. If None, the series are committed in a transaction of their
+            own.
+        '''
+        self.save_json_many([
+            (key, self._series_to_json(series, date_format))
+            for key, series in items
+        ], conn)
+
+    def retrieve_series(self, key, freq, date_format):
+        data = self.retrieve_json(key)
+        if data is None:
+            return None
+
+        index = pd.to_datetime([d[0] for d in data],
+                               format=date_format, utc=True)
+        values = [d[1] for d in data]
+
+        # changed for pandas > 0.18
+        return pd.Series(values, index=index, dtype=float) \
+            .sort_index().resample(freq).mean()
+
+    def touch(self, key):
+        s = self.items.update().where(self.items.c.key == key).values(
+            dt=func.now())
+        s.execute()
+
+    def append_series(self, key, series, freq, date_format):
+        ''' Merge newer observations into a cached series. Values in
+        :code:`series` take precedence over cached values. If
+        :code:`series` is empty, only the fetch timestamp is updated.
+
+        The merge reads and rewrites the cached series, so concurrent
+        appends to a key should hold :code:`fetch_lock(key)`.
+        '''
+        if series.shape[0] == 0:
+            self.touch(key)
+            return
+
+        cached = self.retrieve_series(key, freq, date_format)
+        if cached is not None:
+            series = series.combine_first(cached)
+        self.save_series(key, series, freq, date_format)
+
     def clear(self, key=None):
         if key is None:
             s = self.items.delete()
         else:
             s = self.items.delete().where(self.items.c.key == key)
         s.execute()
+
+    def size(self):
+        ''' Total size of cached data, in bytes.
+        '''
+        total = 0
+        for table in self.tables:
+            s = select([func.sum(func.length(table.c.data))])
+            total += self.engine.execute(s).scalar() or 0
+        return int(total)
+
+    def _eviction_group(self, key):
+        # station-year of a key, or the key itself.
+        match = self.station_year_key_pattern.match(key)
+        return key if match is None else match.group(1)
+
+    def evict(self, max_size=None, max_age=None):
+        ''' Evict cached data over size and age caps, least recently accessed
+        station-years first. All keys of a station-year (e.g., hourly data,
+        daily aggregates and import records) are evicted together. Weather
+        normals are never evicted.
+
+        This is run automatically, with the caps of the store, every
+        :code:`eviction_interval` writes.
+
+        Parameters
+        ----------
+        max_size : int, default None
+            Cap on the total size of cached data, in bytes. If None, uses
+            the cap of the store.
+        max_age : datetime.timedelta, default None
+            Cap on the time since cached data was last accessed. If None,
+            uses the cap of the store.
+
+        Returns
+        -------
+        report : dict
+            - :code:`"evicted"`: evicted keys.
+            - :code:`"bytes_freed"`: size of evicted data, in bytes.
+        '''
+        if max_size is None:
+            max_size = self.max_size
+        if max_age is None:
+            max_age = self.max_age
+
+        report = {"evicted": [], "bytes_freed": 0}
+        if max_size is None and max_age is None:
+            return report
+
+        with self.engine.begin() as conn:
+            now = conn.execute(select([func.now()])).scalar()
+
+            # (keys, size, last access) by group.
+            groups = {}
+            total = 0
+            for table in self.tables:
+                s = select([
+                    table.c.key,
+                    func.length(table.c.data),
+                    func.coalesce(table.c.accessed, table.c.dt),
+                ])
+                for key, size, accessed in conn.execute(s):
+                    size = size or 0
+                    total += size
+                    if key.startswith(self.pinned_key_prefixes):
+                        continue
+                    keys, group_size, last = groups.get(
+                        self._eviction_group(key), ([], 0, None))
+                    keys.append(key)
+                    if last is None or (accessed is not None and
+                                        accessed > last):
+                        last = accessed
+                    groups[self._eviction_group(key)] = \
+                        (keys, group_size + size, last)
+
+            # least recently accessed first; never accessed first of all.
+            ordered = sorted(
+                groups.values(),
+                key=lambda g: (g[2] is not None, g[2] or now))
+
+            evicted = []
+            for keys, group_size, last in ordered:
+                too_old = max_age is not None and \
+                    (last is None or last < now - max_age)
+                too_big = max_size is not None and total > max_size
+                if not (too_old or too_big):
+                    continue
+                evicted.extend(keys)
+                total -= group_size
+                report["bytes_freed"] += group_size
+
+            for table in self.tables:
+                for i in range(0, len(evicted), self.max_keys_per_query):
+                    chunk = evicted[i:i + self.max_keys_per_query]
+                    conn.execute(table.delete().where(table.c.key.in_(chunk)))
+
+        report["evicted"] = evicted
+        return report
+
+    def _database_size(self):
+        # bytes used by a SQLite database, or None.
+        if self.engine.dialect.name != "sqlite":
+            return None
+        page_count = self.engine.execute("PRAGMA page_count").scalar()
+        page_size = self.engine.execute("PRAGMA page_size").scalar()
+        return page_count * page_size
+
+    def compact(self, max_size=None, max_age=None):
+        ''' Evict cached data over size and age caps (see :code:`evict`),
+        then reclaim the space it used by vacuuming the database (SQLite
+        and PostgreSQL only).
+
+        Parameters
+        ----------
+        max_size : int, default None
+            Cap on the total size of cached data, in bytes. If None, uses
+            the cap of the store.
+        max_age : datetime.timedelta, default None
+            Cap on the time since cached data was last accessed. If None,
+            uses the cap of the store.
+
+        Returns
+        -------
+        report : dict
+            As for :code:`evict`, along with :code:`"size_before"` and
+            :code:`"size_after"`, the size of the database file in bytes
+            before and after compaction (None except for SQLite).
+        '''
+        size_before = self._database_size()
+        report = self.evict(max_size, max_age)
+
+        dialect = self.engine.dialect.name
+        if dialect == "sqlite":
+            with self.engine.connect() as conn:
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        elif dialect == "postgresql":
+            with self.engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT") \
+                    .execute("VACUUM")
+
+        report["size_before"] = size_before
+        report["size_after"] = self._database_size()
+        return report
+
+
+class SqlBinaryStore(SqlJSONStore):
+    ''' Weather cache store which keeps each series as a start timestamp,
+    a frequency and a packed array of values, so that cached series can be
+    decoded with :code:`np.frombuffer` instead of parsing date strings.
+
+    Series cached by :code:`SqlJSONStore` in the same database are migrated
+    to the binary format the first time they are retrieved.
+
+    Trailing nulls are not stored, so that observations newer than the last
+    cached one can be appended in place as an additional (compressed) chunk
+    without rewriting the values already stored.
+
+    Parameters
+    ----------
+    url : str, default None
+        SQLAlchemy compatible database URL.
+    dtype : str, {"float64", "float32"}, default "float64"
+        Data type of packed values.
+    compress : bool, default True
+        If True, compresses packed values with zlib.
+    max_size : int, default None
+        Cap on the total size of cached data, in bytes.
+    max_age : datetime.timedelta, default None
+        Cap on the time since cached data was last accessed.
+    '''
+
+    def __init__(self, url=None, dtype='float64', compress=True,
+                 max_size=None, max_age=None):
+        self.dtype = np.dtype(dtype).name
+        self.compress = compress
+        super(SqlBinaryStore, self).__init__(url, max_size, max_age)
+
+    def __repr__(self):
+        return 'SqlBinaryStore("{}")'.format(self.url)
+
+    def _prepare_db(self, url=None):
+        super(SqlBinaryStore, self)._prepare_db(url)
+
+        tbl_series = Table(
+            "series",
+            self.items.metadata,
+            Column("id", Integer, primary_key=True),
+            Column("key", String, unique=True),
+            Column("start", DateTime),
+            Column("freq", String),
+            Column("dtype", String),
+            Column("compression", String),
+            Column("length", Integer),
+            Column("data", LargeBinary),
+            Column("dt", DateTime),
+            Column("accessed", DateTime)
+        )
+
+        tbl_series.create(checkfirst=True)
+        self._add_missing_columns(tbl_series)
+
+        self.series = tbl_series
+        self.tables = [tbl_series] + self.tables
+
+    def _series_key_exists(self, key):
+        s = select([self.series.c.key]).where(self.series.c.key == key)
+        result = s.execute()
+        return result.fetchone() is not None
+
+    def key_exists(self, key):
+        return self._series_key_exists(key) or \
+            super(SqlBinaryStore, self).key_exists(key)
+
+    def existing_keys(self, keys):
+        keys = list(keys)
+        return self._existing_keys(self.series, keys) | \
+            super(SqlBinaryStore, self).existing_keys(keys)
+
+    def retrieve_datetime(self, key):
+        s = select([self.series.c.dt]).where(self.series.c.key == key)
+        result = s.execute()
+        data = result.fetchone()
+        if data is None:
+            return super(SqlBinaryStore, self).retrieve_datetime(key)
+        else:
+            return data[0]
+
+    @property
+    def _compression(self):
+        return "zlib" if self.compress else None
+
+    def _encode(self, values):
+        data = values.astype(self.dtype).tobytes()
+        if self.compress:
+            data = zlib.compress(data)
+        return data
+
+    @staticmethod
+    def _decompress(data):
+        # appended chunks are compressed separately.
+        chunks = []
+        while data:
+            decompressor = zlib.decompressobj()
+            chunks.append(decompressor.decompress(data))
+            data = decompressor.unused_data
+        return b''.join(chunks)
+
+    @staticmethod
+    def _trim(series, freq):
+        if series.index.freq is None or series.index.freqstr != freq:
+            series = series.sort_index().resample(freq).mean()
+        last_valid = series.last_valid_index()
+        if last_valid is None:
+            return series[:0]
+        return series[:last_valid]
+
+    def _series_row(self, key, series, freq):
+        if series.shape[0] > 0:
+            series = self._trim(series, freq)
+
+        if series.shape[0] == 0:
+            start = None
+        else:
+            start = series.index[0].tz_convert(pytz.UTC).tz_localize(None) \
+                .to_pydatetime()
+
+        return dict(key=key, start=start, freq=freq, dtype=self.dtype,
+                    compression=self._compression, length=series.shape[0],
+                    data=self._encode(series.values))
+
+    def save_series(self, key, series, freq, date_format):
+        self._save_series_row(key, series, freq, func.now())
+
+    def _save_series_row(self, key, series, freq, dt):
+        values = self._series_row(key, series, freq)
+        values["dt"] = dt
+        values["accessed"] = func.now()
+        upsert(self.engine, self.series, self.series.c.key == key, values)
+        self._after_write()
+
+    def save_series_many(self, items, freq, date_format, conn=None):
+        ''' Save many series in a single transaction.
+
+        Parameters
+        ----------
+        items : list of (str, pandas.Series)
+            :code:`(key, series)` pairs.
+        conn : sqlalchemy.engine.Connection, default None
+            Connection of a transaction (see :code:`transaction`) to write
+            in. If None, the series are committed in a transaction of their
+            own.
+        '''
+        rows = [self._series_row(key, series, freq) for key, series in items]
+        self._replace_rows(self.series, rows, conn)
+
+    def retrieve_series(self, key, freq, date_format):
+        s = select([
+            self.series.c.start,
+            self.series.c.freq,
+            self.series.c.dtype,
+            self.series.c.compression,
+            self.series.c.data,
+        ]).where(self.series.c.key == key)
+        result = s.execute()
+        row = result.fetchone()
+        if row is None:
+            return self._migrate_json_series(key, freq, date_format)
+
+        self._record_access(self.series, key)
+        start, stored_freq, dtype, compression, data = row
+        if compression == "zlib":
+            data = self._decompress(data)
+        values = np.frombuffer(data, dtype=dtype).astype(float)
+
+        if start is None:
+            index = pd.DatetimeIndex([], tz=pytz.UTC)
+        else:
+            index = pd.date_range(start, periods=values.shape[0],
+                                  freq=stored_freq, tz=pytz.UTC)
+        series = pd.Series(values, index=index, dtype=float)
+
+        if stored_freq != freq:
+            series = series.resample(freq).mean()
+        return series
+
+    def touch(self, key):
+        if self._series_key_exists(key):
+            s = self.series.update().where(self.series.c.key == key) \
+                .values(dt=func.now())
+            s.execute()
+        else:
+            super(SqlBinaryStore, self).touch(key)
+
+    def append_series(self, key, series, freq, date_format):
+        ''' Merge newer observations into a cached series. Values in
+        :code:`series` take precedence over cached values. If
+        :code:`series` is empty, only the fetch timestamp is updated.
+
+        If :code:`series` starts right after the last stored value, only
+        its values are encoded and appended to the stored data; otherwise
+        the merged series is rewritten.
+        '''
+        if series.shape[0] > 0:
+            series = self._trim(series, freq)
+        if series.shape[0] == 0:
+            self.touch(key)
+            return
+
+        # read the stored row and append to it in one transaction, so that
+        # concurrent appends can't both extend the same stored length.
+        with self.engine.begin() as conn:
+            s = select([
+                self.series.c.start,
+                self.series.c.freq,
+                self.series.c.dtype,
+                self.series.c.compression,
+                self.series.c.length,
+            ]).where(self.series.c.key == key)
+            row = conn.execute(s).fetchone()
+
+            if row is not None:
+                start, stored_freq, dtype, compression, length = row
+                appendable = (
+                    start is not None and
+                    length is not None and
+                    stored_freq == freq and
+                    dtype == self.dtype and
+                    compression == self._compression
+                )
+                if appendable:
+                    end = pd.Timestamp(start, tz=pytz.UTC) + \
+                        length * pd.Timedelta(1, unit=freq)
+                    if series.index[0] == end:
+                        s = self.series.update() \
+                            .where(self.series.c.key == key) \
+                            .values(
+                                data=cast(self.series.c.data.concat(
+                                    self._encode(series.values)),
+                                    LargeBinary),
+                                length=self.series.c.length +
+                                series.shape[0],
+                                dt=func.now(),
+                                accessed=func.now())
+                        conn.execute(s)
+                        return
+
+        super(SqlBinaryStore, self).append_series(
+            key, series, freq, date_format)
+
+    def _migrate_json_series(self, key, freq, date_format):
+        # one-time conversion of a series cached by SqlJSONStore.
+        series = super(SqlBinaryStore, self).retrieve_series(
+            key, freq, date_format)
+        if series is not None:
+            # keep the original fetch time, so stale data is still refreshed.
+            dt = super(SqlBinaryStore, self).retrieve_datetime(key)
+            self._save_series_row(key, series, freq,
+                                  func.now() if dt is None else dt)
+            super(SqlBinaryStore, self).clear(key)
+        return series
+
+    def clear(self, key=None):
+        if key is None:
+            s = self.series.delete()
+        else:
+            s = self.series.delete().where(self.series.c.key == key)
+        s.execute()
+        super(SqlBinaryStore, self).clear(key)
@@ -1,170 +1,217 @@
 import ftplib
 import gzip
 from io import BytesIO
-import json
 import logging
-from pkg_resources import resource_stream
+import os
+import threading
 import warnings
-from datetime import datetime, timedelta
 
-import pytz
 import pandas as pd
-import requests
+
+from eemeter.resources.stations import (
+    cz2010_stations,
+    isd_stations,
+    tmy3_stations,
+)
+from .fetch import FTPConnectionPool, fetch_many, get_http_session
+from .parsers import (
+    normal_year_hourly_index,
+    parse_gsod_data,
+    parse_isd_data,
+    parse_tmy3_data,
+)
 
 logger = logging.getLogger(__name__)
 
+_mirror_clients = {}
+_mirror_clients_lock = threading.Lock()
+
+
+def get_mirror_directory(directory=None):
+    ''' Resolve the local weather data mirror directory.
+
+    Parameters
+    ----------
+    directory : str, default None
+        Mirror root directory. If None, uses the
+        EEMETER_WEATHER_MIRROR_DIRECTORY environment variable.
+
+    Returns
+    -------
+    directory : str or None
+        Mirror root directory, or None if no mirror is configured.
+    '''
+    if directory is None:
+        directory = os.environ.get("EEMETER_WEATHER_MIRROR_DIRECTORY")
+    return directory
+
+
+def get_mirror_client(client_class, directory):
+    ''' Return the shared mirror client of the given class for a mirror
+    directory, so that station indexes are loaded once per process.
+    '''
+    key = (client_class, os.path.abspath(directory))
+    with _mirror_clients_lock:
+        if key not in _mirror_clients:
+            _mirror_clients[key] = client_class(directory)
+        return _mirror_clients[key]
+
 
 class NOAAClient(object):
 
-    def __init__(self, n_tries=3):
+    def __init__(self, n_tries=3, max_connections=4):
         self.n_tries = n_tries
-        self.ftp = None  # lazily load
+        self.ftp_pool = FTPConnectionPool(
+            "ftp.ncdc.noaa.gov", max_connections, n_tries)
         self.station_index = None  # lazily load
-
-    def _get_ftp_connection(self):
-        for _ in range(self.n_tries):
-            try:
-                ftp = ftplib.FTP("ftp.ncdc.noaa.gov")
-            except ftplib.all_errors as e:
-                logger.warn("FTP connection issue: %s", e)
-            else:
-                logger.info(
-                    "Successfully established connection to ftp.ncdc.noaa.gov."
-                )
-                try:
-                    ftp.login()
-                except ftplib.all_errors as e:
-                    logger.warn("FTP login issue: %s", e)
-                else:
-                    logger.info(
-                        "Successfully logged in to ftp.ncdc.noaa.gov."
-                    )
-                    return ftp
-        raise RuntimeError("Couldn't establish an FTP connection.")
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
 
     def _load_station_index(self):
         if self.station_index is None:
-            with resource_stream('eemeter.resources',
-                                 'GSOD-ISD_station_index.json') as f:
-                self.station_index = json.loads(f.read().decode("utf-8"))
+            self.station_index = isd_stations
         return self.station_index
 
     def _get_potential_station_ids(self, station):
-        self._load_station_index()
-
-        if len(station) == 6:
-            potential_station_ids = self.station_index[station]
-        else:
-            potential_station_ids = [station]
-        return potential_station_ids
+        return self._load_station_index().aliases(station)
 
-    def _retreive_file_lines(self, filename_format, station, year):
+    def _retrbinary(self, filename):
         string = BytesIO()
+        with self.ftp_pool.connection() as ftp:
+            ftp.retrbinary('RETR {}'.format(filename), string.write)
+        data = string.getvalue()
+        with self._lock:
+            self.bytes_transferred += len(data)
+        return data
 
-        if self.ftp is None:
-            self.ftp = self._get_ftp_connection()
+    def _retreive_file_data(self, filename_format, station, year):
+        data = None
+        connection_error = None
 
         for station_id in self._get_potential_station_ids(station):
             filename = filename_format.format(station=station_id, year=year)
             try:
-                self.ftp.retrbinary('RETR {}'.format(filename), string.write)
+                data = self._retrbinary(filename)
             except (IOError, ftplib.error_perm) as e1:
                 logger.warn(
                     "Failed FTP RETR for station {}: {}."
                     " Not attempting reconnect."
                     .format(station_id, e1)
                 )
+                if not isinstance(e1, ftplib.error_perm):
+                    connection_error = e1
             except (ftplib.error_temp, EOFError) as e2:
-                # Bad connection. attempt to reconnect.
+                # Bad connection (dropped by the pool). attempt to reconnect.
                 logger.warn(
                     "Failed FTP RETR for station {}: {}."
                     " Attempting reconnect."
                     .format(station_id, e2)
                 )
-                self.ftp.close()
-                self.ftp = self._get_ftp_connection()
                 try:
-                    self.ftp.retrbinary('RETR {}'.format(filename),
-                                        string.write)
-                except (IOError, ftplib.error_perm) as e3:
+                    data = self._retrbinary(filename)
+                except (IOError, ftplib.error_perm, ftplib.error_temp,
+                        EOFError) as e3:
                     logger.warn(
                         "Failed FTP RETR for station {}: {}."
                         " Trying another station id."
                         .format(station_id, e3)
                     )
+                    if not isinstance(e3, ftplib.error_perm):
+                        connection_error = e3
                 else:
                     break
             else:
                 break
 
+        if data is None:
+            if connection_error is not None:
+                # let callers retry instead of caching an empty year.
+                message = (
+                    "Couldn't retrieve {} data for station {}: {}"
+                    .format(year, station, connection_error)
+                )
+                raise RuntimeError(message)
+            data = b''
+
         logger.info(
             'Successfully retrieved ftp://ftp.ncdc.noaa.gov{}'
             .format(filename)
         )
 
-        string.seek(0)
-        f = gzip.GzipFile(fileobj=string)
-        lines = f.readlines()
-        string.close()
-        return lines
+        f = gzip.GzipFile(fileobj=BytesIO(data))
+        return f.read()
+
+    def _retreive_file_lines(self, filename_format, station, year):
+        data = self._retreive_file_data(filename_format, station, year)
+        return data.splitlines(True)
 
     def get_gsod_data(self, station, year):
 
         filename_format = '/pub/data/gsod/{year}/{station}-{year}.op.gz'
-        lines = self._retreive_file_lines(filename_format, station, year)
-
-        dates = pd.date_range("{}-01-01 00:00".format(year),
-                              "{}-12-31 00:00".format(year),
-                              freq='D', tz=pytz.UTC)
-        series = pd.Series(None, index=dates, dtype=float)
-
-        for line in lines[1:]:
-            columns = line.split()
-            date_str = columns[2].decode('utf-8')
-            temp_F = float(columns[3])
-            temp_C = (5. / 9.) * (temp_F - 32.)
-            dt = pytz.UTC.localize(datetime.strptime(date_str, "%Y%m%d"))
-            series[dt] = temp_C
-
-        return series
+        data = self._retreive_file_data(filename_format, station, year)
+        return parse_gsod_data(data, year)
 
     def get_isd_data(self, station, year):
 
         filename_format = '/pub/data/noaa/{year}/{station}-{year}.gz'
-        lines = self._retreive_file_lines(filename_format, station, year)
-
-        dates = pd.date_range("{}-01-01 00:00".format(year),
-                              "{}-12-31 23:00".format(int(year) + 1),
-                              freq='H', tz=pytz.UTC)
-        series = pd.Series(None, index=dates, dtype=float)
-
-        for line in lines:
-            if line[87:92].decode('utf-8') == "+9999":
-                temp_C = float("nan")
-            else:
-                temp_C = float(line[87:92]) / 10.
-            date_str = line[15:27].decode('utf-8')
-
-            # there can be multiple readings per hour, so set all to minute 0
-            dt = pytz.UTC.localize(datetime.strptime(date_str, "%Y%m%d%H%M")).replace(minute=0)
-
-            # only set the temp if it's the first encountered in the hour.
-            if pd.isnull(series.ix[dt]):
-                series[dt] = temp_C
-
-        return series
+        data = self._retreive_file_data(filename_format, station, year)
+        return parse_isd_data(data, year)
+
+    def get_gsod_data_many(self, station_years, max_workers=8):
+        ''' Fetch GSOD data for many (station, year) pairs concurrently
+        over pooled FTP connections.
+
+        Parameters
+        ----------
+        station_years : list of (str, int)
+            (station, year) pairs to fetch.
+        max_workers : int, default 8
+            Number of concurrent fetches.
+
+        Returns
+        -------
+        results : dict
+            Daily temperature series keyed by (station, year).
+        failures : dict
+            Exceptions keyed by (station, year) for pairs which could not
+            be fetched after retrying.
+        '''
+        return fetch_many(self.get_gsod_data, station_years, max_workers,
+                          self.n_tries)
+
+    def get_isd_data_many(self, station_years, max_workers=8):
+        ''' Fetch ISD data for many (station, year) pairs concurrently
+        over pooled FTP connections.
+
+        Parameters
+        ----------
+        station_years : list of (str, int)
+            (station, year) pairs to fetch.
+        max_workers : int, default 8
+            Number of concurrent fetches.
+
+        Returns
+        -------
+        results : dict
+            Hourly temperature series keyed by (station, year).
+        failures : dict
+            Exceptions keyed by (station, year) for pairs which could not
+            be fetched after retrying.
+        '''
+        return fetch_many(self.get_isd_data, station_years, max_workers,
+                          self.n_tries)
 
 
 class TMY3Client(object):
 
     def __init__(self):
         self.station_index = None  # lazily load
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
 
     def _load_station_index(self):
         if self.station_index is None:
-            with resource_stream('eemeter.resources',
-                                 'supported_tmy3_stations.json') as f:
-                self.station_index = set(json.loads(f.read().decode("utf-8")))
+            self.station_index = tmy3_stations
         return self.station_index
 
     def get_hourly_weather_normal_data(self, station):
@@ -180,68 +227,51 @@ class TMY3Client(object):
             )
             raise ValueError(message)
 
-        url = (
-            "http://rredc.nrel.gov/solar/old_data/nsrdb/"
-            "1991-2005/data/tmy3/{}TYA.CSV".format(station)
-        )
-        r = requests.get(url)
-
-        index = pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
-                              freq='H', tz=pytz.UTC)
-        series = pd.Series(None, index=index, dtype=float)
-
-        if r.status_code == 200:
-
-            lines = r.text.splitlines()
-
-            utc_offset_str = lines[0].split(',')[3]
-            utc_offset = timedelta(seconds=3600 * float(utc_offset_str))
-
-            for line in lines[2:]:
-                row = line.split(",")
-                month = row[0][0:2]
-                day = row[0][3:5]
-                hour = int(row[1][0:2]) - 1
-
-                # YYYYMMDDHH
-                date_string = "1900{}{}{:02d}".format(month, day, hour)
-
-                dt = datetime.strptime(date_string, "%Y%m%d%H") - utc_offset
-
-                # Only a little redundant to make year 1900 again - matters for
-                # first or last few hours of the year depending UTC on offset
-                dt = pytz.UTC.localize(dt.replace(year=1900))
-                temp_C = float(row[31])
-
-                series[dt] = temp_C
+        text, url = self._retrieve_text(station)
 
+        if text is not None:
+            series = parse_tmy3_data(text)
         else:
             message = (
                 "Station {} was not found. Tried url {}.".format(station, url)
             )
             warnings.warn(message)
+            series = pd.Series(None, index=normal_year_hourly_index(),
+                               dtype=float)
 
         return series
 
+    def _retrieve_text(self, station):
+        url = (
+            "http://rredc.nrel.gov/solar/old_data/nsrdb/"
+            "1991-2005/data/tmy3/{}TYA.CSV".format(station)
+        )
+        r = get_http_session().get(url)
+        with self._lock:
+            self.bytes_transferred += len(r.content)
+
+        if r.status_code == 200:
+            return r.text, url
+        return None, url
+
 
 class CZ2010Client(object):
 
     def __init__(self):
         self.station_index = None
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
 
     def _load_station_index(self):
         if self.station_index is None:
-            with resource_stream('eemeter.resources',
-                                 'supported_cz2010_stations.json') as f:
-                self.station_index = set(json.loads(f.read().decode("utf-8")))
+            self.station_index = cz2010_stations
         return self.station_index
 
     def get_hourly_weather_normal_data(self, station):
 
-        # Note: at time of writing, this loading code is exactly the same
-        # as the TMY3 loading code. No detectable difference in the format
-        # for these purposes (i.e., getting temperature). The only difference
-        # is the URL from which the data is pulled.
+        # Note: CZ2010 files use the TMY3 format, so parsing is shared with
+        # TMY3Client. The only difference is the URL from which the data is
+        # pulled.
 
         self._load_station_index()
 
@@ -254,47 +284,145 @@ class CZ2010Client(object):
             )
             raise ValueError(message)
 
+        text, url = self._retrieve_text(station)
+
+        if text is not None:
+            series = parse_tmy3_data(text)
+        else:
+            message = (
+                "Station {} was not found. Tried url {}.".format(station, url)
+            )
+            warnings.warn(message)
+            series = pd.Series(None, index=normal_year_hourly_index(),
+                               dtype=float)
+
+        return series
+
+    def _retrieve_text(self, station):
         # NOTE: This URL is hardcoded but the data may not always be available
         # from this source. Set with env variable instead?
         url = (
             "https://storage.googleapis.com/oee-cz2010/csv/{}_CZ2010.CSV"
             .format(station)
         )
-        r = requests.get(url)
-
-        index = pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
-                              freq='H', tz=pytz.UTC)
-        series = pd.Series(None, index=index, dtype=float)
+        r = get_http_session().get(url)
+        with self._lock:
+            self.bytes_transferred += len(r.content)
 
         if r.status_code == 200:
+            return r.text, url
+        return None, url
 
-            lines = r.text.splitlines()
 
-            utc_offset_str = lines[0].split(',')[3]
-            utc_offset = timedelta(seconds=3600 * float(utc_offset_str))
+class MirrorNOAAClient(NOAAClient):
+    ''' Reads NOAA ISD and GSOD files from a local mirror of
+    :code:`ftp://ftp.ncdc.noaa.gov/pub/data` instead of FTP; never opens a
+    network connection. Files are decompressed while they are read from
+    disk.
 
-            for line in lines[2:]:
-                row = line.split(",")
-                month = row[0][0:2]
-                day = row[0][3:5]
-                hour = int(row[1][0:2]) - 1
+    Files are looked up as :code:`<directory>/noaa/<year>/<station>-<year>.gz`
+    (ISD) and :code:`<directory>/gsod/<year>/<station>-<year>.op.gz` (GSOD),
+    or directly in :code:`<directory>/noaa` and :code:`<directory>/gsod`.
+    As on the FTP site, stations are given as USAF-WBAN identifiers.
 
-                # YYYYMMDDHH
-                date_string = "1900{}{}{:02d}".format(month, day, hour)
+    Parameters
+    ----------
+    directory : str
+        Root directory of the mirror.
+    '''
 
-                dt = datetime.strptime(date_string, "%Y%m%d%H") - utc_offset
+    def __init__(self, directory):
+        super(MirrorNOAAClient, self).__init__()
+        self.directory = directory
 
-                # Only a little redundant to make year 1900 again - matters for
-                # first or last few hours of the year depending UTC on offset
-                dt = pytz.UTC.localize(dt.replace(year=1900))
-                temp_C = float(row[31])
+    def __repr__(self):
+        return 'MirrorNOAAClient("{}")'.format(self.directory)
 
-                series[dt] = temp_C
+    def _retreive_file_data(self, filename_format, station, year):
+        # e.g., "/pub/data/noaa/{year}/{station}-{year}.gz"
+        dataset = filename_format.split('/')[3]
+        basename_format = filename_format.split('/')[-1]
 
-        else:
-            message = (
-                "Station {} was not found. Tried url {}.".format(station, url)
-            )
-            warnings.warn(message)
-
-        return series
+        for station_id in self._get_potential_station_ids(station):
+            filename = basename_format.format(station=station_id, year=year)
+            paths = [
+                os.path.join(self.directory, dataset, str(year), filename),
+                os.path.join(self.directory, dataset, filename),
+            ]
+            for path in paths:
+                if os.path.exists(path):
+                    with gzip.open(path, 'rb') as f:
+                        data = f.read()
+                    with self._lock:
+                        self.bytes_transferred += os.path.getsize(path)
+                    logger.info('Successfully read {}'.format(path))
+                    return data
+
+        logger.warn(
+            "No {} {} file for station {} in mirror {}."
+            .format(dataset, year, station, self.directory)
+        )
+        return b''
+
+
+def _read_mirror_text(client, path):
+    if not os.path.exists(path):
+        return None, path
+    with open(path, 'rb') as f:
+        data = f.read()
+    with client._lock:
+        client.bytes_transferred += len(data)
+    return data.decode('utf-8', 'replace'), path
+
+
+class MirrorTMY3Client(TMY3Client):
+    ''' Reads TMY3 files from :code:`<directory>/tmy3/<station>TYA.CSV`
+    (or :code:`<directory>/<station>TYA.CSV`) instead of NREL's web site;
+    never opens a network connection.
+
+    Parameters
+    ----------
+    directory : str
+        Root directory of the mirror.
+    '''
+
+    def __init__(self, directory):
+        super(MirrorTMY3Client, self).__init__()
+        self.directory = directory
+
+    def __repr__(self):
+        return 'MirrorTMY3Client("{}")'.format(self.directory)
+
+    def _retrieve_text(self, station):
+        filename = "{}TYA.CSV".format(station)
+        path = os.path.join(self.directory, "tmy3", filename)
+        if not os.path.exists(path):
+            path = os.path.join(self.directory, filename)
+        return _read_mirror_text(self, path)
+
+
+class MirrorCZ2010Client(CZ2010Client):
+    ''' Reads CZ2010 files from
+    :code:`<directory>/cz2010/<station>_CZ2010.CSV` (or
+    :code:`<directory>/<station>_CZ2010.CSV`); never opens a network
+    connection.
+
+    Parameters
+    ----------
+    directory : str
+        Root directory of the mirror.
+    '''
+
+    def __init__(self, directory):
+        super(MirrorCZ2010Client, self).__init__()
+        self.directory = directory
+
+    def __repr__(self):
+        return 'MirrorCZ2010Client("{}")'.format(self.directory)
+
+    def _retrieve_text(self, station):
+        filename = "{}_CZ2010.CSV".format(station)
+        path = os.path.join(self.directory, "cz2010", filename)
+        if not os.path.exists(path):
+            path = os.path.join(self.directory, filename)
+        return _read_mirror_text(self, path)
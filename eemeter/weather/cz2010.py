@@ -1,5 +1,5 @@
 from .base import NormalHourlyWeatherSourceBase
-from .clients import CZ2010Client
+from .clients import MirrorCZ2010Client, CZ2010Client
 
 
 class CZ2010WeatherSource(NormalHourlyWeatherSourceBase):
@@ -20,3 +20,4 @@ class CZ2010WeatherSource(NormalHourlyWeatherSourceBase):
 
     station_type = 'CZ2010'
     client = CZ2010Client()
+    mirror_client_class = MirrorCZ2010Client
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+_DAY_NANOS = 86400 * 10 ** 9
+
+
+class DegreeDayIndex(object):
+    ''' Prefix sums of daily cooling and heating degree days for a set of
+    balance points, so that degree days and valid-day counts over any
+    interval come from two lookups and a subtraction.
+
+    Cooling degree days for a day are :code:`max(temp - bp, 0)`; heating
+    degree days are :code:`max(bp - temp, 0)`. Days with null temperatures
+    contribute neither degree days nor valid days.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather import ISDWeatherSource
+        >>> ws = ISDWeatherSource("722880")
+        >>> ddi = ws.degree_day_index(cdd_balance_points=[65, 70],
+        ...                           hdd_balance_points=[60])
+        >>> ddi.periods(billing_period_boundaries, mean=True)
+
+    Parameters
+    ----------
+    daily_temps : pandas.Series
+        Daily temperatures with a regular daily, time-zone aware
+        DatetimeIndex.
+    cdd_balance_points : list of int or float
+        Balance points for cooling degree days.
+    hdd_balance_points : list of int or float
+        Balance points for heating degree days.
+    '''
+
+    def __init__(self, daily_temps, cdd_balance_points=(),
+                 hdd_balance_points=()):
+        self.cdd_balance_points = list(cdd_balance_points)
+        self.hdd_balance_points = list(hdd_balance_points)
+        self.n_days = daily_temps.shape[0]
+        if self.n_days > 0:
+            self.start = daily_temps.index.asi8[0]
+        else:
+            self.start = 0
+
+        temps = daily_temps.values.astype(float)
+        valid = ~np.isnan(temps)
+        temps = np.where(valid, temps, 0.)
+
+        cdd_bps = np.array(self.cdd_balance_points, dtype=float)
+        hdd_bps = np.array(self.hdd_balance_points, dtype=float)
+        cdd = np.where(valid, np.maximum(temps - cdd_bps[:, np.newaxis], 0),
+                       0.)
+        hdd = np.where(valid, np.maximum(hdd_bps[:, np.newaxis] - temps, 0),
+                       0.)
+
+        self._cum_ndays = self._prefix_sum(valid.astype(np.int64))
+        self._cum_cdd = self._prefix_sum(cdd)
+        self._cum_hdd = self._prefix_sum(hdd)
+
+    def __repr__(self):
+        return 'DegreeDayIndex(n_days={}, cdd={}, hdd={})'.format(
+            self.n_days, self.cdd_balance_points, self.hdd_balance_points)
+
+    @staticmethod
+    def _prefix_sum(values):
+        # prefix sums along the last axis, with a leading zero.
+        shape = values.shape[:-1] + (1,)
+        return np.concatenate([np.zeros(shape, dtype=values.dtype),
+                               np.cumsum(values, axis=-1)], axis=-1)
+
+    def _day_offsets(self, nanos):
+        # offset of the first day starting at or after each timestamp.
+        offsets = -((self.start - np.asarray(nanos, dtype=np.int64)) //
+                    _DAY_NANOS)
+        return np.clip(offsets, 0, self.n_days)
+
+    def _sums(self, starts, ends):
+        data = [('ndays', self._cum_ndays[ends] - self._cum_ndays[starts])]
+        data.extend(
+            ('CDD_{}'.format(bp), cum[ends] - cum[starts])
+            for bp, cum in zip(self.cdd_balance_points, self._cum_cdd)
+        )
+        data.extend(
+            ('HDD_{}'.format(bp), cum[ends] - cum[starts])
+            for bp, cum in zip(self.hdd_balance_points, self._cum_hdd)
+        )
+        return data
+
+    def interval(self, start, end, mean=False):
+        ''' Degree days and valid days for days starting in [start, end).
+
+        Parameters
+        ----------
+        start, end : pandas.Timestamp
+            Time-zone aware interval bounds.
+        mean : bool, default False
+            If True, degree days are averaged over valid days instead of
+            summed.
+
+        Returns
+        -------
+        degree_days : pandas.Series
+            Values for :code:`"ndays"`, :code:`"CDD_<bp>"` and
+            :code:`"HDD_<bp>"`.
+        '''
+        index = pd.DatetimeIndex([start, end])
+        return self.periods(index, mean=mean).iloc[0]
+
+    def periods(self, index_periods, mean=False):
+        ''' Degree days and valid days for each period between consecutive
+        boundaries; period `i` covers days starting in
+        `[index_periods[i], index_periods[i + 1])`.
+
+        Parameters
+        ----------
+        index_periods : pandas.DatetimeIndex
+            Sorted, time-zone aware period boundaries.
+        mean : bool, default False
+            If True, degree days are averaged over valid days (NaN for
+            periods without valid days) instead of summed.
+
+        Returns
+        -------
+        degree_days : pandas.DataFrame
+            One row per period, indexed by period start, with columns
+            :code:`"ndays"`, :code:`"CDD_<bp>"` and :code:`"HDD_<bp>"`.
+        '''
+        return self.intervals(index_periods[:-1], index_periods[1:],
+                              mean=mean)
+
+    def intervals(self, starts, ends, mean=False, inclusive=False):
+        ''' Degree days and valid days for each of a set of intervals;
+        interval `i` covers days starting in `[starts[i], ends[i])`.
+
+        Parameters
+        ----------
+        starts, ends : pandas.DatetimeIndex
+            Time-zone aware interval bounds.
+        mean : bool, default False
+            If True, degree days are averaged over valid days (NaN for
+            intervals without valid days) instead of summed.
+        inclusive : bool, default False
+            If True, intervals also cover the day starting at `ends[i]`,
+            i.e., days starting in `[starts[i], ends[i]]`.
+
+        Returns
+        -------
+        degree_days : pandas.DataFrame
+            One row per interval, indexed by interval start, with columns
+            :code:`"ndays"`, :code:`"CDD_<bp>"` and :code:`"HDD_<bp>"`.
+        '''
+        end_nanos = ends.asi8 + 1 if inclusive else ends.asi8
+        data = self._sums(self._day_offsets(starts.asi8),
+                          self._day_offsets(end_nanos))
+
+        if mean:
+            ndays = data[0][1].astype(float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                data = data[:1] + [
+                    (name, np.where(ndays > 0, values / ndays, np.nan))
+                    for name, values in data[1:]
+                ]
+
+        return pd.DataFrame(dict(data), index=starts,
+                            columns=[name for name, _ in data])
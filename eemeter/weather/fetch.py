@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+import ftplib
+import logging
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class FTPConnectionPool(object):
+    ''' Pool of reusable, logged-in FTP connections to a single host.
+
+    At most :code:`max_connections` connections are open at once; callers
+    beyond that block until a connection is released.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> pool = FTPConnectionPool("ftp.ncdc.noaa.gov")
+        >>> with pool.connection() as ftp:
+        ...     ftp.retrbinary('RETR /pub/data/noaa/isd-history.csv', write)
+
+    Parameters
+    ----------
+    host : str
+        FTP host name.
+    max_connections : int, default 4
+        Maximum number of simultaneously open connections.
+    n_tries : int, default 3
+        Number of attempts made to establish each connection.
+    '''
+
+    def __init__(self, host, max_connections=4, n_tries=3):
+        self.host = host
+        self.max_connections = max_connections
+        self.n_tries = n_tries
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def __repr__(self):
+        return 'FTPConnectionPool("{}", max_connections={})'.format(
+            self.host, self.max_connections)
+
+    def _connect(self):
+        for _ in range(self.n_tries):
+            try:
+                ftp = ftplib.FTP(self.host)
+            except ftplib.all_errors as e:
+                logger.warn("FTP connection issue: %s", e)
+            else:
+                logger.info(
+                    "Successfully established connection to {}."
+                    .format(self.host)
+                )
+                try:
+                    ftp.login()
+                except ftplib.all_errors as e:
+                    logger.warn("FTP login issue: %s", e)
+                else:
+                    logger.info(
+                        "Successfully logged in to {}.".format(self.host)
+                    )
+                    return ftp
+        raise RuntimeError("Couldn't establish an FTP connection.")
+
+    def _acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, ftp, discard=False):
+        if discard:
+            try:
+                ftp.close()
+            except ftplib.all_errors:
+                pass
+        else:
+            with self._lock:
+                self._idle.append(ftp)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        ''' Borrow a connection from the pool. Connections raising
+        connection-level errors (anything but a permanent FTP error, such as
+        a missing file) are closed instead of being returned to the pool.
+        '''
+        ftp = self._acquire()
+        try:
+            yield ftp
+        except ftplib.error_perm:
+            self._release(ftp)
+            raise
+        except BaseException:
+            self._release(ftp, discard=True)
+            raise
+        else:
+            self._release(ftp)
+
+    def close(self):
+        ''' Close all idle connections.
+        '''
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ftp in idle:
+            try:
+                ftp.quit()
+            except ftplib.all_errors:
+                ftp.close()
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session(pool_maxsize=16):
+    ''' Return the process-wide :code:`requests.Session`, which keeps HTTP
+    connections alive between requests to the same host.
+
+    Parameters
+    ----------
+    pool_maxsize : int, default 16
+        Maximum number of connections kept per host. Only used when the
+        session is first created.
+
+    Returns
+    -------
+    session : requests.Session
+    '''
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_maxsize,
+                                  pool_maxsize=pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session = session
+    return _http_session
+
+
+def iter_fetch_many(fetch, items, max_workers=8, n_tries=3, retry_wait=1.):
+    ''' Call :code:`fetch` for each item concurrently, retrying failed items
+    individually, and yield outcomes as they complete.
+
+    Parameters are as for :code:`fetch_many`.
+
+    Yields
+    ------
+    item, data, error : tuple
+        The item, the fetched data (None on failure) and the exception
+        raised by the last attempt (None on success).
+    '''
+    items = list(items)
+
+    def _fetch(item):
+        args = item if isinstance(item, tuple) else (item,)
+        wait = retry_wait
+        for attempt in range(1, n_tries + 1):
+            try:
+                return item, fetch(*args), None
+            except Exception as e:
+                logger.warn(
+                    "Failed to fetch {} (attempt {} of {}): {}"
+                    .format(item, attempt, n_tries, e)
+                )
+                if attempt == n_tries:
+                    return item, None, e
+                time.sleep(wait)
+                wait *= 2
+
+    if len(items) == 0:
+        return
+
+    pool = ThreadPool(min(max_workers, len(items)))
+    try:
+        for outcome in pool.imap_unordered(_fetch, items):
+            yield outcome
+    finally:
+        pool.close()
+        pool.join()
+
+
+def fetch_many(fetch, items, max_workers=8, n_tries=3, retry_wait=1.):
+    ''' Call :code:`fetch` for each item concurrently, retrying failed items
+    individually.
+
+    Parameters
+    ----------
+    fetch : callable
+        Called as :code:`fetch(*item)` if the item is a tuple, otherwise as
+        :code:`fetch(item)`.
+    items : list
+        Items to fetch, e.g., :code:`(station, year)` tuples.
+    max_workers : int, default 8
+        Number of concurrent fetches.
+    n_tries : int, default 3
+        Number of attempts for each item.
+    retry_wait : float, default 1.
+        Seconds to wait before the first retry; doubles on each retry.
+
+    Returns
+    -------
+    results : dict
+        Fetched data, keyed by item.
+    failures : dict
+        Exception raised by the last attempt, keyed by item, for items
+        which could not be fetched.
+    '''
+    results, failures = {}, {}
+    outcomes = iter_fetch_many(fetch, items, max_workers, n_tries, retry_wait)
+    for item, data, error in outcomes:
+        if error is None:
+            results[item] = data
+        else:
+            failures[item] = error
+    return results, failures
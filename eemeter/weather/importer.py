@@ -0,0 +1,272 @@
+from collections import OrderedDict
+import gzip
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+
+from eemeter.resources.stations import isd_stations
+from .cache import get_weather_cache_store
+from .noaa import GSODWeatherSource, ISDWeatherSource
+from .parsers import parse_gsod_data, parse_isd_data
+
+logger = logging.getLogger(__name__)
+
+# raw file names as on the NOAA FTP site, e.g., 722880-23152-2011.gz (ISD)
+# or 722880-23152-2011.op.gz (GSOD).
+FILENAME_PATTERNS = [
+    ("GSOD", re.compile(r'^(\d{6})-(\d{5})-(\d{4})\.op\.gz$')),
+    ("ISD", re.compile(r'^(\d{6})-(\d{5})-(\d{4})\.gz$')),
+]
+
+SOURCE_CLASSES = {
+    "GSOD": GSODWeatherSource,
+    "ISD": ISDWeatherSource,
+}
+
+PARSERS = {
+    "GSOD": parse_gsod_data,
+    "ISD": parse_isd_data,
+}
+
+
+def find_weather_files(directory):
+    ''' Find raw NOAA ISD and GSOD files in a directory tree.
+
+    Where several files hold data for the same USAF station and year (i.e.,
+    under different WBAN identifiers), the file used is the one
+    :code:`NOAAClient` would fetch first.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search recursively.
+
+    Returns
+    -------
+    files : collections.OrderedDict
+        File paths keyed by :code:`(dataset, station, year)` items, where
+        dataset is "ISD" or "GSOD" and station is a 6-digit USAF station.
+    unrecognized : list of str
+        Paths of files for stations not in the station index.
+    '''
+    candidates = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            for dataset, pattern in FILENAME_PATTERNS:
+                match = pattern.match(filename)
+                if match is not None:
+                    usaf, wban, year = match.groups()
+                    item = (dataset, usaf, int(year))
+                    candidates.setdefault(item, {})[usaf + "-" + wban] = \
+                        os.path.join(dirpath, filename)
+                    break
+
+    files = OrderedDict()
+    unrecognized = []
+    for item in sorted(candidates):
+        paths = candidates[item]
+        station = item[1]
+        if station not in isd_stations:
+            unrecognized.extend(sorted(paths.values()))
+            continue
+        for station_id in isd_stations.aliases(station):
+            if station_id in paths:
+                files[item] = paths[station_id]
+                break
+        else:
+            unrecognized.extend(sorted(paths.values()))
+    return files, unrecognized
+
+
+def _get_file_signature(path, use_hash=False):
+    stat = os.stat(path)
+    signature = {
+        "filename": os.path.basename(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+    if use_hash:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        signature["sha1"] = sha1.hexdigest()
+    return signature
+
+
+def _signature_matches(signature, imported):
+    if imported is None:
+        return False
+    if "sha1" in signature:
+        fields = ["filename", "sha1"]
+    else:
+        fields = ["filename", "size", "mtime"]
+    return all(signature[f] == imported.get(f) for f in fields)
+
+
+def _get_cache_key(item):
+    dataset, station, year = item
+    return SOURCE_CLASSES[dataset].cache_key_format.format(station, year)
+
+
+def _get_import_key(item):
+    return "import-{}".format(_get_cache_key(item))
+
+
+def _parse_weather_file(task):
+    # runs in worker processes; errors are returned rather than raised so
+    # that one bad file doesn't stop the import.
+    item, path = task
+    dataset, station, year = item
+    try:
+        with gzip.open(path, 'rb') as f:
+            data = f.read()
+        return item, PARSERS[dataset](data, year), None
+    except Exception as e:
+        return item, None, "{}: {}".format(type(e).__name__, e)
+
+
+def import_weather_files(directory, cache_url=None, cache_backend=None,
+                         max_workers=None, batch_size=200, use_hash=False,
+                         force=False, progress=None):
+    ''' Parse a directory of raw NOAA ISD and GSOD files (as found on the
+    NOAA FTP site, e.g., :code:`722880-23152-2011.gz`) and save them to the
+    weather cache.
+
+    Files are parsed in a pool of worker processes and the parsed series
+    are written to the cache in batches, one transaction per batch.
+    The size and modification time (or, with :code:`use_hash`, the SHA-1
+    hash) of each imported file are recorded, and files which are unchanged
+    since they were last imported are skipped.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search recursively for raw files.
+    cache_url : str, default None
+        SQLAlchemy compatible weather cache database URL.
+    cache_backend : str, {"binary", "json"}, default None
+        Storage format for cached series.
+    max_workers : int, default None
+        Number of worker processes. If None, uses the number of CPUs. If 1,
+        files are parsed in the calling process.
+    batch_size : int, default 200
+        Number of parsed station-years written to the cache per
+        transaction.
+    use_hash : bool, default False
+        If True, files are compared by SHA-1 hash instead of size and
+        modification time to decide whether they changed.
+    force : bool, default False
+        If True, imports all files, whether or not they changed.
+    progress : callable, default None
+        Called as :code:`progress(item, n_done, n_total, error)` as each
+        file is parsed, where :code:`error` is None on success.
+
+    Returns
+    -------
+    report : dict
+        - :code:`"imported"`: items parsed and cached.
+        - :code:`"skipped"`: items which were unchanged.
+        - :code:`"failures"`: error messages keyed by item (or path, for
+          files of unrecognized stations).
+
+        Items are :code:`(<"ISD" or "GSOD">, station, year)` tuples.
+    '''
+    store = get_weather_cache_store(cache_url, cache_backend)
+    files, unrecognized = find_weather_files(directory)
+
+    report = {
+        "imported": [],
+        "skipped": [],
+        "failures": OrderedDict(),
+    }
+    for path in unrecognized:
+        report["failures"][path] = "Unrecognized USAF station."
+
+    items = list(files.keys())
+    signatures = {
+        item: _get_file_signature(files[item], use_hash) for item in items
+    }
+
+    if not force:
+        imported = store.retrieve_json_many(
+            [_get_import_key(item) for item in items])
+        cached = store.existing_keys([_get_cache_key(item) for item in items])
+        unchanged = [
+            item for item in items
+            if _get_cache_key(item) in cached and
+            _signature_matches(signatures[item],
+                               imported.get(_get_import_key(item)))
+        ]
+        report["skipped"].extend(unchanged)
+        unchanged = set(unchanged)
+        items = [item for item in items if item not in unchanged]
+
+    tasks = [(item, files[item]) for item in items]
+    batch = []
+
+    def _flush():
+        # daily aggregates of ISD data, as saved by ISDWeatherSource.
+        daily_items = []
+        for item, series in batch:
+            if item[0] == "ISD":
+                means, counts = ISDWeatherSource.daily_aggregates(series)
+                daily_items.append((
+                    ISDWeatherSource.daily_cache_key_format.format(*item[1:]),
+                    means))
+                daily_items.append((
+                    ISDWeatherSource.daily_count_cache_key_format.format(
+                        *item[1:]),
+                    counts))
+
+        # series, aggregates and signatures of a batch are committed
+        # together, so an interrupted import leaves no partial batch.
+        with store.transaction() as conn:
+            for dataset, source_class in SOURCE_CLASSES.items():
+                series_items = [
+                    (_get_cache_key(item), series)
+                    for item, series in batch if item[0] == dataset
+                ]
+                store.save_series_many(series_items, source_class.freq,
+                                       source_class.cache_date_format, conn)
+            store.save_series_many(daily_items, 'D',
+                                   ISDWeatherSource.daily_cache_date_format,
+                                   conn)
+            store.save_json_many([
+                (_get_import_key(item), signatures[item])
+                for item, _ in batch
+            ], conn)
+        report["imported"].extend(item for item, _ in batch)
+        del batch[:]
+
+    if max_workers == 1 or len(tasks) <= 1:
+        pool = None
+        results = (_parse_weather_file(task) for task in tasks)
+    else:
+        n_workers = max_workers or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(n_workers)
+        chunksize = max(1, min(16, len(tasks) // (4 * n_workers)))
+        results = pool.imap_unordered(_parse_weather_file, tasks, chunksize)
+
+    try:
+        for n_done, (item, series, error) in enumerate(results, 1):
+            if error is None:
+                batch.append((item, series))
+                if len(batch) >= batch_size:
+                    _flush()
+            else:
+                report["failures"][item] = error
+                logger.warn("Failed to import {}: {}".format(item, error))
+
+            if progress is not None:
+                progress(item, n_done, len(tasks), error)
+        _flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return report
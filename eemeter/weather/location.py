@@ -1,21 +1,20 @@
-import json
+from collections import Counter
 import numpy as np
-from pkg_resources import resource_stream
+from scipy.spatial import cKDTree
 
+from eemeter.resources.loader import load_resource
+from eemeter.resources.stations import cz2010_stations, tmy3_stations
 
-resources = {}
-
+EARTH_RADIUS_KM = 6371
 
-def _get_json_resource(filename):
-    with resource_stream('eemeter.resources', filename) as f:
-        resource = json.loads(f.read().decode('utf-8'))
-    return resource
+resources = {}
+spatial_indexes = {}
 
 
 def _load_resource(name, filename):
     global resources
     if resources.get(name, None) is None:
-        resources[name] = _get_json_resource(filename)
+        resources[name] = load_resource(filename)
     return resources[name]
 
 
@@ -94,21 +93,11 @@ def _load_supported_zipcodes_index():
                           'supported_zipcodes.json')
 
 
-def _load_supported_tmy3_stations_index():
-    return _load_resource('supported_tmy3_stations_index',
-                          'supported_tmy3_stations.json')
-
-
 def _load_supported_usaf_stations_index():
     return _load_resource('supported_usaf_stations_index',
                           'supported_usaf_stations.json')
 
 
-def _load_supported_cz2010_stations_index():
-    return _load_resource('supported_cz2010_stations_index',
-                          'supported_cz2010_stations.json')
-
-
 def _load_supported_climate_zones_index():
     return _load_resource('supported_climate_zones_index',
                           'supported_climate_zones.json')
@@ -142,10 +131,194 @@ def haversine(lat1, lng1, lat2, lng2):
     dlat = lat2 - lat1
     a = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2)**2
     c = 2 * np.arcsin(np.sqrt(a))
-    r = 6371  # Radius of earth in kilometers. Use 3959 for miles
+    r = EARTH_RADIUS_KM  # Use 3959 for miles
     return c * r
 
 
+def _lat_lng_to_unit_vectors(lats, lngs):
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    return np.column_stack([
+        np.cos(lats) * np.cos(lngs),
+        np.cos(lats) * np.sin(lngs),
+        np.sin(lats),
+    ])
+
+
+class LatLngIndex(object):
+    ''' Spatial index for nearest neighbor queries over a set of named
+    lat/lng points, e.g., weather stations or ZIP code centroids.
+
+    Points are indexed in a KD-tree as 3D unit vectors, on which straight
+    line distances increase with great circle distances. Points at equal
+    distances are returned in the order in which they were given.
+
+    Parameters
+    ----------
+    lat_lng_index : dict
+        :code:`(lat, lng)` pairs keyed by point name.
+    '''
+
+    def __init__(self, lat_lng_index):
+        items = list(lat_lng_index.items())
+        names = [name for name, _ in items]
+        lat_lngs = np.array([lat_lng for _, lat_lng in items],
+                            dtype=float).reshape((-1, 2))
+        self.names = np.array(names, dtype=object)
+        self.tree = cKDTree(
+            _lat_lng_to_unit_vectors(lat_lngs[:, 0], lat_lngs[:, 1]))
+
+        # largest number of points sharing coordinates; queries fetch this
+        # many extra neighbors so that ties can be ordered.
+        counts = Counter(map(tuple, lat_lngs))
+        self._max_colocated = max(counts.values()) if counts else 1
+
+    def __len__(self):
+        return self.names.shape[0]
+
+    def query(self, lats, lngs, k=1):
+        ''' Find the nearest points to each of an array of coordinates.
+
+        Parameters
+        ----------
+        lats : array-like of float
+            Latitude coordinates.
+        lngs : array-like of float
+            Longitude coordinates.
+        k : int, default 1
+            Number of nearest points to find for each coordinate.
+
+        Returns
+        -------
+        names : numpy.ndarray
+            Names of the nearest points, nearest first, with shape
+            :code:`(n_coordinates, k)`. None for coordinates which are null
+            or if there are fewer than :code:`k` points.
+        distances : numpy.ndarray
+            Kilometers to the nearest points, with the same shape as
+            :code:`names`; NaN where names are None.
+        '''
+        lats = np.asarray(lats, dtype=float).ravel()
+        lngs = np.asarray(lngs, dtype=float).ravel()
+        n = lats.shape[0]
+        names = np.empty((n, k), dtype=object)
+        distances = np.empty((n, k))
+        distances.fill(np.nan)
+
+        k_found = min(k, len(self))
+        valid = ~(np.isnan(lats) | np.isnan(lngs))
+        if k_found == 0 or not valid.any():
+            return names, distances
+
+        n_query = min(k_found + self._max_colocated - 1, len(self))
+        chords, positions = self.tree.query(
+            _lat_lng_to_unit_vectors(lats[valid], lngs[valid]), k=n_query)
+        chords = chords.reshape((-1, n_query))
+        positions = positions.reshape((-1, n_query))
+
+        # order by distance, then by position, as a linear search would.
+        order = np.lexsort((positions, chords), axis=-1)[:, :k_found]
+        rows = np.arange(order.shape[0])[:, np.newaxis]
+        chords = chords[rows, order]
+        positions = positions[rows, order]
+
+        names[valid, :k_found] = self.names[positions]
+        distances[valid, :k_found] = \
+            2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chords / 2, 1))
+        return names, distances
+
+
+def _load_spatial_index(name, load_lat_lng_index):
+    if spatial_indexes.get(name, None) is None:
+        spatial_indexes[name] = LatLngIndex(load_lat_lng_index())
+    return spatial_indexes[name]
+
+
+def _load_usaf_station_spatial_index():
+    return _load_spatial_index('usaf_station',
+                               _load_usaf_station_to_lat_lng_index)
+
+
+def _load_tmy3_station_spatial_index():
+    return _load_spatial_index('tmy3_station',
+                               _load_tmy3_station_to_lat_lng_index)
+
+
+def _load_zipcode_spatial_index():
+    return _load_spatial_index('zipcode', _load_zipcode_to_lat_lng_index)
+
+
+def lat_lngs_to_usaf_stations(lats, lngs, k=1):
+    """Return the closest USAF station IDs, and distances to them, for
+    arrays of latitude and longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+    k : int, default 1
+        Number of closest stations to find for each coordinate.
+
+    Returns
+    -------
+    stations : numpy.ndarray
+        USAF weather station IDs, closest first, with shape
+        :code:`(n_coordinates, k)`. None where coordinates are null.
+    distances : numpy.ndarray
+        Kilometers to each station.
+    """
+    return _load_usaf_station_spatial_index().query(lats, lngs, k)
+
+
+def lat_lngs_to_tmy3_stations(lats, lngs, k=1):
+    """Return the closest TMY3 station IDs, and distances to them, for
+    arrays of latitude and longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+    k : int, default 1
+        Number of closest stations to find for each coordinate.
+
+    Returns
+    -------
+    stations : numpy.ndarray
+        TMY3 weather station IDs, closest first, with shape
+        :code:`(n_coordinates, k)`. None where coordinates are null.
+    distances : numpy.ndarray
+        Kilometers to each station.
+    """
+    return _load_tmy3_station_spatial_index().query(lats, lngs, k)
+
+
+def lat_lngs_to_zipcodes(lats, lngs, k=1):
+    """Return the closest ZIP codes, and distances to their centroids, for
+    arrays of latitude and longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+    k : int, default 1
+        Number of closest ZIP codes to find for each coordinate.
+
+    Returns
+    -------
+    zipcodes : numpy.ndarray
+        USPS ZIP codes, closest first, with shape
+        :code:`(n_coordinates, k)`. None where coordinates are null.
+    distances : numpy.ndarray
+        Kilometers to each ZIP code centroid.
+    """
+    return _load_zipcode_spatial_index().query(lats, lngs, k)
+
+
 def lat_lng_to_usaf_station(lat, lng):
     """Return the closest USAF station ID using latitude and
     longitude coordinates.
@@ -165,11 +338,8 @@ def lat_lng_to_usaf_station(lat, lng):
     """
     if lat is None or lng is None:
         return None
-    usaf_station_to_lat_lng_index = _load_usaf_station_to_lat_lng_index()
-    index_list = list(usaf_station_to_lat_lng_index.items())
-    dists = [haversine(lat, lng, stat_lat, stat_lng)
-             for _, (stat_lat, stat_lng) in index_list]
-    return index_list[np.argmin(dists)][0]
+    stations, _ = lat_lngs_to_usaf_stations([lat], [lng])
+    return stations[0, 0]
 
 
 def lat_lng_to_tmy3_station(lat, lng):
@@ -191,11 +361,8 @@ def lat_lng_to_tmy3_station(lat, lng):
     """
     if lat is None or lng is None:
         return None
-    tmy3_station_to_lat_lng_index = _load_tmy3_station_to_lat_lng_index()
-    index_list = list(tmy3_station_to_lat_lng_index.items())
-    dists = [haversine(lat, lng, stat_lat, stat_lng)
-             for _, (stat_lat, stat_lng) in index_list]
-    return index_list[np.argmin(dists)][0]
+    stations, _ = lat_lngs_to_tmy3_stations([lat], [lng])
+    return stations[0, 0]
 
 
 def lat_lng_to_zipcode(lat, lng):
@@ -218,11 +385,8 @@ def lat_lng_to_zipcode(lat, lng):
 
     if lat is None or lng is None:
         return None
-    zipcode_to_lat_lng_index = _load_zipcode_to_lat_lng_index()
-    index_list = list(zipcode_to_lat_lng_index.items())
-    dists = [haversine(lat, lng, zip_lat, zip_lng)
-             for _, (zip_lat, zip_lng) in index_list]
-    return index_list[np.argmin(dists)][0]
+    zipcodes, _ = lat_lngs_to_zipcodes([lat], [lng])
+    return zipcodes[0, 0]
 
 
 def lat_lng_to_climate_zone(lat, lng):
@@ -538,7 +702,7 @@ def tmy3_station_is_supported(station):
     supported : bool
         `True` if supported, otherwise `False`.
     """
-    return station in _load_supported_tmy3_stations_index()
+    return station in tmy3_stations
 
 
 def cz2010_station_is_supported(station):
@@ -554,7 +718,7 @@ def cz2010_station_is_supported(station):
     supported : bool
         `True` if supported, otherwise `False`.
     """
-    return station in _load_supported_cz2010_stations_index()
+    return station in cz2010_stations
 
 
 def climate_zone_is_supported(climate_zone):
@@ -1,31 +1,123 @@
 from datetime import datetime, timedelta
+import functools
 import logging
+import os
+import threading
 
+import numpy as np
 import pandas as pd
+import pytz
 
 from .base import WeatherSourceBase
-from .clients import NOAAClient
-from .cache import SqlJSONStore
+from .clients import (
+    MirrorNOAAClient,
+    NOAAClient,
+    get_mirror_client,
+    get_mirror_directory,
+)
+from .cache import get_weather_cache_store
+from .degree_days import DegreeDayIndex
+from .fetch import fetch_many
+from .store import TemperatureStore
 
 logger = logging.getLogger(__name__)
 
+REFRESH_MODES = ("incremental", "full", "offline")
+
+
+def _get_refresh_mode(refresh=None):
+    if refresh is None:
+        refresh = os.environ.get("EEMETER_WEATHER_REFRESH", "incremental")
+    if refresh not in REFRESH_MODES:
+        message = (
+            'Weather refresh mode not supported ({}). Use one of {}.'
+            .format(refresh, ", ".join(REFRESH_MODES))
+        )
+        raise ValueError(message)
+    return refresh
+
+
+def _with_load_lock(method):
+    # serializes loading and reading temperatures of a source shared by
+    # several threads.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._load_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class NOAAWeatherSourceBase(WeatherSourceBase):
+    ''' Base class for NOAA weather sources.
+
+    On creation, cached data for the current year is refreshed if it was
+    last fetched longer than :code:`staleness` ago.
+
+    Parameters
+    ----------
+    station : str
+        6-digit USAF station identifier.
+    cache_url : str, default None
+        SQLAlchemy compatible weather cache database URL.
+    cache_backend : str, {"binary", "json"}, default None
+        Storage format for cached series.
+    refresh : str, {"incremental", "full", "offline"}, default None
+        How stale cached data is refreshed. "incremental" fetches the year
+        and only caches observations newer than the last cached one, "full"
+        refetches and rewrites the whole year, and "offline" never fetches
+        data (uncached years are left empty). If None, uses the
+        EEMETER_WEATHER_REFRESH environment variable, falling back to
+        "incremental".
+    staleness : datetime.timedelta, default 1 day
+        Age after which cached data for the current year is refreshed.
+    mirror_directory : str, default None
+        Root directory of a local mirror of NOAA data files (see
+        :code:`eemeter.weather.clients.MirrorNOAAClient`), read instead of
+        the NOAA FTP site. If None, uses the EEMETER_WEATHER_MIRROR_DIRECTORY
+        environment variable, if set.
+    '''
 
     client = NOAAClient()
+    mirror_client_class = MirrorNOAAClient
 
-    def __init__(self, station, cache_url=None):
+    def __init__(self, station, cache_url=None, cache_backend=None,
+                 refresh=None, staleness=timedelta(days=1),
+                 mirror_directory=None):
         super(NOAAWeatherSourceBase, self).__init__(station)
 
-        self.json_store = SqlJSONStore(cache_url)
+        self.mirror_directory = get_mirror_directory(mirror_directory)
+        if self.mirror_directory is not None:
+            self.client = get_mirror_client(self.mirror_client_class,
+                                            self.mirror_directory)
+
+        self.refresh = _get_refresh_mode(refresh)
+        self.staleness = staleness
+        self.cache_store = get_weather_cache_store(cache_url, cache_backend)
         self.loaded_years = set()
+        self._load_lock = threading.RLock()
+        self._degree_day_indexes = {}
         self._check_station(station)
         logger.debug(
             "Created {} using cache: {}"
-            .format(self, self.json_store)
+            .format(self, self.cache_store)
         )
         self._check_for_recent_data()
 
+    @property
+    def tempC(self):
+        ''' Loaded temperatures in degC as a pandas Series, materialized
+        lazily from the underlying :code:`TemperatureStore`.
+        '''
+        return self.temperature_store.to_series()
+
+    @tempC.setter
+    def tempC(self, series):
+        self.temperature_store = TemperatureStore(self.freq)
+        self.temperature_store.write(series)
+
+    def nbytes(self):
+        return self.temperature_store.nbytes
+
     def _check_station(self, station):
         index = self.client._load_station_index()
         if station not in index:
@@ -34,9 +126,17 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             )
             raise ValueError(message)
 
-    def _check_for_recent_data(self, days_ago=1):
-        target = datetime.now() - timedelta(days=days_ago)
-        most_recent_fetch = self.json_store.retrieve_datetime(
+    @_with_load_lock
+    def _check_for_recent_data(self):
+        if self.refresh == "offline":
+            logger.debug(
+                "{} will not update data because it is offline."
+                .format(self)
+            )
+            return
+
+        target = datetime.now() - self.staleness
+        most_recent_fetch = self.cache_store.retrieve_datetime(
             self._get_cache_key(target.year))
         if most_recent_fetch is not None:
 
@@ -49,7 +149,10 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
                             most_recent_fetch.strftime("%Y-%m-%d"),
                             target.strftime("%Y-%m-%d"))
                 )
-                self.add_year(target.year, force_fetch=True)
+                if self.refresh == "incremental":
+                    self.refresh_year(target.year)
+                else:
+                    self.add_year(target.year, force_fetch=True)
             else:
                 logger.debug(
                     "{} will not update {} data because the most recent"
@@ -66,7 +169,8 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
                 .format(self=self, year=target.year)
             )
 
-    def add_year_range(self, start_year, end_year, force_fetch=False):
+    def add_year_range(self, start_year, end_year, force_fetch=False,
+                       max_workers=8):
         """Adds temperature data to internal pandas timeseries across a
         range of years.
 
@@ -84,10 +188,61 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         force_fetch : bool, default=False
             If True, forces the fetch; if false, checks to see if year
             has been added before actually fetching.
+        max_workers : int, default=8
+            Number of years fetched concurrently.
+        """
+        self.add_years(range(int(start_year), int(end_year) + 1),
+                       force_fetch, max_workers)
+
+    @_with_load_lock
+    def add_years(self, years, force_fetch=False, max_workers=8):
+        """Adds temperature data to internal pandas timeseries for several
+        years, fetching years which are not cached concurrently.
+
+        Parameters
+        ----------
+        years : list of int
+            The years for which data should be fetched.
+        force_fetch : bool, default=False
+            If True, forces the fetch; if false, checks to see if year
+            has been added before actually fetching.
+        max_workers : int, default=8
+            Number of years fetched concurrently.
         """
-        for year in range(start_year, end_year + 1):
+        years = list(years)
+        if self.refresh != "offline":
+            to_fetch = [
+                year for year in years
+                if force_fetch or (year not in self.loaded_years and
+                                   not self._year_saved(year))
+            ]
+        else:
+            to_fetch = []
+
+        if len(to_fetch) > 1:
+            results, failures = fetch_many(
+                lambda year: self._fetch_and_save_year(year, force_fetch),
+                to_fetch, max_workers)
+            for year in to_fetch:
+                if year in results:
+                    self.temperature_store.write(results[year])
+                    self.loaded_years.add(year)
+                    logger.debug(
+                        "{} performed concurrent fetch/cache of {} data."
+                        .format(self, year)
+                    )
+            for year, error in failures.items():
+                logger.warn(
+                    "{} failed concurrent fetch of {} data: {}"
+                    .format(self, year, error)
+                )
+            # failed years are retried once more below.
+            years = [year for year in years if year not in results]
+
+        for year in years:
             self.add_year(year, force_fetch)
 
+    @_with_load_lock
     def add_year(self, year, force_fetch=False):
         """Adds temperature data to internal pandas timeseries
 
@@ -105,12 +260,25 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             if locally available before actually fetching.
         """
         is_loaded = year in self.loaded_years
-        self.loaded_years.add(year)
+        if self.refresh == "offline":
+            if not is_loaded and self._year_saved(year):
+                self.temperature_store.write(self.load_series(year))
+                logger.debug(
+                    "{} loaded cached {} data."
+                    .format(self, year)
+                )
+            elif not is_loaded:
+                logger.warning(
+                    "{} did not fetch {} data because it is offline."
+                    .format(self, year)
+                )
+            self.loaded_years.add(year)
+            return
+
         if is_loaded:
             if force_fetch:  # it's loaded, but fetch anyway
-                new_series = self._fetch_year(year)
-                self.save_series(year, new_series)
-                self.tempC.update(new_series)
+                new_series = self._fetch_and_save_year(year, force_fetch)
+                self.temperature_store.write(new_series)
                 logger.debug(
                     "{} forced refetch of loaded {} data."
                     .format(self, year)
@@ -130,8 +298,7 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
                     .format(self, year)
                 )
             else:  # not saved locally, need to fetch
-                new_series = self._fetch_year(year)
-                self.save_series(year, new_series)
+                new_series = self._fetch_and_save_year(year, force_fetch)
                 if force_fetch:
                     logger.debug(
                         "{} forced refetch of cached {} data."
@@ -143,7 +310,68 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
                         .format(self, year)
                     )
 
-            self.tempC = self._merge_series(self.tempC, new_series)
+            self.temperature_store.write(new_series)
+            self.loaded_years.add(year)
+
+    @_with_load_lock
+    def refresh_year(self, year):
+        """Fetches temperature data for a year, but only adds and caches
+        observations newer than the last cached observation.
+
+        Parameters
+        ----------
+        year : int
+            The year for which data should be refreshed, e.g. 2017.
+        """
+        if self.refresh == "offline":
+            logger.debug(
+                "{} did not refresh {} data because it is offline."
+                .format(self, year)
+            )
+            return
+
+        key = self._get_cache_key(year)
+        was_saved = self._year_saved(year)
+        with self.cache_store.fetch_lock(key):
+            # checked again under the lock, so that a year missing from the
+            # cache is fetched once; workers which waited load what it saved.
+            if not was_saved:
+                if self._year_saved(year):
+                    new_series = self.load_series(year)
+                else:
+                    new_series = self._fetch_year(year)
+                    self.save_series(year, new_series)
+                self.temperature_store.write(new_series)
+                self.loaded_years.add(year)
+                logger.debug(
+                    "{} performed initial fetch/cache of {} data."
+                    .format(self, year)
+                )
+                return
+
+            cached_series = self.load_series(year)
+            last_cached = cached_series.last_valid_index()
+
+            new_series = self._fetch_year(year)
+            if last_cached is not None:
+                new_series = new_series[new_series.index > last_cached]
+            last_new = new_series.last_valid_index()
+            if last_new is None:
+                new_series = new_series[:0]
+            else:
+                new_series = new_series[:last_new]
+
+            self.cache_store.append_series(key, new_series, self.freq,
+                                           self.cache_date_format)
+
+        if year not in self.loaded_years:
+            self.temperature_store.write(cached_series)
+        self.temperature_store.write(new_series)
+        self.loaded_years.add(year)
+        logger.debug(
+            "{} refreshed {} data with {} new observations."
+            .format(self, year, new_series.count())
+        )
 
     def _get_cache_key(self, year):
         return self.cache_key_format.format(self.station, year)
@@ -153,9 +381,20 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         message = "The `_fetch_year()` method must be implemented."
         raise NotImplementedError(message)
 
+    def _fetch_and_save_year(self, year, force_fetch=False):
+        # only one worker (thread or process) fetches a year at a time;
+        # unless forced, workers which waited load the year it cached.
+        with self.cache_store.fetch_lock(self._get_cache_key(year)):
+            if not force_fetch and self._year_saved(year):
+                return self.load_series(year)
+            series = self._fetch_year(year)
+            self.save_series(year, series)
+            return series
+
     def _year_saved(self, year):
-        return self.json_store.key_exists(self._get_cache_key(year))
+        return self.cache_store.key_exists(self._get_cache_key(year))
 
+    @_with_load_lock
     def indexed_temperatures(self, index, unit, allow_mixed_frequency=False):
         ''' Return average temperatures over the given index.
 
@@ -177,8 +416,6 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         if index.shape == (0,):
             return pd.Series([], index=index, dtype=float)
 
-        self._verify_index_presence(index)  # fetches weather data if needed
-
         if index.freq is not None:
             freq = index.freq
         else:
@@ -187,6 +424,9 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             except ValueError:
                 freq = None
 
+        # fetches weather data if needed
+        self._verify_index_presence(index, freq)
+
         if freq == 'D':
             return self._daily_indexed_temperatures(index, unit)
         elif freq == 'H':
@@ -198,8 +438,8 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             raise ValueError(message)
 
     def _daily_indexed_temperatures(self, index, unit):
-        tempC = self.tempC.resample('D').mean()[index]
-        return self._unit_convert(tempC, unit)
+        temps = self.temperature_store.values_at(index, 'D', unit)
+        return pd.Series(temps, index=index, dtype=float)
 
     def _hourly_indexed_temperatures(self, index, unit):
         message = (
@@ -221,54 +461,122 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             )
             raise ValueError(message)
 
-        index_ = self._partitioned_multiindex(self.tempC.index, index)
+        tempC = self.tempC
+        period_codes, offsets = self._partitioned_multiindex(
+            tempC.index, index, return_codes=True)
 
-        if index_ is None:
+        if offsets.shape[0] == 0:
             message = 'Could not create partitioned mulitindex.'
             raise ValueError(message)
 
-        level = index_.names[1]
-        index_.get_level_values(level)
-        values = self.tempC.reindex(index_.get_level_values(level)).values
+        index_ = pd.MultiIndex.from_arrays(
+            [index[period_codes], tempC.index[offsets]],
+            names=self._partition_names(tempC.index))
+        values = tempC.values[offsets]
         tempC = pd.DataFrame(values, index=index_)
         return self._unit_convert(tempC, unit)
 
-    def _partitioned_multiindex(self, index_parts, index_periods, names=None):
-        if names is None:
-            if index_parts.freq == 'H':
-                names = ["period", "hourly"]
-            elif index_parts.freq == 'D':
-                names = ["period", "daily"]
-            else:
-                message = (
-                    'Unexpected temperature frequency "{}".'
-                    .format(index_parts.freq)
-                )
-                raise ValueError(message)
-
-        parts = iter(index_parts)
-        periods = iter(index_periods)
-
-        def _yield_index_tuples():
-            part = next(parts, None)
-            period_start = next(periods, None)
-            period_end = next(periods, None)
-            while part is not None:
-                if period_start is None or period_end is None:
-                    break
-                if part < period_start:
-                    part = next(parts, None)
-                elif period_start <= part < period_end:
-                    yield (period_start, part)
-                    part = next(parts, None)
-                else:
-                    period_start = period_end
-                    period_end = next(periods, None)
+    @staticmethod
+    def _partition_names(index_parts):
+        if index_parts.freq == 'H':
+            return ["period", "hourly"]
+        elif index_parts.freq == 'D':
+            return ["period", "daily"]
+        else:
+            message = (
+                'Unexpected temperature frequency "{}".'
+                .format(index_parts.freq)
+            )
+            raise ValueError(message)
+
+    def _partitioned_multiindex(self, index_parts, index_periods, names=None,
+                                return_codes=False):
+        ''' Partition timestamps by the periods they fall into.
+
+        Parameters
+        ----------
+        index_parts : pandas.DatetimeIndex
+            Sorted timestamps to partition, e.g., the temperature index.
+        index_periods : pandas.DatetimeIndex
+            Sorted period boundaries; period `i` covers
+            `[index_periods[i], index_periods[i + 1])`.
+        names : list of str, default None
+            Level names of the returned MultiIndex. If None, inferred from
+            the frequency of :code:`index_parts`.
+        return_codes : bool, default False
+            If True, return integer arrays instead of a MultiIndex.
 
-        index_tuples = list(_yield_index_tuples())
-        if index_tuples == []:
+        Returns
+        -------
+        index : pandas.MultiIndex or None
+            (period start, part) pairs for all parts falling into a
+            period, or None if there are none.
+        period_codes, offsets : numpy.ndarray
+            Returned instead if :code:`return_codes` is True: the position
+            of the period start in :code:`index_periods` and the position of
+            the part in :code:`index_parts`, for all parts falling into a
+            period.
+        '''
+        if names is None and not return_codes:
+            names = self._partition_names(index_parts)
+
+        periods = index_periods.asi8
+        # with repeated boundaries, parts belong to the last (non-empty)
+        # period starting at that boundary.
+        period_codes = np.searchsorted(
+            periods, index_parts.asi8, side='right') - 1
+        offsets = np.flatnonzero(
+            (period_codes >= 0) & (period_codes < periods.shape[0] - 1))
+        period_codes = period_codes[offsets]
+
+        if return_codes:
+            return period_codes, offsets
+
+        if offsets.shape[0] == 0:
             return None
-        return pd.MultiIndex.from_tuples(index_tuples, names=names)
+        return pd.MultiIndex.from_arrays(
+            [index_periods[period_codes], index_parts[offsets]], names=names)
+
+    @_with_load_lock
+    def degree_day_index(self, cdd_balance_points=(), hdd_balance_points=(),
+                         unit='degF'):
+        ''' Return cumulative daily degree days over all loaded temperature
+        data. Indexes are cached until more temperature data is loaded.
+
+        .. note::
+
+            Only covers years already loaded, e.g., with
+            `.add_year_range()` or `.indexed_temperatures()`.
+
+        Parameters
+        ----------
+        cdd_balance_points : list of int or float
+            Balance points for cooling degree days.
+        hdd_balance_points : list of int or float
+            Balance points for heating degree days.
+        unit : str, {"degF", "degC"}
+            Unit of temperatures and balance points.
+
+        Returns
+        -------
+        degree_day_index : eemeter.weather.degree_days.DegreeDayIndex
+        '''
+        key = (tuple(cdd_balance_points), tuple(hdd_balance_points), unit)
+        store = self.temperature_store
+        state = (id(store), store.version)
+        cached = self._degree_day_indexes.get(key)
+        if cached is None or cached[0] != state:
+            if store.empty:
+                daily_temps = pd.Series(dtype=float)
+            else:
+                values = store.aggregate('D', unit)
+                index = pd.date_range(pd.Timestamp(store.base, tz='UTC'),
+                                      periods=values.shape[0], freq='D')
+                daily_temps = pd.Series(values, index=index)
+            cached = (state, DegreeDayIndex(
+                daily_temps, cdd_balance_points, hdd_balance_points))
+            self._degree_day_indexes[key] = cached
+        return cached[1]
 
     def _get_min_period(self, index):
         return index.to_series().diff().dropna().min()
@@ -276,44 +584,29 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
     def _get_min_acceptable_period(self):
         return pd.Timedelta('1 days')
 
-    def _verify_index_presence(self, index):
+    def _verify_index_presence(self, index, freq=None):
         years = index.groupby(index.year).keys()
-        for year in sorted(years):  # sorted for logging aesthetics
-            self.add_year(year)
+        self.add_years(sorted(years))  # sorted for logging aesthetics
 
     def save_series(self, year, series):
         key = self._get_cache_key(year)
-        data = [
-            [
-                d.strftime(self.cache_date_format), t
-                if pd.notnull(t) else None
-            ]
-            for d, t in series.iteritems()
-        ]
-        self.json_store.save_json(key, data)
+        self.cache_store.save_series(key, series, self.freq,
+                                     self.cache_date_format)
 
     def load_series(self, year):
         key = self._get_cache_key(year)
-        data = self.json_store.retrieve_json(key)
-        if data is None:
+        series = self.cache_store.retrieve_series(key, self.freq,
+                                                  self.cache_date_format)
+        if series is None:
             raise KeyError("Key `{}` not found in cache.".format(key))
+        return series
 
-        index = pd.to_datetime([d[0] for d in data],
-                               format=self.cache_date_format, utc=True)
-        values = [d[1] for d in data]
-
-        # changed for pandas > 0.18
-        return pd.Series(values, index=index, dtype=float) \
-            .sort_index().resample(self.freq).mean()
-
-    def _merge_series(self, a, b):
-        return a.append(b).sort_index().resample(self.freq).mean()
-
+    @_with_load_lock
     def load_cached(self, year_from, year_to):
         for year in range(year_from, year_to):
             if self._year_saved(year):
                 cached_series = self.load_series(year)
-                self.tempC = self._merge_series(self.tempC, cached_series)
+                self.temperature_store.write(cached_series)
 
 
 class GSODWeatherSource(NOAAWeatherSourceBase):
@@ -417,18 +710,194 @@ class ISDWeatherSource(NOAAWeatherSourceBase):
 
     cache_date_format = "%Y%m%d%H"
     cache_key_format = "ISD-{}-{}.json"
+    daily_cache_date_format = "%Y%m%d"
+    daily_cache_key_format = "ISD-{}-{}-daily.json"
+    daily_count_cache_key_format = "ISD-{}-{}-daily-count.json"
     year_existence_format = "{}-01-01 00"
     freq = "H"
 
+    def __init__(self, *args, **kwargs):
+        # daily means of years loaded for daily-frequency queries.
+        self.daily_store = TemperatureStore('D')
+        self.daily_loaded_years = set()
+        super(ISDWeatherSource, self).__init__(*args, **kwargs)
+
     def __repr__(self):
         return 'ISDWeatherSource("{}")'.format(self.station)
 
+    @NOAAWeatherSourceBase.tempC.getter
+    @_with_load_lock
+    def tempC(self):
+        ''' Loaded temperatures in degC as a pandas Series, materialized
+        lazily from the underlying :code:`TemperatureStore`. Years loaded
+        only as daily means are loaded hourly first.
+        '''
+        self._load_daily_only_years()
+        return self.temperature_store.to_series()
+
+    def nbytes(self):
+        return self.temperature_store.nbytes + self.daily_store.nbytes
+
+    def _load_daily_only_years(self):
+        # hourly data for years loaded only for daily queries.
+        years = sorted(self.daily_loaded_years - self.loaded_years)
+        if len(years) > 0:
+            self.add_years(years)
+
+    @_with_load_lock
+    def degree_day_index(self, cdd_balance_points=(), hdd_balance_points=(),
+                         unit='degF'):
+        ''' Return cumulative daily degree days over all loaded temperature
+        data, including years loaded only for daily queries (see
+        :code:`NOAAWeatherSourceBase.degree_day_index`).
+        '''
+        self._load_daily_only_years()
+        return super(ISDWeatherSource, self).degree_day_index(
+            cdd_balance_points, hdd_balance_points, unit)
+
     def _fetch_year(self, year):
         return self.client.get_isd_data(self.station, year)
 
+    @staticmethod
+    def daily_aggregates(series):
+        ''' Daily means and numbers of valid (non-null) hourly temperatures,
+        over UTC days.
+
+        Parameters
+        ----------
+        series : pandas.Series
+            Hourly temperatures.
+
+        Returns
+        -------
+        means, counts : pandas.Series
+            Daily mean temperatures and valid hour counts.
+        '''
+        store = TemperatureStore('H')
+        store.write(series)
+        if store.empty:
+            empty = pd.Series([], index=pd.DatetimeIndex([], tz=pytz.UTC),
+                              dtype=float)
+            return empty, empty
+
+        lo, hi = store.lo // 24, (store.hi + 23) // 24
+        index = pd.date_range(
+            pd.Timestamp(store.base, tz=pytz.UTC) + pd.Timedelta(days=lo),
+            periods=hi - lo, freq='D', tz=pytz.UTC)
+        means = pd.Series(store.aggregate('D')[lo:hi], index=index)
+        counts = pd.Series(store.daily_counts()[lo:hi], index=index,
+                           dtype=float)
+        return means, counts
+
+    def _get_daily_cache_keys(self, year):
+        return (self.daily_cache_key_format.format(self.station, year),
+                self.daily_count_cache_key_format.format(self.station, year))
+
+    def _save_daily_aggregates(self, year, series):
+        means, counts = self.daily_aggregates(series)
+        means_key, counts_key = self._get_daily_cache_keys(year)
+        self.cache_store.save_series_many(
+            [(means_key, means), (counts_key, counts)], 'D',
+            self.daily_cache_date_format)
+        self.daily_loaded_years.discard(year)
+
+    def save_series(self, year, series):
+        ''' Cache hourly temperatures for a year along with their daily
+        aggregates (see :code:`daily_aggregates`).
+        '''
+        super(ISDWeatherSource, self).save_series(year, series)
+        self._save_daily_aggregates(year, series)
+
+    def load_daily_aggregates(self, year):
+        ''' Load the cached daily aggregates for a year (see
+        :code:`daily_aggregates`).
+
+        Parameters
+        ----------
+        year : int
+            Year of aggregates to load.
+
+        Returns
+        -------
+        means, counts : pandas.Series
+            Daily mean temperatures and valid hour counts.
+        '''
+        means, counts = [
+            self.cache_store.retrieve_series(
+                key, 'D', self.daily_cache_date_format)
+            for key in self._get_daily_cache_keys(year)
+        ]
+        if means is None or counts is None:
+            raise KeyError(
+                "Daily aggregates for {} not found in cache.".format(year))
+        return means, counts
+
+    @_with_load_lock
+    def refresh_year(self, year):
+        super(ISDWeatherSource, self).refresh_year(year)
+        # appended observations change the daily aggregates of the year.
+        if self.refresh != "offline" and self._year_saved(year):
+            self._save_daily_aggregates(year, self.load_series(year))
+
+    @_with_load_lock
+    def add_daily_years(self, years):
+        ''' Adds daily mean temperatures for several years. These are read
+        from the daily aggregates in the cache where available, so that
+        hourly data is only loaded (or fetched) for years without them.
+
+        Parameters
+        ----------
+        years : list of int
+            The years for which data should be added.
+        '''
+        years = [y for y in years if y not in self.daily_loaded_years]
+        missing = self._load_cached_daily_means(years)
+        if len(missing) == 0:
+            return
+
+        # hourly data is fetched (saving its aggregates) if it isn't cached.
+        self.add_years(missing)
+        missing = self._load_cached_daily_means(missing)
+
+        # years cached before daily aggregates were kept.
+        for year in missing:
+            if self._year_saved(year):
+                series = self.load_series(year)
+                self._save_daily_aggregates(year, series)
+                self.daily_store.write(self.daily_aggregates(series)[0])
+                self.daily_loaded_years.add(year)
+
+    def _load_cached_daily_means(self, years):
+        # loads cached daily means into the daily store; returns the years
+        # without them.
+        keys = {
+            year: self._get_daily_cache_keys(year)[0] for year in years
+        }
+        cached_keys = self.cache_store.existing_keys(keys.values())
+        missing = []
+        for year in years:
+            if keys[year] in cached_keys:
+                self.daily_store.write(self.cache_store.retrieve_series(
+                    keys[year], 'D', self.daily_cache_date_format))
+                self.daily_loaded_years.add(year)
+            else:
+                missing.append(year)
+        return missing
+
+    def _verify_index_presence(self, index, freq=None):
+        if freq == 'D':
+            years = index.groupby(index.year).keys()
+            self.add_daily_years(sorted(years))
+        else:
+            super(ISDWeatherSource, self)._verify_index_presence(index, freq)
+
+    def _daily_indexed_temperatures(self, index, unit):
+        temps = self.daily_store.values_at(index, 'D', unit)
+        return pd.Series(temps, index=index, dtype=float)
+
     def _hourly_indexed_temperatures(self, index, unit):
-        tempC = self.tempC.resample(self.freq).mean()[index]
-        return self._unit_convert(tempC, unit)
+        temps = self.temperature_store.values_at(index, 'H', unit)
+        return pd.Series(temps, index=index, dtype=float)
 
     def _get_min_acceptable_period(self):
         return pd.Timedelta('1 hours')
@@ -0,0 +1,189 @@
+from io import BytesIO, StringIO
+
+import numpy as np
+import pandas as pd
+import pytz
+
+
+# hour-of-year offsets of the first hour of each month in the (non-leap)
+# year 1900 used to index weather normals.
+NORMAL_YEAR_MONTH_START_HOURS = 24 * np.cumsum(
+    [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+NORMAL_YEAR_HOURS = 8760
+
+
+def _line_starts(buf):
+    # offsets of the first byte of every line in the buffer.
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate([[0], newlines + 1])
+    return starts[starts < buf.shape[0]]
+
+
+def _fixed_width_ints(buf, starts, start_col, end_col):
+    # gather the digits in columns [start_col, end_col) of every line into an
+    # (n_lines, width) array and fold them into integers.
+    offsets = np.arange(start_col, end_col)
+    digits = buf[starts[:, np.newaxis] + offsets].astype(np.int64) - ord('0')
+    place_values = 10 ** np.arange(end_col - start_col - 1, -1, -1)
+    return digits.dot(place_values)
+
+
+def _datetime64_hours(years, months, days, hours):
+    dt = (years - 1970).astype('M8[Y]').astype('M8[M]') + \
+        (months - 1).astype('m8[M]')
+    dt = dt.astype('M8[D]') + (days - 1).astype('m8[D]')
+    return dt.astype('M8[h]') + hours.astype('m8[h]')
+
+
+def parse_isd_data(data, year):
+    ''' Parse the contents of a decompressed yearly ISD file into an hourly
+    temperature series.
+
+    Date and temperature columns are sliced out of the fixed-width records
+    for all lines at once. Multiple readings in the same hour are floored
+    to the hour and only the first non-missing reading is kept.
+
+    Parameters
+    ----------
+    data : bytes
+        Decompressed contents of a `{station}-{year}.gz` ISD file.
+    year : {int, str}
+        Year of the file. The returned series spans this year and the next,
+        matching :code:`NOAAClient.get_isd_data`.
+
+    Returns
+    -------
+    series : pandas.Series
+        Hourly temperatures in degC, indexed by a UTC DatetimeIndex.
+    '''
+    dates = pd.date_range("{}-01-01 00:00".format(year),
+                          "{}-12-31 23:00".format(int(year) + 1),
+                          freq='H', tz=pytz.UTC)
+    values = np.empty(dates.shape[0])
+    values.fill(np.nan)
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts = _line_starts(buf)
+    starts = starts[starts + 92 <= buf.shape[0]]  # drop truncated records
+
+    if starts.shape[0] > 0:
+        # date columns 15-27 are YYYYMMDDHHMM; minutes are dropped.
+        dt = _datetime64_hours(
+            _fixed_width_ints(buf, starts, 15, 19),
+            _fixed_width_ints(buf, starts, 19, 21),
+            _fixed_width_ints(buf, starts, 21, 23),
+            _fixed_width_ints(buf, starts, 23, 25),
+        )
+        positions = (
+            dt - np.datetime64("{}-01-01T00".format(year), 'h')
+        ).astype(np.int64)
+
+        # air temperature is a signed tenths-of-degC field in columns 87-92.
+        magnitude = _fixed_width_ints(buf, starts, 88, 92)
+        sign = np.where(buf[starts + 87] == ord('-'), -1., 1.)
+        temps = sign * magnitude / 10.
+        missing = magnitude == 9999
+
+        keep = ~missing & (positions >= 0) & (positions < values.shape[0])
+        positions, temps = positions[keep], temps[keep]
+
+        # np.unique reports the first occurrence of each hour.
+        unique_positions, first = np.unique(positions, return_index=True)
+        values[unique_positions] = temps[first]
+
+    return pd.Series(values, index=dates, dtype=float)
+
+
+def parse_gsod_data(data, year):
+    ''' Parse the contents of a decompressed yearly GSOD file into a daily
+    temperature series.
+
+    Parameters
+    ----------
+    data : bytes
+        Decompressed contents of a `{station}-{year}.op.gz` GSOD file.
+    year : {int, str}
+        Year of the file.
+
+    Returns
+    -------
+    series : pandas.Series
+        Daily mean temperatures in degC, indexed by a UTC DatetimeIndex.
+    '''
+    dates = pd.date_range("{}-01-01 00:00".format(year),
+                          "{}-12-31 00:00".format(year),
+                          freq='D', tz=pytz.UTC)
+    values = np.empty(dates.shape[0])
+    values.fill(np.nan)
+
+    # columns are STN--- WBAN YEARMODA TEMP ...; the first line is a header.
+    df = pd.read_csv(BytesIO(data), sep=r'\s+', header=None, skiprows=1,
+                     usecols=[2, 3], names=['yearmoda', 'temp_F'],
+                     dtype={'yearmoda': np.int64, 'temp_F': float})
+
+    if df.shape[0] > 0:
+        yearmoda = df.yearmoda.values
+        dt = _datetime64_hours(yearmoda // 10000, yearmoda // 100 % 100,
+                               yearmoda % 100, np.zeros_like(yearmoda))
+        positions = (
+            dt - np.datetime64("{}-01-01T00".format(year), 'h')
+        ).astype(np.int64) // 24
+        temps = (5. / 9.) * (df.temp_F.values - 32.)
+
+        keep = (positions >= 0) & (positions < values.shape[0])
+        values[positions[keep]] = temps[keep]
+
+    return pd.Series(values, index=dates, dtype=float)
+
+
+def normal_year_hourly_index():
+    ''' Hourly UTC index covering the normal year 1900.
+    '''
+    return pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
+                         freq='H', tz=pytz.UTC)
+
+
+def parse_tmy3_data(text):
+    ''' Parse a TMY3-formatted CSV file (as published for TMY3 and CZ2010
+    weather normals) into an hourly temperature series for the year 1900.
+
+    Local standard time stamps are shifted to UTC using the station UTC offset
+    found in the file header; hours shifted past either end of the year wrap
+    around to the other end. UTC offsets are whole hours for all supported
+    stations.
+
+    Parameters
+    ----------
+    text : str
+        Contents of the CSV file.
+
+    Returns
+    -------
+    series : pandas.Series
+        Hourly dry-bulb temperatures in degC, indexed by a UTC
+        DatetimeIndex covering 1900.
+    '''
+    index = normal_year_hourly_index()
+    values = np.empty(index.shape[0])
+    values.fill(np.nan)
+
+    header = text.split('\n', 1)[0]
+    utc_offset_hours = int(round(float(header.split(',')[3])))
+
+    # first line holds station metadata, second line holds column names;
+    # dates are MM/DD/YYYY and hours are 01:00-24:00 local standard time.
+    df = pd.read_csv(StringIO(text), header=None, skiprows=2,
+                     usecols=[0, 1, 31], names=['date', 'time', 'temp_C'],
+                     dtype={'date': str, 'time': str, 'temp_C': float})
+
+    if df.shape[0] > 0:
+        months = df.date.str.slice(0, 2).astype(np.int64).values
+        days = df.date.str.slice(3, 5).astype(np.int64).values
+        hours = df.time.str.slice(0, 2).astype(np.int64).values - 1
+
+        positions = NORMAL_YEAR_MONTH_START_HOURS[months - 1] + \
+            24 * (days - 1) + hours - utc_offset_hours
+        positions %= NORMAL_YEAR_HOURS
+        values[positions] = df.temp_C.values
+
+    return pd.Series(values, index=index, dtype=float)
@@ -0,0 +1,229 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# environment variables which supply defaults for weather source keyword
+# arguments; sources created under different settings are not shared.
+_ENVIRONMENT_DEFAULTS = (
+    ("cache_backend", "EEMETER_WEATHER_CACHE_BACKEND"),
+    ("refresh", "EEMETER_WEATHER_REFRESH"),
+    ("mirror_directory", "EEMETER_WEATHER_MIRROR_DIRECTORY"),
+)
+
+
+def _get_default_max_bytes():
+    max_bytes = os.environ.get("EEMETER_WEATHER_SOURCE_REGISTRY_MAX_BYTES")
+    if max_bytes is None:
+        return 2 ** 30  # 1 GiB
+    return int(max_bytes)
+
+
+class WeatherSourceRegistry(object):
+    ''' Process-wide collection of weather sources which hands back already
+    created (and already loaded) sources instead of building a new one for
+    every meter run.
+
+    Sources are keyed by source class, station, cache URL and any other
+    constructor arguments, including the environment variables they default
+    to. When the
+    approximate memory held by the loaded temperature data exceeds
+    :code:`max_bytes`, the least recently used sources are evicted.
+
+    Sources are created outside of the registry lock, so creating one source
+    (which may read the cache or fetch data) does not hold up others. Sources
+    which keep recent data up to date (NOAA sources) are checked for stale
+    data again when handed back more than :code:`recheck_interval` after
+    their last check.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather import ISDWeatherSource
+        >>> from eemeter.weather.registry import weather_source_registry
+        >>> ws = weather_source_registry.get(ISDWeatherSource, "722880")
+        >>> weather_source_registry.get(ISDWeatherSource, "722880") is ws
+        True
+
+    Parameters
+    ----------
+    max_bytes : int, default None
+        Approximate memory cap for temperature data held by registered
+        sources. If None, uses the EEMETER_WEATHER_SOURCE_REGISTRY_MAX_BYTES
+        environment variable, falling back to 1 GiB.
+    recheck_interval : datetime.timedelta, default 1 hour
+        Minimum time between checks of a registered source for stale data.
+    '''
+
+    def __init__(self, max_bytes=None, recheck_interval=timedelta(hours=1)):
+        if max_bytes is None:
+            max_bytes = _get_default_max_bytes()
+        self.max_bytes = max_bytes
+        self.recheck_interval = recheck_interval
+        self.sources = OrderedDict()
+        self.checked = {}  # key -> time of last check for stale data
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._key_locks = {}  # key -> [lock held while creating, n users]
+
+    def __repr__(self):
+        return (
+            'WeatherSourceRegistry(n_sources={}, hits={}, misses={},'
+            ' evictions={})'
+            .format(len(self.sources), self.hits, self.misses,
+                    self.evictions)
+        )
+
+    @staticmethod
+    def _get_key(source_class, station, cache_url, kwargs):
+        if cache_url is None:
+            cache_url = os.environ.get("EEMETER_WEATHER_CACHE_URL")
+        kwargs = dict(kwargs)
+        for name, variable in _ENVIRONMENT_DEFAULTS:
+            if kwargs.get(name) is None:
+                kwargs[name] = os.environ.get(variable)
+        return (source_class, station, cache_url,
+                tuple(sorted(kwargs.items())))
+
+    def get(self, source_class, station, cache_url=None, **kwargs):
+        ''' Return a registered weather source, creating it if necessary.
+
+        Parameters
+        ----------
+        source_class : type
+            Weather source class, e.g.,
+            :code:`eemeter.weather.ISDWeatherSource`.
+        station : str
+            Station identifier passed to the weather source.
+        cache_url : str, default None
+            Weather cache database URL passed to the weather source.
+        **kwargs
+            Other keyword arguments passed to the weather source, e.g.,
+            :code:`mirror_directory`.
+
+        Returns
+        -------
+        weather_source : eemeter.weather.WeatherSourceBase
+            Weather source instance shared by all callers using the same
+            source class, station, cache URL and keyword arguments.
+        '''
+        key = self._get_key(source_class, station, cache_url, kwargs)
+        source = self._get_registered(key)
+        if source is not None:
+            return source
+
+        # creation locks are counted so that they can be dropped once no
+        # thread is creating or waiting on the source.
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = [threading.Lock(), 0]
+            key_lock[1] += 1
+
+        try:
+            # only one thread creates a given source; others wait for it.
+            with key_lock[0]:
+                source = self._get_registered(key)
+                if source is not None:
+                    return source
+
+                with self._lock:
+                    self.misses += 1
+
+                # errors (e.g., unrecognized stations) propagate to caller.
+                source = source_class(station, cache_url, **kwargs)
+                logger.debug("Registered {}.".format(source))
+
+                with self._lock:
+                    self.sources[key] = source  # most recently used goes last
+                    self.checked[key] = datetime.now()
+                    self._evict()
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+        return source
+
+    def _get_registered(self, key):
+        # returns a registered source, checking it for stale data if due.
+        with self._lock:
+            source = self.sources.pop(key, None)
+            if source is None:
+                return None
+            self.hits += 1
+            self.sources[key] = source  # most recently used goes last
+            self._evict()
+
+            now = datetime.now()
+            recheck = (
+                hasattr(source, "_check_for_recent_data") and
+                now - self.checked.get(key, now) >= self.recheck_interval
+            )
+            if recheck:
+                self.checked[key] = now
+
+        if recheck:
+            source._check_for_recent_data()
+        return source
+
+    def nbytes(self):
+        ''' Approximate memory held by registered sources, in bytes.
+        '''
+        with self._lock:
+            return sum(s.nbytes() for s in self.sources.values())
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+
+        sizes = OrderedDict(
+            (key, source.nbytes())
+            for key, source in self.sources.items()
+        )
+        total = sum(sizes.values())
+
+        # never evict the most recently used source.
+        while total > self.max_bytes and len(self.sources) > 1:
+            key, source = self.sources.popitem(last=False)
+            self.checked.pop(key, None)
+            total -= sizes[key]
+            self.evictions += 1
+            logger.debug("Evicted {} from registry.".format(source))
+
+    def stats(self):
+        ''' Registry usage counters.
+
+        Returns
+        -------
+        stats : dict
+            Keys are :code:`"hits"`, :code:`"misses"`, :code:`"evictions"`,
+            :code:`"n_sources"` and :code:`"nbytes"`.
+        '''
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "n_sources": len(self.sources),
+                "nbytes": self.nbytes(),
+            }
+
+    def clear(self):
+        ''' Remove all registered sources and reset counters.
+        '''
+        with self._lock:
+            self.sources.clear()
+            self.checked.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+weather_source_registry = WeatherSourceRegistry()
@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+import pytz
+
+from .base import WeatherSourceBase
+
+
+_STEP_NANOS = {
+    'H': 3600 * 10 ** 9,
+    'D': 86400 * 10 ** 9,
+}
+
+
+def _year_start_nanos(year):
+    return np.datetime64('{:04d}-01-01'.format(year), 'ns').astype(np.int64)
+
+
+def _nanos_year(nanos):
+    return int(np.datetime64(int(nanos), 'ns').astype('M8[Y]')
+               .astype(np.int64)) + 1970
+
+
+class TemperatureStore(object):
+    ''' Preallocated, contiguous array of temperatures bucketed by calendar
+    year.
+
+    The array starts on January 1 of its first year and grows by whole years
+    (geometrically, so loading many years costs amortized linear copying).
+    Writing a series places its values by integer offset without re-sorting
+    or resampling data that is already stored; lookups read by integer
+    offset as well. Daily and hourly aggregates in each unit are computed
+    once and kept until the next write.
+
+    Parameters
+    ----------
+    freq : str, {"H", "D"}
+        Frequency of stored temperatures.
+    '''
+
+    def __init__(self, freq):
+        if freq not in _STEP_NANOS:
+            message = 'Unexpected temperature frequency "{}".'.format(freq)
+            raise ValueError(message)
+        self.freq = freq
+        self.step = _STEP_NANOS[freq]
+        self.first_year = None
+        self.last_year = None
+        self.values = np.empty(0)
+        self.base = None  # nanoseconds since epoch of values[0]
+
+        # offsets bounding all written data, [lo, hi).
+        self.lo = None
+        self.hi = None
+
+        self.version = 0  # incremented on every write
+        self._series = None  # lazily materialized view
+        self._aggregates = {}
+
+    def __repr__(self):
+        return 'TemperatureStore("{}", years={}-{})'.format(
+            self.freq, self.first_year, self.last_year)
+
+    @property
+    def empty(self):
+        return self.lo is None
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _offsets(self, nanos):
+        return (np.asarray(nanos, dtype=np.int64) - self.base) // self.step
+
+    def _reserve(self, first_year, last_year):
+        if self.first_year is None:
+            new_first, new_last = first_year, last_year
+        elif first_year >= self.first_year and last_year <= self.last_year:
+            return
+        else:
+            n_years = self.last_year - self.first_year + 1
+            new_first, new_last = self.first_year, self.last_year
+            if first_year < self.first_year:
+                new_first = min(first_year, self.first_year - n_years)
+            if last_year > self.last_year:
+                new_last = max(last_year, self.last_year + n_years)
+
+        new_base = _year_start_nanos(new_first)
+        size = (_year_start_nanos(new_last + 1) - new_base) // self.step
+        values = np.empty(size)
+        values.fill(np.nan)
+
+        if self.first_year is not None:
+            shift = (self.base - new_base) // self.step
+            values[shift:shift + self.values.shape[0]] = self.values
+            self.lo += shift
+            self.hi += shift
+
+        self.values = values
+        self.base = new_base
+        self.first_year = new_first
+        self.last_year = new_last
+
+    def write(self, series):
+        ''' Write non-null temperatures from a series into the store.
+
+        Parameters
+        ----------
+        series : pandas.Series
+            Temperatures indexed by a time-zone aware DatetimeIndex. Series
+            not at the store frequency are resampled first.
+        '''
+        if series.shape[0] == 0:
+            return
+
+        if series.index.freq is None or series.index.freqstr != self.freq:
+            series = series.sort_index().resample(self.freq).mean()
+
+        nanos = series.index.asi8
+        self._reserve(_nanos_year(nanos[0]), _nanos_year(nanos[-1]))
+
+        start = int(self._offsets(nanos[0]))
+        end = start + nanos.shape[0]
+        values = series.values.astype(float)
+        mask = ~np.isnan(values)
+        self.values[start:end][mask] = values[mask]
+
+        if self.lo is None:
+            self.lo, self.hi = start, end
+        else:
+            self.lo, self.hi = min(self.lo, start), max(self.hi, end)
+
+        self.version += 1
+        self._series = None
+        self._aggregates = {}
+
+    def _daily_sums_and_counts(self):
+        periods_per_day = _STEP_NANOS['D'] // self.step
+        values = self.values.reshape(-1, periods_per_day)
+        not_null = ~np.isnan(values)
+        counts = not_null.sum(axis=1)
+        sums = np.where(not_null, values, 0.).sum(axis=1)
+        return sums, counts
+
+    def _daily_means(self):
+        sums, counts = self._daily_sums_and_counts()
+
+        means = np.empty(sums.shape[0])
+        means.fill(np.nan)
+        has_data = counts > 0
+        means[has_data] = sums[has_data] / counts[has_data]
+        return means
+
+    def daily_counts(self):
+        ''' Number of non-null stored temperatures in each day, aligned with
+        the start of the store.
+
+        Returns
+        -------
+        counts : numpy.ndarray
+            Counts of non-null temperatures.
+        '''
+        return self._daily_sums_and_counts()[1]
+
+    def aggregate(self, freq, unit='degC'):
+        ''' Stored temperatures at the given frequency and unit, aligned with
+        the start of the store. Computed once and cached until the next write.
+
+        Parameters
+        ----------
+        freq : str, {"H", "D"}
+            Frequency of aggregated temperatures. Daily values are means of
+            non-null temperatures in each day.
+        unit : str, {"degC", "degF"}
+            Unit of aggregated temperatures.
+
+        Returns
+        -------
+        values : numpy.ndarray
+            Aggregated temperatures; treat as read-only.
+        '''
+        key = (freq, unit)
+        if key not in self._aggregates:
+            if freq == self.freq:
+                values = self.values
+            elif freq == 'D' and self.freq == 'H':
+                values = self._daily_means()
+            else:
+                message = (
+                    'Cannot aggregate "{}" temperatures to frequency "{}".'
+                    .format(self.freq, freq)
+                )
+                raise ValueError(message)
+            self._aggregates[key] = WeatherSourceBase._unit_convert(
+                values, unit)
+        return self._aggregates[key]
+
+    def values_at(self, index, freq=None, unit='degC'):
+        ''' Stored temperatures at the given timestamps.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Time-zone aware timestamps at frequency :code:`freq`.
+        freq : str, {"H", "D"}, default None
+            Frequency of returned temperatures. Defaults to the store
+            frequency.
+        unit : str, {"degC", "degF"}
+            Unit of returned temperatures.
+
+        Returns
+        -------
+        values : numpy.ndarray
+            Temperatures; NaN where nothing is stored.
+        '''
+        if freq is None:
+            freq = self.freq
+
+        values = np.empty(index.shape[0])
+        values.fill(np.nan)
+        if self.empty:
+            return WeatherSourceBase._unit_convert(values, unit)
+
+        aggregate = self.aggregate(freq, unit)
+        positions = (index.asi8 - self.base) // _STEP_NANOS[freq]
+        valid = (positions >= 0) & (positions < aggregate.shape[0])
+        values[valid] = aggregate[positions[valid]]
+        return values
+
+    def to_series(self):
+        ''' Stored temperatures as a pandas Series spanning all written data.
+
+        Returns
+        -------
+        series : pandas.Series
+            Series backed by the store array; treat as read-only.
+        '''
+        if self._series is None:
+            if self.empty:
+                self._series = pd.Series(dtype=float)
+            else:
+                start = pd.Timestamp(self.base + self.lo * self.step,
+                                     tz=pytz.UTC)
+                index = pd.date_range(start, periods=self.hi - self.lo,
+                                      freq=self.freq, tz=pytz.UTC)
+                self._series = pd.Series(self.values[self.lo:self.hi],
+                                         index=index, dtype=float)
+        return self._series
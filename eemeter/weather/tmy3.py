@@ -1,5 +1,5 @@
 from .base import NormalHourlyWeatherSourceBase
-from .clients import TMY3Client
+from .clients import MirrorTMY3Client, TMY3Client
 
 
 class TMY3WeatherSource(NormalHourlyWeatherSourceBase):
@@ -51,3 +51,4 @@ class TMY3WeatherSource(NormalHourlyWeatherSourceBase):
 
     station_type = 'TMY3'
     client = TMY3Client()
+    mirror_client_class = MirrorTMY3Client
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+import logging
+
+from .cz2010 import CZ2010WeatherSource
+from .fetch import iter_fetch_many
+from .location import (
+    zipcode_to_cz2010_station,
+    zipcode_to_tmy3_station,
+    zipcode_to_usaf_station,
+)
+from .noaa import ISDWeatherSource
+from .tmy3 import TMY3WeatherSource
+
+logger = logging.getLogger(__name__)
+
+
+def plan_weather_cache_warmup(targets, normals=True, use_cz2010=False):
+    ''' Resolve ZIP codes and stations to the ISD station-years and weather
+    normal stations needed to analyze them.
+
+    Parameters
+    ----------
+    targets : list of (str, int, int)
+        :code:`(target, start_year, end_year)` tuples, where :code:`target`
+        is a 5-digit ZIP code or a 6-digit USAF station.
+    normals : bool, default True
+        If True, also resolve weather normal stations.
+    use_cz2010 : bool, default False
+        If True, map ZIP codes to CZ2010 stations and use CZ2010 weather
+        normals instead of TMY3.
+
+    Returns
+    -------
+    isd_station_years : collections.OrderedDict
+        Sorted lists of years keyed by ISD station.
+    normal_stations : list of str
+        Weather normal stations.
+    unresolved : list of str
+        Targets which could not be mapped to a station.
+    '''
+    normal_source_class = \
+        CZ2010WeatherSource if use_cz2010 else TMY3WeatherSource
+    normal_station_index = normal_source_class.client._load_station_index()
+
+    isd_station_years = OrderedDict()
+    normal_stations = []
+    unresolved = []
+
+    for target, start_year, end_year in targets:
+        if len(target) == 5:  # ZIP code
+            if use_cz2010:
+                isd_station = zipcode_to_cz2010_station(target)
+                normal_station = isd_station
+            else:
+                isd_station = zipcode_to_usaf_station(target)
+                normal_station = zipcode_to_tmy3_station(target)
+        else:
+            isd_station = target
+            if target in normal_station_index:
+                normal_station = target
+            else:
+                normal_station = None
+
+        if isd_station is None:
+            unresolved.append(target)
+            continue
+
+        years = isd_station_years.setdefault(isd_station, set())
+        years.update(range(start_year, end_year + 1))
+
+        if normals and normal_station is not None and \
+                normal_station not in normal_stations:
+            normal_stations.append(normal_station)
+
+    for station, years in isd_station_years.items():
+        isd_station_years[station] = sorted(years)
+
+    return isd_station_years, normal_stations, unresolved
+
+
+def warm_weather_cache(isd_station_years, normal_stations=(),
+                       use_cz2010=False, cache_url=None, max_workers=8,
+                       progress=None, mirror_directory=None):
+    ''' Fetch all uncached ISD station-years and weather normals
+    concurrently and save them to the weather cache, so that later meter
+    runs find their weather data cached.
+
+    Parameters
+    ----------
+    isd_station_years : dict
+        Lists of years keyed by ISD station, e.g., from
+        :code:`plan_weather_cache_warmup`.
+    normal_stations : list of str
+        Weather normal stations.
+    use_cz2010 : bool, default False
+        If True, :code:`normal_stations` are CZ2010 stations; otherwise,
+        TMY3 stations.
+    cache_url : str, default None
+        SQLAlchemy compatible weather cache database URL.
+    max_workers : int, default 8
+        Number of concurrent fetches.
+    progress : callable, default None
+        Called as :code:`progress(item, n_done, n_total, error)` as each
+        fetch completes, where :code:`error` is None on success.
+    mirror_directory : str, default None
+        Root directory of a local mirror of weather data files, read
+        instead of the remote sources. If None, uses the
+        EEMETER_WEATHER_MIRROR_DIRECTORY environment variable, if set.
+
+    Returns
+    -------
+    report : dict
+        - :code:`"fetched"`: items fetched and cached.
+        - :code:`"cached"`: items which were already cached.
+        - :code:`"failures"`: error messages keyed by item.
+        - :code:`"bytes_transferred"`: bytes downloaded.
+
+        Items are :code:`("ISD", station, year)` or
+        :code:`(<"TMY3" or "CZ2010">, station)` tuples.
+    '''
+    normal_source_class = \
+        CZ2010WeatherSource if use_cz2010 else TMY3WeatherSource
+    station_type = normal_source_class.station_type
+
+    report = {
+        "fetched": [],
+        "cached": [],
+        "failures": OrderedDict(),
+        "bytes_transferred": 0,
+    }
+    items = []
+
+    isd_sources = {}
+    for station, years in isd_station_years.items():
+        try:
+            # offline, so that creating sources doesn't refresh recent
+            # data one station at a time before the concurrent fetches.
+            ws = ISDWeatherSource(station, cache_url, refresh="offline",
+                                  mirror_directory=mirror_directory)
+        except Exception as e:
+            report["failures"][("ISD", station)] = str(e)
+            continue
+        isd_sources[station] = ws
+        for year in years:
+            item = ("ISD", station, year)
+            if ws._year_saved(year):
+                report["cached"].append(item)
+            else:
+                items.append(item)
+
+    normal_sources = {}
+    for station in normal_stations:
+        item = (station_type, station)
+        try:
+            ws = normal_source_class(station, cache_url, preload=False,
+                                     mirror_directory=mirror_directory)
+        except Exception as e:
+            report["failures"][item] = str(e)
+            continue
+        normal_sources[station] = ws
+        if ws.cache_store.key_exists(ws._get_cache_key()):
+            report["cached"].append(item)
+        else:
+            items.append(item)
+
+    def _fetch(source_type, station, year=None):
+        if source_type == "ISD":
+            return isd_sources[station]._fetch_year(year)
+        else:
+            return normal_sources[station].client \
+                .get_hourly_weather_normal_data(station)
+
+    # clients of the sources (mirror clients, if a mirror is used), which
+    # are shared between sources.
+    clients = {}
+    for ws in list(isd_sources.values()) + list(normal_sources.values()):
+        clients[id(ws.client)] = ws.client
+    initial_bytes = {
+        key: getattr(c, 'bytes_transferred', 0) for key, c in clients.items()
+    }
+
+    outcomes = iter_fetch_many(_fetch, items, max_workers)
+    for n_done, (item, data, error) in enumerate(outcomes, 1):
+        if error is None:
+            # cache writes happen here, in the calling thread.
+            if item[0] == "ISD":
+                isd_sources[item[1]].save_series(item[2], data)
+            else:
+                normal_sources[item[1]]._save_series(data)
+            report["fetched"].append(item)
+        else:
+            report["failures"][item] = str(error)
+            logger.warn("Failed to warm {}: {}".format(item, error))
+
+        if progress is not None:
+            progress(item, n_done, len(items), error)
+
+    report["bytes_transferred"] = sum(
+        getattr(c, 'bytes_transferred', 0) - initial_bytes[key]
+        for key, c in clients.items()
+    )
+    return report
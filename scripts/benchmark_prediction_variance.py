@@ -0,0 +1,74 @@
+''' Peak memory and run time of prediction variance on an hourly fixture.
+
+Compares the former DataFrame expression, :code:`mse + (X * np.dot(cov,
+X.T).T).sum(1)`, with :code:`prediction_variance` at a few chunk sizes,
+using the design matrix of :code:`HourlyDayOfWeekModel` over one year of
+hourly data.
+
+Usage::
+
+    python scripts/benchmark_prediction_variance.py
+'''
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import patsy
+import pytz
+
+from eemeter.modeling.models import HourlyDayOfWeekModel
+from eemeter.modeling.models.variance import prediction_variance
+
+
+def hourly_design():
+    index = pd.date_range('2015-01-01', periods=8760, freq='H', tz=pytz.UTC)
+    rng = np.random.RandomState(0)
+    tempF = 60 + 20 * np.sin(np.arange(8760) * 2 * np.pi / 8760) + \
+        5 * rng.randn(8760)
+    df = pd.DataFrame({'tempF': tempF, 'energy': rng.rand(8760)},
+                      index=index)
+
+    model = HourlyDayOfWeekModel()
+    df = model.add_cdd(model.add_hdd(model.add_time_day(df)))
+    _, X = patsy.dmatrices(model.formula, df, return_type='dataframe')
+    A = rng.rand(X.shape[1], X.shape[1])
+    cov = pd.DataFrame(np.dot(A, A.T) / X.shape[1], index=X.columns,
+                       columns=X.columns)
+    return X, cov
+
+
+def dataframe_expression(X, cov, mse_resid):
+    return mse_resid + (X * np.dot(cov, X.T).T).sum(1)
+
+
+def measure(function, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        start = time.time()
+        function(*args, **kwargs)
+        elapsed = time.time() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    X, cov = hourly_design()
+    print('design matrix: {} x {} ({:.1f} MB)'.format(
+        X.shape[0], X.shape[1], X.values.nbytes / 1e6))
+
+    runs = [('DataFrame expression', dataframe_expression, {})] + [
+        ('prediction_variance, chunk_size={}'.format(chunk_size),
+         prediction_variance, {'chunk_size': chunk_size})
+        for chunk_size in [256, 1024, 4096, 8760]
+    ]
+    for name, function, kwargs in runs:
+        peak, elapsed = measure(function, X, cov, 1., **kwargs)
+        print('{:<40} peak {:8.1f} MB  {:7.1f} ms'.format(
+            name, peak / 1e6, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import tempfile
+
+import pandas as pd
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func, select
+
+from eemeter.co2.cache import SqlCO2Store
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/co2_cache.db".format(tempfile.mkdtemp())
+
+
+def _count_rows(store):
+    return store.engine.execute(
+        select([func.count()]).select_from(store.items)).scalar()
+
+
+def test_rows_unique_by_year_and_region(tmp_url):
+    store = SqlCO2Store(tmp_url)
+    co2_by_load = pd.Series([1., 2.], index=[0., 1.])
+    load_by_hour = pd.Series([3.], index=pd.to_datetime(['2016-01-01']))
+    store.save_json(2016, 'UMW', co2_by_load, load_by_hour)
+    store.save_json(2016, 'UMW', co2_by_load * 2, load_by_hour)
+    assert _count_rows(store) == 1
+    assert store.retrieve_co2_by_load(2016, 'UMW').tolist() == [2., 4.]
+
+    with pytest.raises(IntegrityError):
+        store.engine.execute(store.items.insert().values(
+            year=2016, region='UMW'))
+
+
+def test_unique_index_added_to_existing_cache(tmp_url):
+    # a cache created before rows were unique, with a duplicated row.
+    engine = create_engine(tmp_url)
+    items = Table(
+        "items", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("year", Integer),
+        Column("region", String),
+        Column("co2_by_load", String),
+        Column("load_by_hour", String),
+    )
+    items.create(engine)
+    for co2_by_load in ['{"0": 1}', '{"0": 2}']:
+        engine.execute(items.insert().values(
+            year=2016, region='UMW', co2_by_load=co2_by_load,
+            load_by_hour='{}'))
+    engine.execute(items.insert().values(
+        year=2016, region='NE', co2_by_load='{"0": 3}', load_by_hour='{}'))
+    engine.dispose()
+
+    store = SqlCO2Store(tmp_url)
+    assert _count_rows(store) == 2
+    assert store.retrieve_co2_by_load(2016, 'UMW').tolist() == [2]
+    assert store.retrieve_co2_by_load(2016, 'NE').tolist() == [3]
+
+    # opening it again leaves it as is.
+    assert _count_rows(SqlCO2Store(tmp_url)) == 2
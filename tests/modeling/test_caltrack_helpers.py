@@ -0,0 +1,93 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.modeling.models.caltrack_helpers import (
+    _DegreeDayGridFit,
+    _fit_cdd_only,
+    _fit_full,
+    _fit_hdd_only,
+)
+
+
+def _monthly_data(seed, n=36, offset=0):
+    rng = np.random.RandomState(seed)
+    temps = 60 + 15 * np.sin(np.arange(n) / 6.) + rng.randn(n) * 3 + offset
+    data = {}
+    for bp in range(65, 76):
+        data['CDD_{}'.format(bp)] = np.maximum(temps - bp, 0)
+    for bp in range(55, 66):
+        data['HDD_{}'.format(bp)] = np.maximum(bp - temps, 0)
+    data['upd'] = (10 + 2 * rng.rand() * data['CDD_70'] +
+                   3 * rng.rand() * data['HDD_60'] + rng.randn(n) * 5)
+    data['ndays'] = rng.randint(15, 32, n).astype(float)
+    df = pd.DataFrame(data)
+    df.loc[[3, 10], [c for c in df.columns if c[:3] in ('CDD', 'HDD')]] = \
+        np.nan
+    df.loc[[20], 'upd'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_grid_fit_matches_statsmodels(weighted):
+    df = _monthly_data(0)
+    grid = _DegreeDayGridFit(df, weighted)
+    candidates = [('CDD_70',), ('HDD_58',)]
+    params, pvalues, rsquared, singular = grid.fit(candidates)
+    assert not singular.any()
+
+    for i, candidate in enumerate(candidates):
+        mod, res, rsquared_adj, qualified = grid._fit_statsmodels(candidate)
+        assert_allclose(params[i], res.params.values)
+        assert_allclose(pvalues[i], res.pvalues.values)
+        assert_allclose(rsquared[i], rsquared_adj)
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+@pytest.mark.parametrize('offset', [0, 20])  # at 20, CDD fits tie
+@pytest.mark.parametrize('seed', range(5))
+def test_grid_fit_selection_matches_statsmodels(seed, offset, weighted):
+    df = _monthly_data(seed, offset=offset)
+    grid = _DegreeDayGridFit(df, weighted)
+
+    for candidates in [
+        [('CDD_{}'.format(bp),) for bp in range(65, 76)],
+        [('HDD_{}'.format(bp),) for bp in range(55, 66)],
+        [('CDD_{}'.format(c), 'HDD_{}'.format(h))
+         for h in range(55, 66) for c in range(65, 76) if c >= h],
+    ]:
+        candidates = [
+            c for c in candidates if all(grid.usable(col) for col in c)]
+        selected = grid.select(candidates)
+        expected = grid._select_statsmodels(candidates)
+        if expected is None:
+            assert selected is None
+        else:
+            assert selected[0] == expected[0]
+            assert_allclose(selected[2].params, expected[2].params)
+
+
+def test_fit_helpers():
+    df = _monthly_data(0, offset=10)
+    formula, mod, res, rsquared, qualified, bp = _fit_cdd_only(df)
+    assert qualified
+    assert formula == 'upd ~ CDD_{}'.format(bp)
+    assert rsquared == res.rsquared_adj
+
+    df = _monthly_data(0)
+    formula, mod, res, rsquared, qualified, bp = _fit_hdd_only(df)
+    assert qualified
+    assert formula == 'upd ~ HDD_{}'.format(bp)
+
+    (formula, mod, res, rsquared, qualified,
+     hdd_bp, cdd_bp) = _fit_full(df, weighted=True)
+    assert qualified
+    assert formula == 'upd ~ CDD_{} + HDD_{}'.format(cdd_bp, hdd_bp)
+    assert cdd_bp >= hdd_bp
+
+
+def test_fit_helpers_no_candidates():
+    df = _monthly_data(1, offset=-40)  # no cooling degree days
+    assert _fit_cdd_only(df) == (None, None, None, -9e9, False, None)
+    assert _fit_full(df) == (None, None, None, -9e9, False, None, None)
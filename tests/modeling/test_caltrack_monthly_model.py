@@ -288,3 +288,81 @@ def test_basic_billing(input_billing_df, mock_isd_weather_source):
     outputs, variance = m.predict(formatted_predict_data, summed=True)
     assert outputs > 0
     assert variance > 0
+
+
+def test_daily_to_monthly_avg():
+    m = CaltrackMonthlyModel(grid_search=True)
+    index = pd.date_range('2011-01-16', periods=60, freq='D', tz=pytz.UTC)
+    temps = np.linspace(40., 90., 60)
+    energy = np.arange(60, dtype=float)
+    temps[20] = np.nan  # invalid days are skipped
+    energy[21] = -1.
+    energy[22] = np.nan
+    df = pd.DataFrame({'energy': energy, 'tempF': temps}, index=index)
+
+    output = m.daily_to_monthly_avg(df)
+
+    assert list(output.index) == [
+        datetime(2011, 1, 16, tzinfo=pytz.UTC),
+        datetime(2011, 2, 1, tzinfo=pytz.UTC),
+        datetime(2011, 3, 1, tzinfo=pytz.UTC),
+    ]
+    assert list(output.ndays) == [16, 25, 16]
+
+    jan, feb = slice(0, 16), np.r_[16:20, 23:44]
+    assert_allclose(output.usage, [
+        energy[jan].sum(), energy[feb].sum(), energy[44:].sum()])
+    assert_allclose(output.upd[:2], [
+        energy[jan].mean(), energy[feb].mean()])
+    assert_allclose(output.CDD_70[:2], [
+        np.maximum(temps[jan] - 70, 0).mean(),
+        np.maximum(temps[feb] - 70, 0).mean()])
+    assert_allclose(output.HDD_60[:2], [
+        np.maximum(60 - temps[jan], 0).mean(),
+        np.maximum(60 - temps[feb], 0).mean()])
+
+
+def test_daily_to_monthly_avg_insufficient_month():
+    m = CaltrackMonthlyModel()
+    index = pd.date_range('2011-01-18', periods=14, freq='D', tz=pytz.UTC)
+    df = pd.DataFrame({'tempF': np.tile(50., 14)}, index=index)
+
+    output = m.daily_to_monthly_avg(df)
+
+    assert list(output.ndays) == [14]
+    assert list(output.usage) == [0]
+    assert np.isnan(output.upd[0])
+    assert np.isnan(output.CDD_70[0])
+    assert np.isnan(output.HDD_60[0])
+
+
+def test_billing_to_monthly_avg():
+    m = CaltrackMonthlyModel()
+    index = pd.DatetimeIndex([
+        datetime(2011, 1, 1, tzinfo=pytz.UTC),
+        datetime(2011, 2, 1, tzinfo=pytz.UTC),
+        datetime(2011, 2, 11, tzinfo=pytz.UTC),
+        datetime(2011, 3, 1, tzinfo=pytz.UTC),
+    ])
+    energy = pd.Series([31., 10., 18., np.nan], index=index)
+    hourly = pd.date_range('2011-01-01', '2011-03-01', freq='H', tz=pytz.UTC)
+    days = (hourly - hourly[0]).days.values
+    temps = 50. + days
+    temps[days == 5] = np.nan
+    temp_data = pd.DataFrame({0: temps}, index=pd.MultiIndex.from_arrays(
+        [np.zeros(len(hourly)), hourly]))
+
+    output = m.billing_to_monthly_avg((energy, temp_data))
+
+    assert_allclose(output.upd[:3], [1., 1., 1.])
+    assert_allclose(output.usage[:3], [31., 10., 18.])
+    # periods include the days on both ends
+    assert list(output.ndays[:3]) == [31, 11, 19]
+    jan = 50. + np.r_[0:5, 6:32]
+    feb = 50. + np.arange(41, 60)
+    assert_allclose(output.CDD_70[[0, 2]], [
+        np.maximum(jan - 70, 0).mean(), np.maximum(feb - 70, 0).mean()])
+    assert_allclose(output.HDD_60[[0, 2]], [
+        np.maximum(60 - jan, 0).mean(), np.maximum(60 - feb, 0).mean()])
+    assert np.isnan(output.CDD_70[1])
+    assert output.iloc[3].isnull().all()
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import patsy
+import pytest
+import pytz
+
+from eemeter.modeling.models.design import (
+    DesignMatrixBuilder,
+    build_design_matrix,
+    get_design_matrix_builder,
+)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(0)
+    index = pd.date_range('2011-01-01', periods=500, freq='D', tz=pytz.UTC)
+    return pd.DataFrame({
+        'energy': rng.rand(500),
+        'tempF': 60 + 20 * rng.randn(500),
+        'CDD': rng.rand(500),
+        'HDD': rng.rand(500),
+        'holiday_name': rng.choice(['none', 'xmas', 'newyears'], 500),
+        'hour_of_day': rng.randint(0, 24, 500).astype(str),
+        'day_of_week': rng.randint(0, 7, 500).astype(str),
+    }, index=index)
+
+
+def _patsy_design_matrix(design_info, data):
+    (X,) = patsy.build_design_matrices([design_info], data,
+                                       return_type='dataframe')
+    return X
+
+
+@pytest.mark.parametrize('formula', [
+    'upd ~ 1',
+    'upd ~ CDD',
+    'upd ~ CDD + HDD',
+    'energy ~ 1 + CDD + HDD + CDD:HDD',
+    'energy ~ 1 + CDD + HDD + CDD:HDD + CDD * C(tempF.index.month)'
+    ' + HDD * C(tempF.index.month) + C(tempF.index.month)',
+    'energy ~ 1 + CDD + HDD + CDD:HDD + (CDD) * C(tempF.index.weekday)'
+    ' + (HDD) * C(tempF.index.weekday) + C(tempF.index.weekday)'
+    ' + C(holiday_name)',
+    'energy ~ hdd + cdd + hour_of_day + day_of_week'
+    ' + hour_of_day:day_of_week',
+])
+def test_builder_matches_patsy(data, formula):
+    data = data.assign(upd=data.energy, hdd=data.HDD, cdd=data.CDD)
+    _, X = patsy.dmatrices(formula, data, return_type='dataframe')
+    builder = DesignMatrixBuilder(X.design_info)
+
+    missing = data.copy()
+    missing.loc[missing.index[3], 'CDD'] = np.nan
+    missing.loc[missing.index[5], 'cdd'] = np.nan
+    missing.loc[missing.index[8], 'holiday_name'] = None
+
+    for predict_data in [data, missing, missing.iloc[::7]]:
+        pd.testing.assert_frame_equal(
+            builder.build(predict_data),
+            _patsy_design_matrix(X.design_info, predict_data),
+            check_exact=True)
+
+
+def test_builder_unsupported_formula(data):
+    _, X = patsy.dmatrices('energy ~ np.log(CDD)', data,
+                           return_type='dataframe')
+    with pytest.raises(ValueError):
+        DesignMatrixBuilder(X.design_info)
+
+    assert get_design_matrix_builder(X.design_info) is None
+    pd.testing.assert_frame_equal(
+        build_design_matrix(X.design_info, data),
+        _patsy_design_matrix(X.design_info, data))
+
+
+def test_builder_compiled_once(data):
+    _, X = patsy.dmatrices('energy ~ CDD', data, return_type='dataframe')
+    builder = get_design_matrix_builder(X.design_info)
+    assert isinstance(builder, DesignMatrixBuilder)
+    assert get_design_matrix_builder(X.design_info) is builder
+    assert get_design_matrix_builder('') is None
+
+
+def test_builder_unexpected_level(data):
+    _, X = patsy.dmatrices('energy ~ C(holiday_name)', data,
+                           return_type='dataframe')
+    other = data.assign(holiday_name='thanksgiving')
+
+    with pytest.raises(ValueError):
+        DesignMatrixBuilder(X.design_info).build(other)
+
+    # patsy reports the error
+    with pytest.raises(patsy.PatsyError):
+        build_design_matrix(X.design_info, other)
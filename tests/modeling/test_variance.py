@@ -0,0 +1,64 @@
+import tracemalloc
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.modeling.models.variance import prediction_variance
+
+
+@pytest.fixture
+def design():
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.rand(1000, 12),
+                     index=pd.date_range('2011-01-01', periods=1000, freq='H'))
+    A = rng.rand(12, 12)
+    cov = pd.DataFrame(np.dot(A, A.T))
+    return X, cov
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7, 1000, 5000])
+def test_prediction_variance(design, chunk_size):
+    X, cov = design
+    expected = 2. + (X * np.dot(cov, X.T).T).sum(1)
+
+    variance = prediction_variance(X, cov, 2., chunk_size=chunk_size)
+
+    assert isinstance(variance, pd.Series)
+    assert variance.index.equals(X.index)
+    assert_allclose(variance, expected)
+
+
+def test_prediction_variance_arrays(design):
+    X, cov = design
+    variance = prediction_variance(X.values, cov.values, 0.)
+    assert isinstance(variance, np.ndarray)
+    assert_allclose(variance, (X * np.dot(cov, X.T).T).sum(1))
+
+
+def test_prediction_variance_empty(design):
+    X, cov = design
+    assert prediction_variance(X.iloc[:0], cov, 1.).shape == (0,)
+
+
+def test_prediction_variance_bad_chunk_size(design):
+    X, cov = design
+    with pytest.raises(ValueError):
+        prediction_variance(X, cov, 1., chunk_size=0)
+
+
+def test_prediction_variance_bounded_memory():
+    # an hourly fixture with a full hour-of-day by day-of-week design
+    X = np.random.RandomState(0).rand(8760, 170)
+    cov = np.eye(170)
+
+    tracemalloc.start()
+    try:
+        prediction_variance(X, cov, 1., chunk_size=512)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # output plus a few (512 x 170) blocks, well under one copy of X.
+    assert peak < X.nbytes / 4
@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+from numpy.testing import assert_allclose
+import pytest
+
+from eemeter.resources.loader import (
+    ResourceIndex,
+    _encode_resource,
+    get_resource_cache_directory,
+    load_json_resource,
+    load_resource,
+)
+
+
+@pytest.fixture
+def resource_cache_directory(monkeypatch):
+    directory = tempfile.mkdtemp()
+    monkeypatch.setenv("EEMETER_RESOURCE_CACHE_DIRECTORY", directory)
+    return directory
+
+
+def test_get_resource_cache_directory(resource_cache_directory):
+    assert get_resource_cache_directory() == resource_cache_directory
+
+
+def test_load_resource_builds_binary_form(resource_cache_directory):
+    index = load_resource('zipcode_centroid_lat_lngs.json')
+    assert isinstance(index, ResourceIndex)
+    assert len(os.listdir(resource_cache_directory)) == 1
+
+    # loaded from binary form
+    index = load_resource('zipcode_centroid_lat_lngs.json')
+    assert_allclose(index['16701'], [41.917904, -78.762944])
+    assert index.get('00000') is None
+    assert len(index) == 33144
+
+
+def test_load_resource_matches_json(resource_cache_directory):
+    for filename in ['GSOD-ISD_station_index.json',
+                     'zipcode_usaf_station.json',
+                     'supported_zipcodes.json']:
+        resource = load_json_resource(filename)
+        index = load_resource(filename)
+        assert list(index) == list(resource)
+        if isinstance(resource, dict):
+            assert index.items() == list(resource.items())
+
+
+def test_load_resource_unsupported_structure(resource_cache_directory):
+    resource = load_resource('tmy3_station_metadata.json')
+    assert isinstance(resource, dict)
+
+
+def test_resource_index_values():
+    index = ResourceIndex(_encode_resource({
+        "b": ["x", "y"],
+        "a": [],
+        u"cé": ["z"],
+    }))
+    assert list(index) == ["b", "a", u"cé"]
+    assert index["a"] == []
+    assert index["b"] == ["x", "y"]
+    assert index[u"cé"] == ["z"]
+    assert "d" not in index
+    assert None not in index
+    assert 1 not in index
+    with pytest.raises(KeyError):
+        index["d"]
+
+    index = ResourceIndex(_encode_resource({"b": [1, 2], "a": [3, 4]}))
+    assert index["a"] == [3, 4]
+    assert isinstance(index["a"][0], int)
+
+    index = ResourceIndex(_encode_resource(["1", "3", "2"]))
+    assert "3" in index
+    assert "4" not in index
+    assert list(index) == ["1", "3", "2"]
+
+
+def test_encode_resource_unsupported():
+    assert _encode_resource({"a": {"b": 1}}) is None
+    assert _encode_resource({"a": [1, 2], "b": [1]}) is None
+    assert _encode_resource("a") is None
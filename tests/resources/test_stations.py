@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+from eemeter.resources.stations import (
+    StationCatalog,
+    cz2010_stations,
+    isd_stations,
+    tmy3_stations,
+)
+from eemeter.weather.clients import CZ2010Client, NOAAClient, TMY3Client
+
+
+def test_isd_stations():
+    assert "722880" in isd_stations
+    assert "000000" not in isd_stations
+    assert isd_stations.aliases("722880") == ["722880-23152", "722880-99999"]
+    assert isd_stations.aliases("722880-23152") == ["722880-23152"]
+
+
+def test_normal_stations():
+    assert "724838" in tmy3_stations
+    assert tmy3_stations.aliases("724838") == ["724838"]
+    assert len(tmy3_stations) == 912
+    assert "690150" in cz2010_stations
+    assert len(cz2010_stations) == 82
+
+
+def test_repr():
+    assert str(StationCatalog("a.json")) == 'StationCatalog("a.json")'
+
+
+def test_catalogs_shared_by_clients():
+    assert NOAAClient()._load_station_index() is isd_stations
+    assert NOAAClient()._get_potential_station_ids("722880") == \
+        isd_stations.aliases("722880")
+    assert TMY3Client()._load_station_index() is tmy3_stations
+    assert CZ2010Client()._load_station_index() is cz2010_stations
+
+
+def test_import_without_network_clients():
+    code = (
+        "import sys; import eemeter.resources.stations;"
+        " assert 'eemeter.weather' not in sys.modules;"
+        " assert 'requests' not in sys.modules"
+    )
+    subprocess.check_call([sys.executable, "-c", code])
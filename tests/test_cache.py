@@ -0,0 +1,162 @@
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+import time
+
+from eemeter import cache
+from eemeter.cache import get_engine, key_lock
+from eemeter.weather.cache import SqlBinaryStore, SqlJSONStore
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+from sqlalchemy.sql import func, select
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+
+@pytest.fixture
+def lock_directory(monkeypatch):
+    directory = tempfile.mkdtemp()
+    monkeypatch.setenv("EEMETER_CACHE_LOCK_DIRECTORY", directory)
+    return directory
+
+
+def _run_threads(target, n_threads=8):
+    errors = []
+
+    def _target(i):
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_target, args=(i,))
+               for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_get_engine_shared_per_url(tmp_url):
+    engine = get_engine(tmp_url)
+    assert get_engine(tmp_url) is engine
+    assert get_engine(tmp_url + "2") is not engine
+
+    store1, store2 = SqlJSONStore(tmp_url), SqlBinaryStore(tmp_url)
+    assert store1.engine is engine
+    assert store2.engine is engine
+
+
+def test_get_engine_sqlite_wal(tmp_url):
+    journal_mode = get_engine(tmp_url).execute("PRAGMA journal_mode") \
+        .scalar()
+    assert journal_mode == "wal"
+
+
+def test_concurrent_save_json(tmp_url):
+    store = SqlJSONStore(tmp_url)
+
+    def _save(i):
+        for j in range(10):
+            store.save_json("a", [i, j])
+            store.save_json("{}-{}".format(i, j), i)
+
+    _run_threads(_save)
+
+    assert len(store.existing_keys(["a"])) == 1
+    assert store.retrieve_json("a")[1] == 9
+    n_rows = store.engine.execute(
+        select([func.count()]).select_from(store.items)).scalar()
+    assert n_rows == 81
+
+
+def test_concurrent_append_series(tmp_url):
+    store = SqlBinaryStore(tmp_url)
+    index = pd.date_range('2011-01-01', periods=80, freq='H', tz=pytz.UTC)
+    series = pd.Series(np.arange(80, dtype=float), index=index)
+    store.save_series("a", series[:0], "H", "%Y%m%d%H")
+
+    def _append(i):
+        for j in range(10):
+            start = (i * 10 + j)
+            with store.fetch_lock("a"):
+                store.append_series("a", series[start:start + 1], "H",
+                                    "%Y%m%d%H")
+
+    _run_threads(_append)
+
+    cached = store.retrieve_series("a", "H", "%Y%m%d%H")
+    assert cached.shape == (80,)
+    assert cached.dropna().shape == (80,)
+
+
+def test_key_lock_fetches_once(tmp_url, lock_directory):
+    store = SqlJSONStore(tmp_url)
+    fetches = []
+
+    def _load(i):
+        if store.key_exists("a"):
+            return
+        with store.fetch_lock("a"):
+            if not store.key_exists("a"):
+                fetches.append(i)
+                time.sleep(0.05)
+                store.save_json("a", i)
+
+    _run_threads(_load)
+    assert len(fetches) == 1
+    assert store.retrieve_json("a") == fetches[0]
+
+
+def test_key_lock_per_key(tmp_url, lock_directory):
+    def _stripe(key):
+        # stripe of the key among 64 shared locks, as formerly used.
+        name = hashlib.sha1(
+            "{}\n{}".format(tmp_url, key).encode('utf-8')).hexdigest()
+        return int(name[:8], 16) % 64
+
+    colliding = next(
+        "b{}".format(i) for i in range(10000)
+        if _stripe("b{}".format(i)) == _stripe("a"))
+    locked = threading.Event()
+
+    def _lock_colliding():
+        with key_lock(tmp_url, colliding):
+            locked.set()
+
+    with key_lock(tmp_url, "a"):
+        thread = threading.Thread(target=_lock_colliding)
+        thread.start()
+        assert locked.wait(5)
+        thread.join()
+
+    # locks are dropped once unused.
+    assert cache._key_locks == {}
+
+
+def _hold_lock(args):
+    url, key, directory = args
+    import os
+    os.environ["EEMETER_CACHE_LOCK_DIRECTORY"] = directory
+    with key_lock(url, key):
+        start = time.time()
+        time.sleep(0.2)
+        return start, time.time()
+
+
+def test_key_lock_across_processes(tmp_url, lock_directory):
+    pool = multiprocessing.Pool(2)
+    try:
+        intervals = pool.map(_hold_lock, [(tmp_url, "a", lock_directory)] * 2)
+    finally:
+        pool.terminate()
+        pool.join()
+    (start1, end1), (start2, end2) = sorted(intervals)
+    assert start2 >= end1
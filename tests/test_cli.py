@@ -19,3 +19,89 @@ def test_cli_analyze_returns_meter_output_with_derivatives():
     series = [i['series'] for i in retval[0]['derivatives']]
     assert "Baseline model, reporting period" in series
     assert retval[0]
+
+
+def test_cli_weather_warm(monkeypatch):
+    from eemeter.testing import MockWeatherClient
+    from eemeter.weather import ISDWeatherSource
+    from eemeter.weather.clients import NOAAClient
+    import tempfile
+
+    class MockNOAAClient(MockWeatherClient):
+        station_index = NOAAClient()._load_station_index()
+
+        def _load_station_index(self):
+            return self.station_index
+
+    monkeypatch.setattr(ISDWeatherSource, 'client', MockNOAAClient())
+    tmp_url = "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+    runner = CliRunner()
+    result = runner.invoke(cli.cli, [
+        'weather', 'warm', '722880', '--start-year', '2014',
+        '--end-year', '2015', '--no-normals', '--cache-url', tmp_url,
+    ])
+    assert result.exit_code == 0
+    assert "[2/2] ISD 722880" in result.output
+    assert "Fetched 2 items (0.0 MB); 0 already cached; 0 failed." \
+        in result.output
+
+    result = runner.invoke(cli.cli, [
+        'weather', 'warm', '00000', '--no-normals', '--cache-url', tmp_url,
+    ])
+    assert result.exit_code == 1
+    assert "Could not find a weather station for 00000." in result.output
+
+
+def test_cli_warm_targets_from_projects():
+    path = cli._get_sample_inputs_path()
+    targets = cli._warm_targets(
+        [path + '/projects.csv', '722880'], None, 2016)
+    assert targets == [('60640', 2014, 2016), ('722880', 2015, 2016)]
+
+
+def test_cli_weather_import():
+    import gzip
+    import os
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    line = bytearray(b'0' * 105)
+    line[15:27] = b'201101010000'
+    line[87:92] = b'-0020'
+    path = os.path.join(directory, '722880-23152-2011.gz')
+    with gzip.open(path, 'wb') as f:
+        f.write(bytes(line) + b'\n')
+    tmp_url = "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+    runner = CliRunner()
+    args = ['weather', 'import', directory, '--workers', '1',
+            '--cache-url', tmp_url]
+    result = runner.invoke(cli.cli, args)
+    assert result.exit_code == 0
+    assert "[1/1] ISD 722880 2011: ok" in result.output
+    assert "Imported 1 items; 0 unchanged; 0 failed." in result.output
+
+    result = runner.invoke(cli.cli, args)
+    assert result.exit_code == 0
+    assert "Imported 0 items; 1 unchanged; 0 failed." in result.output
+
+
+def test_cli_weather_compact():
+    import tempfile
+
+    from eemeter.weather.cache import SqlJSONStore
+
+    tmp_url = "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+    store = SqlJSONStore(tmp_url)
+    store.save_json("ISD-722880-2011.json", list(range(1000)))
+    store.save_json("TMY3-724838.json", list(range(1000)))
+
+    runner = CliRunner()
+    args = ['weather', 'compact', '--max-size-mb', '0', '--cache-url', tmp_url]
+    result = runner.invoke(cli.cli, args)
+    assert result.exit_code == 0
+    assert "Evicted 1 items" in result.output
+    assert "Database size:" in result.output
+    assert not store.key_exists("ISD-722880-2011.json")
+    assert store.key_exists("TMY3-724838.json")
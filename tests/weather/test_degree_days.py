@@ -0,0 +1,104 @@
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather import ISDWeatherSource
+from eemeter.weather.degree_days import DegreeDayIndex
+from eemeter.testing import MockWeatherClient
+
+
+@pytest.fixture
+def daily_temps():
+    index = pd.date_range('2011-01-01', periods=90, freq='D', tz='UTC')
+    values = 65 + 20 * np.sin(np.arange(90) / 10.)
+    values[[3, 40, 41]] = np.nan
+    return pd.Series(values, index=index)
+
+
+def _expected_periods(daily_temps, boundaries, cdd_bps, hdd_bps):
+    rows = []
+    for s, e in zip(boundaries, boundaries[1:]):
+        temps = daily_temps[(daily_temps.index >= s) &
+                            (daily_temps.index < e)].dropna()
+        row = {'ndays': temps.shape[0]}
+        for bp in cdd_bps:
+            row['CDD_{}'.format(bp)] = np.maximum(temps - bp, 0).sum()
+        for bp in hdd_bps:
+            row['HDD_{}'.format(bp)] = np.maximum(bp - temps, 0).sum()
+        rows.append(row)
+    return pd.DataFrame(rows, index=boundaries[:-1])
+
+
+def test_periods(daily_temps):
+    ddi = DegreeDayIndex(daily_temps, [65, 70], [55, 60])
+    boundaries = pd.DatetimeIndex([
+        '2010-12-01', '2011-01-05', '2011-01-05 12:00', '2011-02-01',
+        '2011-03-15', '2011-06-01',
+    ], tz='UTC')
+
+    degree_days = ddi.periods(boundaries)
+    expected = _expected_periods(daily_temps, boundaries, [65, 70], [55, 60])
+    assert list(degree_days.columns) == \
+        ['ndays', 'CDD_65', 'CDD_70', 'HDD_55', 'HDD_60']
+    for column in degree_days.columns:
+        assert_allclose(degree_days[column].values, expected[column].values)
+
+    means = ddi.periods(boundaries, mean=True)
+    assert_allclose(means.ndays.values, expected.ndays.values)
+    with np.errstate(invalid='ignore'):
+        assert_allclose(means.CDD_65.values,
+                        expected.CDD_65.values / expected.ndays.values)
+
+    interval = ddi.interval(boundaries[1], boundaries[3])
+    assert interval.ndays == expected.ndays.iloc[1:3].sum()
+    assert_allclose(interval.HDD_55, expected.HDD_55.iloc[1:3].sum())
+
+
+def test_intervals(daily_temps):
+    ddi = DegreeDayIndex(daily_temps, [65], [60])
+    starts = pd.DatetimeIndex(['2011-01-01', '2011-02-01'], tz='UTC')
+    ends = pd.DatetimeIndex(['2011-02-01', '2011-03-01'], tz='UTC')
+
+    degree_days = ddi.intervals(starts, ends)
+    pd.testing.assert_frame_equal(
+        degree_days, ddi.periods(starts.append(ends[-1:])))
+
+    # inclusive intervals also cover the days starting at their ends.
+    inclusive = ddi.intervals(starts, ends, inclusive=True)
+    expected = ddi.intervals(starts, ends + pd.Timedelta(days=1))
+    pd.testing.assert_frame_equal(inclusive, expected)
+    assert list(inclusive.ndays) == [31, 27]  # 3 days without data
+
+
+def test_empty():
+    ddi = DegreeDayIndex(pd.Series(dtype=float), [65], [60])
+    boundaries = pd.DatetimeIndex(['2011-01-01', '2011-02-01'], tz='UTC')
+    degree_days = ddi.periods(boundaries)
+    assert degree_days.ndays.iloc[0] == 0
+    assert degree_days.CDD_65.iloc[0] == 0
+
+
+def test_weather_source_degree_day_index():
+    tmp_url = "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.client = MockWeatherClient()
+    ws.add_year(2011)
+
+    ddi = ws.degree_day_index([65], [60])
+    assert ws.degree_day_index([65], [60]) is ddi
+
+    index = pd.date_range('2011-01-01', periods=365, freq='D', tz='UTC')
+    daily_temps = ws.indexed_temperatures(index, 'degF')
+    boundaries = pd.DatetimeIndex(['2011-01-01', '2011-02-01', '2011-03-01'],
+                                  tz='UTC')
+    expected = _expected_periods(daily_temps, boundaries, [65], [60])
+    degree_days = ddi.periods(boundaries)
+    assert_allclose(degree_days.HDD_60.values, expected.HDD_60.values)
+    assert_allclose(degree_days.ndays.values, [31, 28])
+
+    # loading more data invalidates the cached index
+    ws.add_year(2012)
+    assert ws.degree_day_index([65], [60]) is not ddi
@@ -0,0 +1,136 @@
+import ftplib
+import tempfile
+import threading
+
+import pytest
+
+from eemeter.weather import ISDWeatherSource
+from eemeter.weather.fetch import (
+    FTPConnectionPool,
+    fetch_many,
+    get_http_session,
+)
+from eemeter.testing import MockWeatherClient
+
+
+class FakeFTP(object):
+
+    n_connections = 0
+
+    def __init__(self, host):
+        FakeFTP.n_connections += 1
+        self.closed = False
+
+    def login(self):
+        pass
+
+    def retrbinary(self, command, callback):
+        if 'missing' in command:
+            raise ftplib.error_perm("550 not found")
+        if 'dropped' in command:
+            raise EOFError()
+        callback(b'data')
+
+    def close(self):
+        self.closed = True
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_ftp(monkeypatch):
+    FakeFTP.n_connections = 0
+    monkeypatch.setattr(ftplib, 'FTP', FakeFTP)
+    return FakeFTP
+
+
+def test_ftp_connection_pool_reuses_connections(fake_ftp):
+    pool = FTPConnectionPool("ftp.example.com", max_connections=2)
+    for _ in range(3):
+        with pool.connection() as ftp:
+            ftp.retrbinary('RETR file', lambda data: None)
+    assert fake_ftp.n_connections == 1
+
+    # permanent errors keep the connection
+    with pytest.raises(ftplib.error_perm):
+        with pool.connection() as ftp:
+            ftp.retrbinary('RETR missing', lambda data: None)
+    assert fake_ftp.n_connections == 1
+
+    # connection errors drop it
+    with pytest.raises(EOFError):
+        with pool.connection() as ftp:
+            ftp.retrbinary('RETR dropped', lambda data: None)
+    assert ftp.closed
+    with pool.connection() as ftp:
+        pass
+    assert fake_ftp.n_connections == 2
+
+    pool.close()
+    assert ftp.closed
+
+
+def test_fetch_many():
+    attempts = {}
+    lock = threading.Lock()
+
+    def fetch(station, year):
+        with lock:
+            attempts[(station, year)] = attempts.get((station, year), 0) + 1
+            n_attempts = attempts[(station, year)]
+        if station == "bad":
+            raise RuntimeError("bad station")
+        if station == "flaky" and n_attempts < 2:
+            raise RuntimeError("flaky station")
+        return "{}-{}".format(station, year)
+
+    items = [("a", 2015), ("a", 2016), ("flaky", 2015), ("bad", 2015)]
+    results, failures = fetch_many(fetch, items, max_workers=4,
+                                   retry_wait=0)
+    assert results == {
+        ("a", 2015): "a-2015",
+        ("a", 2016): "a-2016",
+        ("flaky", 2015): "flaky-2015",
+    }
+    assert list(failures) == [("bad", 2015)]
+    assert attempts[("bad", 2015)] == 3
+    assert attempts[("flaky", 2015)] == 2
+
+    assert fetch_many(fetch, []) == ({}, {})
+
+
+def test_get_http_session():
+    assert get_http_session() is get_http_session()
+
+
+class CountingClient(MockWeatherClient):
+
+    def __init__(self):
+        self.years = []
+        self._lock = threading.Lock()
+
+    def get_isd_data(self, station, year):
+        with self._lock:
+            self.years.append(year)
+        return super(CountingClient, self).get_isd_data(station, year)
+
+
+def test_add_year_range_concurrent():
+    tmp_url = "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.client = CountingClient()
+
+    ws.add_year(2012)
+    ws.add_year_range(2010, 2014)
+    assert sorted(ws.client.years) == [2010, 2011, 2012, 2013, 2014]
+    assert ws.loaded_years == set([2010, 2011, 2012, 2013, 2014])
+    assert all(ws._year_saved(year) for year in range(2010, 2015))
+    assert ws.tempC['2010-01-01':'2014-12-31'].notnull().all()
+
+    # cached years are not fetched again
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.client = CountingClient()
+    ws.add_year_range(2010, 2014)
+    assert ws.client.years == []
+    assert ws.tempC['2010-01-01':'2014-12-31'].notnull().all()
@@ -0,0 +1,157 @@
+import gzip
+import os
+import tempfile
+
+from numpy.testing import assert_allclose
+import pytest
+
+from eemeter.weather import ISDWeatherSource
+from eemeter.weather.cache import SqlBinaryStore
+from eemeter.weather.importer import (
+    find_weather_files,
+    import_weather_files,
+)
+
+
+def _isd_line(date_str, temp_str):
+    line = bytearray(b'0' * 105)
+    line[15:27] = date_str.encode('utf-8')
+    line[87:92] = temp_str.encode('utf-8')
+    return bytes(line) + b'ADDAA101000091\n'
+
+
+def _write_isd_file(path, year, temp_str):
+    with gzip.open(path, 'wb') as f:
+        f.write(_isd_line('{}01010000'.format(year), temp_str))
+        f.write(_isd_line('{}01010100'.format(year), '+0035'))
+
+
+@pytest.fixture
+def raw_directory():
+    directory = tempfile.mkdtemp()
+    os.makedirs(os.path.join(directory, '2011'))
+    os.makedirs(os.path.join(directory, '2012'))
+    _write_isd_file(
+        os.path.join(directory, '2011', '722880-23152-2011.gz'), 2011, '-0020')
+    _write_isd_file(
+        os.path.join(directory, '2012', '722880-23152-2012.gz'), 2012, '+0010')
+    # lower priority WBAN for the same station-year.
+    _write_isd_file(
+        os.path.join(directory, '2012', '722880-99999-2012.gz'), 2012, '+0500')
+    _write_isd_file(
+        os.path.join(directory, '2012', '000000-99999-2012.gz'), 2012, '+0010')
+    with open(os.path.join(directory, 'README.txt'), 'w') as f:
+        f.write('not weather data')
+    return directory
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+
+def test_find_weather_files(raw_directory):
+    files, unrecognized = find_weather_files(raw_directory)
+    assert list(files.keys()) == [
+        ("ISD", "722880", 2011),
+        ("ISD", "722880", 2012),
+    ]
+    assert files[("ISD", "722880", 2012)].endswith('722880-23152-2012.gz')
+    assert len(unrecognized) == 1
+    assert unrecognized[0].endswith('000000-99999-2012.gz')
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_import_weather_files(raw_directory, tmp_url, max_workers):
+    report = import_weather_files(raw_directory, cache_url=tmp_url,
+                                  max_workers=max_workers, batch_size=1)
+    assert sorted(report["imported"]) == [
+        ("ISD", "722880", 2011),
+        ("ISD", "722880", 2012),
+    ]
+    assert report["skipped"] == []
+    assert list(report["failures"].keys()) == [
+        os.path.join(raw_directory, '2012', '000000-99999-2012.gz')]
+
+    ws = ISDWeatherSource("722880", tmp_url, refresh="offline")
+    assert_allclose(ws.load_series(2011).values[:2], [-2.0, 3.5])
+    assert_allclose(ws.load_series(2012).values[:2], [1.0, 3.5])
+    means, counts = ws.load_daily_aggregates(2011)
+    assert_allclose(means.values[:1], [ws.load_series(2011)[:24].mean()])
+
+
+def test_import_weather_files_skips_unchanged(raw_directory, tmp_url):
+    import_weather_files(raw_directory, cache_url=tmp_url, max_workers=1)
+
+    report = import_weather_files(raw_directory, cache_url=tmp_url,
+                                  max_workers=1)
+    assert report["imported"] == []
+    assert len(report["skipped"]) == 2
+
+    path = os.path.join(raw_directory, '2011', '722880-23152-2011.gz')
+    _write_isd_file(path, 2011, '+0100')
+    os.utime(path, (0, 0))
+    report = import_weather_files(raw_directory, cache_url=tmp_url,
+                                  max_workers=1)
+    assert report["imported"] == [("ISD", "722880", 2011)]
+    assert report["skipped"] == [("ISD", "722880", 2012)]
+
+    ws = ISDWeatherSource("722880", tmp_url, refresh="offline")
+    assert_allclose(ws.load_series(2011).values[0], 10.0)
+
+    report = import_weather_files(raw_directory, cache_url=tmp_url,
+                                  max_workers=1, force=True)
+    assert len(report["imported"]) == 2
+
+
+def test_import_weather_files_hash(raw_directory, tmp_url):
+    import_weather_files(raw_directory, cache_url=tmp_url, max_workers=1,
+                         use_hash=True)
+
+    # touched, but unchanged.
+    path = os.path.join(raw_directory, '2011', '722880-23152-2011.gz')
+    os.utime(path, (0, 0))
+    report = import_weather_files(raw_directory, cache_url=tmp_url,
+                                  max_workers=1, use_hash=True)
+    assert report["imported"] == []
+    assert len(report["skipped"]) == 2
+
+
+def test_import_weather_files_bad_file(raw_directory, tmp_url):
+    path = os.path.join(raw_directory, '2011', '722880-23152-2011.gz')
+    with open(path, 'wb') as f:
+        f.write(b'not gzipped')
+    report = import_weather_files(raw_directory, cache_url=tmp_url,
+                                  max_workers=1)
+    assert report["imported"] == [("ISD", "722880", 2012)]
+    assert ("ISD", "722880", 2011) in report["failures"]
+
+
+def test_import_weather_files_batch_atomic(raw_directory, tmp_url,
+                                           monkeypatch):
+    save_json_many = SqlBinaryStore.save_json_many
+    calls = []
+
+    def failing_save_json_many(self, items, conn=None):
+        # fail the last write of the second batch.
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("Interrupted.")
+        return save_json_many(self, items, conn)
+
+    monkeypatch.setattr(SqlBinaryStore, 'save_json_many',
+                        failing_save_json_many)
+    with pytest.raises(RuntimeError):
+        import_weather_files(raw_directory, cache_url=tmp_url,
+                             max_workers=1, batch_size=1)
+
+    ws = ISDWeatherSource("722880", tmp_url, refresh="offline")
+    assert ws._year_saved(2011)
+    ws.load_daily_aggregates(2011)
+
+    # nothing of the interrupted batch was committed.
+    assert not ws._year_saved(2012)
+    with pytest.raises(KeyError):
+        ws.load_daily_aggregates(2012)
+    assert ws.cache_store.retrieve_json_many(
+        ["import-ISD-722880-2012.json"]) == {}
@@ -1,7 +1,12 @@
+import numpy as np
 from numpy.testing import assert_allclose
 
 from eemeter.weather.location import (
+    LatLngIndex,
     haversine,
+    lat_lngs_to_usaf_stations,
+    lat_lngs_to_tmy3_stations,
+    lat_lngs_to_zipcodes,
     lat_lng_to_usaf_station,
     lat_lng_to_tmy3_station,
     lat_lng_to_zipcode,
@@ -44,6 +49,39 @@ def test_lat_lng_to_zipcode():
     assert lat_lng_to_zipcode(42, -120) == '96112'
 
 
+def test_lat_lngs_to_usaf_stations():
+    stations, distances = lat_lngs_to_usaf_stations(
+        [40, 28.867], [-100, -82.571], k=2)
+    assert stations.shape == (2, 2)
+    assert stations[0, 0] == '725625'
+    assert stations[1, 0] == '720655'
+    assert_allclose(distances[0, 0], haversine(
+        40, -100, *usaf_station_to_lat_lng('725625')))
+    assert_allclose(distances[1, 0], 0, atol=1e-6)
+    assert distances[0, 0] <= distances[0, 1]
+
+
+def test_lat_lngs_to_tmy3_stations():
+    stations, distances = lat_lngs_to_tmy3_stations([45], [-90])
+    assert stations.tolist() == [['726463']]
+
+
+def test_lat_lngs_to_zipcodes():
+    zipcodes, distances = lat_lngs_to_zipcodes([42, None], [-120, -120])
+    assert zipcodes.tolist() == [['96112'], [None]]
+    assert np.isnan(distances[1, 0])
+
+
+def test_lat_lng_index_ties_in_order():
+    index = LatLngIndex({'b': (0, 0), 'a': (0, 0), 'c': (1, 1)})
+    names, distances = index.query([0.1], [0.1], k=3)
+    assert names.tolist() == [['b', 'a', 'c']]
+
+    names, distances = index.query([0], [0], k=4)
+    assert names.tolist() == [['b', 'a', 'c', None]]
+    assert_allclose(distances[0, :3], [0, 0, haversine(0, 0, 1, 1)])
+
+
 def test_lat_lng_to_climate_zone():
     assert lat_lng_to_climate_zone(43, -95) == '6|A|Cold'
 
@@ -0,0 +1,99 @@
+import gzip
+import os
+import tempfile
+
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather.clients import (
+    MirrorNOAAClient,
+    MirrorTMY3Client,
+    get_mirror_client,
+    get_mirror_directory,
+)
+
+
+def _isd_line(date_str, temp_str):
+    line = bytearray(b'0' * 105)
+    line[15:27] = date_str.encode('utf-8')
+    line[87:92] = temp_str.encode('utf-8')
+    return bytes(line) + b'ADDAA101000091\n'
+
+
+def _tmy3_text():
+    header = '722880,"BURBANK",CA,-8.0,34.2,-118.35,236'
+    columns = ','.join('col{}'.format(i) for i in range(68))
+    lines = [header, columns]
+    index = pd.date_range('1900-01-01 01:00', periods=8760, freq='H')
+    for dt in index:
+        row = ['0'] * 68
+        row[0] = '{:02d}/{:02d}/1988'.format(dt.month, dt.day)
+        row[1] = '{:02d}:00'.format(dt.hour or 24)
+        row[31] = '10.0'
+        lines.append(','.join(row))
+    return '\r\n'.join(lines)
+
+
+@pytest.fixture
+def mirror_directory():
+    directory = tempfile.mkdtemp()
+
+    os.makedirs(os.path.join(directory, 'noaa', '2011'))
+    path = os.path.join(directory, 'noaa', '2011', '722880-23152-2011.gz')
+    with gzip.open(path, 'wb') as f:
+        f.write(_isd_line('201101010000', '-0020'))
+        f.write(_isd_line('201101010100', '+0035'))
+
+    os.makedirs(os.path.join(directory, 'tmy3'))
+    path = os.path.join(directory, 'tmy3', '722880TYA.CSV')
+    with open(path, 'w') as f:
+        f.write(_tmy3_text())
+
+    return directory
+
+
+def test_mirror_noaa_client_isd(mirror_directory):
+    client = MirrorNOAAClient(mirror_directory)
+    data = client.get_isd_data('722880', '2011')
+    assert data.shape == (17544,)
+    assert_allclose(data.values[:2], [-2.0, 3.5])
+    assert client.bytes_transferred > 0
+
+
+def test_mirror_noaa_client_missing_year(mirror_directory):
+    client = MirrorNOAAClient(mirror_directory)
+    data = client.get_isd_data('722880', '2012')
+    assert data.shape == (17544,)
+    assert data.isnull().all()
+
+
+def test_mirror_tmy3_client(mirror_directory):
+    client = MirrorTMY3Client(mirror_directory)
+    data = client.get_hourly_weather_normal_data('722880')
+    assert data.shape == (8760,)
+    assert_allclose(data.values, 10.0)
+
+
+def test_mirror_tmy3_client_missing_station(mirror_directory):
+    client = MirrorTMY3Client(mirror_directory)
+    with pytest.warns(UserWarning):
+        data = client.get_hourly_weather_normal_data('724838')
+    assert data.isnull().all()
+
+
+def test_get_mirror_directory(monkeypatch):
+    monkeypatch.delenv('EEMETER_WEATHER_MIRROR_DIRECTORY', raising=False)
+    assert get_mirror_directory() is None
+    assert get_mirror_directory('/data') == '/data'
+
+    monkeypatch.setenv('EEMETER_WEATHER_MIRROR_DIRECTORY', '/mirror')
+    assert get_mirror_directory() == '/mirror'
+    assert get_mirror_directory('/data') == '/data'
+
+
+def test_get_mirror_client_shared(mirror_directory):
+    client = get_mirror_client(MirrorNOAAClient, mirror_directory)
+    assert get_mirror_client(MirrorNOAAClient, mirror_directory) is client
+    assert get_mirror_client(MirrorTMY3Client, mirror_directory) \
+        is not client
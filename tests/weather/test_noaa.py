@@ -1,5 +1,6 @@
 import tempfile
 
+import numpy as np
 from numpy.testing import assert_allclose
 import pandas as pd
 import pytest
@@ -61,6 +62,13 @@ def test_gsod_repr(mock_gsod_weather_source):
     assert str(mock_gsod_weather_source) == 'GSODWeatherSource("722880")'
 
 
+def test_gsod_json_store_alias(mock_gsod_weather_source):
+    ws = mock_gsod_weather_source
+    assert ws.json_store is ws.cache_store
+    ws.json_store.save_json("a", {"b": 1})
+    assert ws.cache_store.retrieve_json("a") == {"b": 1}
+
+
 @pytest.fixture
 def mock_isd_weather_source():
     tmp_url = "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
@@ -87,6 +95,50 @@ def test_isd_index_daily(mock_isd_weather_source):
     assert_allclose(temps.values, [35.507046, 35.281477])
 
 
+def test_isd_index_daily_from_aggregates(mock_isd_weather_source):
+    index = pd.date_range('2011-01-01', periods=365, freq='D', tz='UTC')
+    ws = mock_isd_weather_source
+    ws.add_year(2011)
+    expected = ws.temperature_store.values_at(index, 'D', 'degF')
+
+    # a new source serves daily queries without loading hourly data.
+    ws = ISDWeatherSource("722880", ws.cache_store.url)
+    temps = ws.indexed_temperatures(index, 'degF')
+    assert ws.loaded_years == set()
+    assert ws.temperature_store.empty
+    assert ws.daily_loaded_years == {2011}
+    np.testing.assert_array_equal(temps.values, expected)
+
+    means, counts = ws.load_daily_aggregates(2011)
+    assert means.shape == (365,)
+    assert (counts == 24).all()
+
+
+def test_isd_daily_aggregates_partial_days():
+    index = pd.date_range('2011-01-01 12:00', periods=24, freq='H', tz='UTC')
+    series = pd.Series(np.arange(24, dtype=float), index=index)
+    series[1] = np.nan
+    means, counts = ISDWeatherSource.daily_aggregates(series)
+    assert list(means.index) == list(
+        pd.date_range('2011-01-01', periods=2, freq='D', tz='UTC'))
+    assert_allclose(means.values, [sum(range(2, 12)) / 11., 17.5])
+    assert_allclose(counts.values, [11, 12])
+
+
+def test_isd_daily_aggregates_computed_for_old_cache(mock_isd_weather_source):
+    ws = mock_isd_weather_source
+    ws.add_year(2011)
+    for key in ws._get_daily_cache_keys(2011):
+        ws.cache_store.clear(key)
+
+    ws = ISDWeatherSource("722880", ws.cache_store.url, refresh="offline")
+    index = pd.date_range('2011-01-01', periods=2, freq='D', tz='UTC')
+    temps = ws.indexed_temperatures(index, 'degF')
+    assert_allclose(temps.values, [35.507046, 35.281477])
+    means, counts = ws.load_daily_aggregates(2011)
+    assert means.shape == (365,)
+
+
 def test_isd_index_arbitrary(mock_isd_weather_source):
     index = pd.DatetimeIndex(['2011-01-30', '2011-01-31', '2011-03-31'],
                              dtype='datetime64[ns, UTC]', freq=None)
@@ -114,6 +166,54 @@ def test_isd_index_arbitrary_single(mock_isd_weather_source):
             index, 'degF', allow_mixed_frequency=True)
 
 
+def _reference_partition_tuples(index_parts, index_periods):
+    # iterative partitioning used before the searchsorted implementation.
+    parts = iter(index_parts)
+    periods = iter(index_periods)
+    part = next(parts, None)
+    period_start = next(periods, None)
+    period_end = next(periods, None)
+    tuples = []
+    while part is not None:
+        if period_start is None or period_end is None:
+            break
+        if part < period_start:
+            part = next(parts, None)
+        elif period_start <= part < period_end:
+            tuples.append((period_start, part))
+            part = next(parts, None)
+        else:
+            period_start = period_end
+            period_end = next(periods, None)
+    return tuples
+
+
+def test_partitioned_multiindex(mock_isd_weather_source):
+    index_parts = pd.date_range('2011-01-01', periods=24 * 90, freq='H',
+                                tz='UTC')
+    index_periods = pd.DatetimeIndex([
+        '2010-12-15', '2011-01-10 05:00', '2011-01-10 05:00',
+        '2011-02-03 12:30', '2011-03-01', '2011-03-01 01:00', '2011-03-20',
+    ], tz='UTC')
+
+    index = mock_isd_weather_source._partitioned_multiindex(
+        index_parts, index_periods)
+    expected = _reference_partition_tuples(index_parts, index_periods)
+    assert index.names == ["period", "hourly"]
+    assert list(index) == expected
+
+    period_codes, offsets = mock_isd_weather_source._partitioned_multiindex(
+        index_parts, index_periods, return_codes=True)
+    assert list(zip(index_periods[period_codes], index_parts[offsets])) == \
+        expected
+    assert np.all(np.diff(offsets) > 0)
+
+    # no parts inside any period
+    index_periods = pd.DatetimeIndex(['2012-01-01', '2012-02-01'], tz='UTC')
+    assert mock_isd_weather_source._partitioned_multiindex(
+        index_parts, index_periods) is None
+
+
 def test_bad_isd_station():
     with pytest.raises(ValueError):
         ISDWeatherSource("INVALID")
@@ -144,3 +244,25 @@ def test_load_cached(monkeypatch):
     assert not ws.tempC.empty
 
     f.close()
+
+
+def test_isd_warm_cache_daily_query_loads_hourly(mock_isd_weather_source):
+    index = pd.date_range('2011-01-01', periods=365, freq='D', tz='UTC')
+    ws = mock_isd_weather_source
+    ws.add_year(2011)
+    expected_ddi = ws.degree_day_index([65], [60])
+    n_hourly = ws.tempC.shape[0]
+
+    ws = ISDWeatherSource("722880", ws.cache_store.url)
+    ws.indexed_temperatures(index, 'degF')
+    assert ws.temperature_store.empty
+
+    # hourly data for years loaded as daily means is loaded on access.
+    ddi = ws.degree_day_index([65], [60])
+    assert ddi.n_days == expected_ddi.n_days > 0
+    assert ws.loaded_years == {2011}
+    assert len(ws.tempC) == n_hourly
+
+    boundaries = pd.DatetimeIndex(['2011-01-01', '2011-02-01'], tz='UTC')
+    pd.testing.assert_frame_equal(ddi.periods(boundaries),
+                                  expected_ddi.periods(boundaries))
@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+import tempfile
+import threading
+import time
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+import pytz
+from sqlalchemy.sql import select
+
+from eemeter.weather import ISDWeatherSource
+from eemeter.testing import MockWeatherClient
+
+
+CURRENT_YEAR = datetime.now().year
+
+
+class PartialYearClient(MockWeatherClient):
+    ''' Serves fake ISD data observed up to :code:`available_until` and
+    counts fetches.
+    '''
+
+    station_index = {"722880": ["722880-23152"]}
+
+    def __init__(self, available_until):
+        self.available_until = available_until
+        self.n_fetches = 0
+
+    def get_isd_data(self, station, year):
+        self.n_fetches += 1
+        series = super(PartialYearClient, self).get_isd_data(station, year)
+        series[series.index > self.available_until] = np.nan
+        return series
+
+    def _load_station_index(self):
+        return self.station_index
+
+
+class OfflineClient(PartialYearClient):
+
+    def __init__(self):
+        pass
+
+    def get_isd_data(self, station, year):
+        raise AssertionError("Offline weather sources must not fetch data.")
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = PartialYearClient(
+        pd.Timestamp('{}-01-10'.format(CURRENT_YEAR), tz=pytz.UTC))
+    monkeypatch.setattr(ISDWeatherSource, 'client', client)
+    return client
+
+
+def _make_stale(ws):
+    ws.cache_store.series.update().values(dt=datetime(2000, 1, 1)).execute()
+
+
+def _cached_length(ws):
+    s = select([ws.cache_store.series.c.length]) \
+        .where(ws.cache_store.series.c.key == ws._get_cache_key(CURRENT_YEAR))
+    return s.execute().fetchone()[0]
+
+
+def test_incremental_refresh(tmp_url, client):
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.add_year(CURRENT_YEAR)
+    assert client.n_fetches == 1
+    assert _cached_length(ws) == 9 * 24 + 1
+
+    # fresh cache is not refreshed
+    ISDWeatherSource("722880", tmp_url)
+    assert client.n_fetches == 1
+
+    _make_stale(ws)
+    client.available_until = pd.Timestamp(
+        '{}-01-20'.format(CURRENT_YEAR), tz=pytz.UTC)
+    ws = ISDWeatherSource("722880", tmp_url)
+    assert client.n_fetches == 2
+    assert _cached_length(ws) == 19 * 24 + 1
+    assert CURRENT_YEAR in ws.loaded_years
+
+    expected = client.get_isd_data("722880", CURRENT_YEAR).dropna()
+    cached = ws.load_series(CURRENT_YEAR)
+    assert all(cached.index == expected.index)
+    assert_allclose(cached.values, expected.values)
+
+    temps = ws.indexed_temperatures(expected.index, 'degC')
+    assert_allclose(temps.values, expected.values)
+
+
+def test_incremental_refresh_no_new_data(tmp_url, client):
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.add_year(CURRENT_YEAR)
+    _make_stale(ws)
+
+    ws = ISDWeatherSource("722880", tmp_url)
+    assert client.n_fetches == 2
+    assert _cached_length(ws) == 9 * 24 + 1
+
+    # fetch time was updated
+    ISDWeatherSource("722880", tmp_url)
+    assert client.n_fetches == 2
+
+
+def test_staleness_window(tmp_url, client):
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.add_year(CURRENT_YEAR)
+    ws.cache_store.series.update() \
+        .values(dt=datetime.now() - timedelta(days=3)).execute()
+
+    ISDWeatherSource("722880", tmp_url, staleness=timedelta(days=7))
+    assert client.n_fetches == 1
+
+    ISDWeatherSource("722880", tmp_url, staleness=timedelta(days=2))
+    assert client.n_fetches == 2
+
+
+def test_concurrent_refresh_of_uncached_year(tmp_url, client):
+    get_isd_data = client.get_isd_data
+
+    def slow_get_isd_data(station, year):
+        time.sleep(0.2)
+        return get_isd_data(station, year)
+
+    client.get_isd_data = slow_get_isd_data
+    sources = [ISDWeatherSource("722880", tmp_url) for _ in range(3)]
+    threads = [
+        threading.Thread(target=ws.refresh_year, args=(CURRENT_YEAR,))
+        for ws in sources
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # workers which waited load the year fetched by the first one.
+    assert client.n_fetches == 1
+    for ws in sources:
+        assert CURRENT_YEAR in ws.loaded_years
+        assert ws.tempC.count() == 9 * 24 + 1
+
+
+def test_full_refresh(tmp_url, client):
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.add_year(CURRENT_YEAR)
+    _make_stale(ws)
+
+    client.available_until = pd.Timestamp(
+        '{}-01-20'.format(CURRENT_YEAR), tz=pytz.UTC)
+    ws = ISDWeatherSource("722880", tmp_url, refresh="full")
+    assert client.n_fetches == 2
+    assert _cached_length(ws) == 19 * 24 + 1
+
+
+def test_offline(tmp_url, client, monkeypatch):
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.add_year(CURRENT_YEAR)
+    _make_stale(ws)
+
+    monkeypatch.setattr(ISDWeatherSource, 'client', OfflineClient())
+    ws = ISDWeatherSource("722880", tmp_url, refresh="offline")
+
+    index = pd.date_range('{}-01-01'.format(CURRENT_YEAR - 1), periods=2,
+                          freq='D', tz=pytz.UTC)
+    temps = ws.indexed_temperatures(index, 'degC')
+    assert temps.isnull().all()
+
+    index = pd.date_range('{}-01-01'.format(CURRENT_YEAR), periods=2,
+                          freq='D', tz=pytz.UTC)
+    temps = ws.indexed_temperatures(index, 'degC')
+    assert temps.notnull().all()
+
+    ws.refresh_year(CURRENT_YEAR)
+
+
+def test_refresh_mode_from_environment(tmp_url, client, monkeypatch):
+    monkeypatch.setenv('EEMETER_WEATHER_REFRESH', 'offline')
+    ws = ISDWeatherSource("722880", tmp_url)
+    assert ws.refresh == "offline"
+
+    with pytest.raises(ValueError):
+        ISDWeatherSource("722880", tmp_url, refresh="BAD")
@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytz
+
+from eemeter.weather.parsers import (
+    parse_gsod_data,
+    parse_isd_data,
+    parse_tmy3_data,
+)
+
+
+def _isd_line(date_str, temp_str):
+    line = bytearray(b'0' * 105)
+    line[15:27] = date_str.encode('utf-8')
+    line[87:92] = temp_str.encode('utf-8')
+    return bytes(line) + b'ADDAA101000091\n'
+
+
+def _reference_isd_series(lines, year):
+    # line-by-line parser used by NOAAClient.get_isd_data before the
+    # vectorized implementation.
+    dates = pd.date_range("{}-01-01 00:00".format(year),
+                          "{}-12-31 23:00".format(int(year) + 1),
+                          freq='H', tz=pytz.UTC)
+    series = pd.Series(None, index=dates, dtype=float)
+    for line in lines:
+        if line[87:92].decode('utf-8') == "+9999":
+            temp_C = float("nan")
+        else:
+            temp_C = float(line[87:92]) / 10.
+        date_str = line[15:27].decode('utf-8')
+        dt = pytz.UTC.localize(
+            datetime.strptime(date_str, "%Y%m%d%H%M")).replace(minute=0)
+        if pd.isnull(series.loc[dt]):
+            series[dt] = temp_C
+    return series
+
+
+def test_parse_isd_data_parity():
+    lines = [
+        _isd_line('201101010000', '-0020'),
+        _isd_line('201101010051', '-0011'),  # second reading in hour
+        _isd_line('201101010100', '+9999'),  # missing
+        _isd_line('201101010130', '+0035'),  # first valid reading in hour
+        _isd_line('201102281700', '+0123'),
+        _isd_line('201112312359', '+0005'),
+        _isd_line('201201010000', '-0107'),
+        _isd_line('201212312300', '+0250'),
+    ]
+    data = b''.join(lines)
+
+    series = parse_isd_data(data, '2011')
+    expected = _reference_isd_series(lines, '2011')
+
+    assert series.shape == (17544,)
+    assert all(series.index == expected.index)
+    assert_allclose(series.values, expected.values, equal_nan=True)
+
+    ts = pd.Timestamp('2011-01-01 00:00:00+0000', tz='UTC')
+    assert_allclose(series[ts], -2.0)
+    ts = pd.Timestamp('2011-01-01 01:00:00+0000', tz='UTC')
+    assert_allclose(series[ts], 3.5)
+
+
+def test_parse_isd_data_empty():
+    series = parse_isd_data(b'', 2011)
+    assert series.shape == (17544,)
+    assert series.isnull().all()
+
+
+def _reference_gsod_series(lines, year):
+    dates = pd.date_range("{}-01-01 00:00".format(year),
+                          "{}-12-31 00:00".format(year),
+                          freq='D', tz=pytz.UTC)
+    series = pd.Series(None, index=dates, dtype=float)
+    for line in lines[1:]:
+        columns = line.split()
+        date_str = columns[2].decode('utf-8')
+        temp_F = float(columns[3])
+        temp_C = (5. / 9.) * (temp_F - 32.)
+        dt = pytz.UTC.localize(datetime.strptime(date_str, "%Y%m%d"))
+        series[dt] = temp_C
+    return series
+
+
+def test_parse_gsod_data_parity():
+    lines = [
+        b'STN--- WBAN   YEARMODA    TEMP       DEWP      SLP        STP\n',
+        b'724464 99999  20110101    19.5 24    11.2 24  1024.1 24  9999.9  0\n',
+        b'724464 99999  20110102    25.1 24    14.7 24  1020.3 24  9999.9  0\n',
+        b'724464 99999  20110704    80.0 24    60.1 24  1013.3 24  9999.9  0\n',
+        b'724464 99999  20111231    30.2 24    21.0 24  1019.8 24  9999.9  0\n',
+    ]
+    data = b''.join(lines)
+
+    series = parse_gsod_data(data, '2011')
+    expected = _reference_gsod_series(lines, '2011')
+
+    assert series.shape == (365,)
+    assert all(series.index == expected.index)
+    assert_allclose(series.values, expected.values, equal_nan=True)
+
+    ts = pd.Timestamp('2011-01-01 00:00:00+0000', tz='UTC')
+    assert_allclose(series[ts], -6.9444444444444446)
+
+
+def _tmy3_text(utc_offset):
+    header = '724838,"SACRAMENTO",CA,{},38.5,-121.5,12'.format(utc_offset)
+    columns = ','.join('col{}'.format(i) for i in range(68))
+    lines = [header, columns]
+    index = pd.date_range('1900-01-01 01:00', periods=8760, freq='H')
+    for i, dt in enumerate(index):
+        row = ['0'] * 68
+        if dt.hour == 0:
+            # hour 24:00 belongs to the previous day
+            day = dt - timedelta(days=1)
+            row[0] = '{:02d}/{:02d}/1988'.format(day.month, day.day)
+            row[1] = '24:00'
+        else:
+            row[0] = '{:02d}/{:02d}/1988'.format(dt.month, dt.day)
+            row[1] = '{:02d}:00'.format(dt.hour)
+        row[31] = '{:.1f}'.format(np.sin(i / 100.) * 20)
+        lines.append(','.join(row))
+    return '\r\n'.join(lines)
+
+
+def _reference_tmy3_series(text):
+    index = pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
+                          freq='H', tz=pytz.UTC)
+    series = pd.Series(None, index=index, dtype=float)
+    lines = text.splitlines()
+    utc_offset_str = lines[0].split(',')[3]
+    utc_offset = timedelta(seconds=3600 * float(utc_offset_str))
+    for line in lines[2:]:
+        row = line.split(",")
+        month = row[0][0:2]
+        day = row[0][3:5]
+        hour = int(row[1][0:2]) - 1
+        date_string = "1900{}{}{:02d}".format(month, day, hour)
+        dt = datetime.strptime(date_string, "%Y%m%d%H") - utc_offset
+        dt = pytz.UTC.localize(dt.replace(year=1900))
+        series[dt] = float(row[31])
+    return series
+
+
+def test_parse_tmy3_data_parity():
+    for utc_offset in ['-8.0', '-5.0', '0.0', '3.0']:
+        text = _tmy3_text(utc_offset)
+        series = parse_tmy3_data(text)
+        expected = _reference_tmy3_series(text)
+
+        assert series.shape == (8760,)
+        assert all(series.index == expected.index)
+        assert_allclose(series.values, expected.values)
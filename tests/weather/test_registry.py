@@ -0,0 +1,160 @@
+from datetime import timedelta
+import tempfile
+import threading
+
+import pandas as pd
+import pytest
+
+from eemeter.weather import GSODWeatherSource, ISDWeatherSource
+from eemeter.weather.registry import WeatherSourceRegistry
+from eemeter.testing import MockWeatherClient
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+
+def test_hits_and_misses(tmp_url):
+    registry = WeatherSourceRegistry()
+
+    ws1 = registry.get(ISDWeatherSource, "722880", tmp_url)
+    ws2 = registry.get(ISDWeatherSource, "722880", tmp_url)
+    ws3 = registry.get(GSODWeatherSource, "722880", tmp_url)
+
+    assert ws1 is ws2
+    assert ws1 is not ws3
+    assert isinstance(ws3, GSODWeatherSource)
+
+    stats = registry.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 0
+    assert stats["n_sources"] == 2
+
+    registry.clear()
+    assert registry.stats()["n_sources"] == 0
+    assert registry.get(ISDWeatherSource, "722880", tmp_url) is not ws1
+
+
+def test_bad_station(tmp_url):
+    registry = WeatherSourceRegistry()
+    with pytest.raises(ValueError):
+        registry.get(ISDWeatherSource, "INVALID", tmp_url)
+    assert registry.stats()["n_sources"] == 0
+
+
+def test_lru_eviction(tmp_url):
+    registry = WeatherSourceRegistry(max_bytes=100000)
+
+    ws1 = registry.get(ISDWeatherSource, "722880", tmp_url)
+    ws1.client = MockWeatherClient()
+    ws1.add_year(2011)
+
+    ws2 = registry.get(ISDWeatherSource, "724838", tmp_url)
+    ws2.client = MockWeatherClient()
+    ws2.add_year(2011)
+
+    # getting another source pushes the registry over its cap; the least
+    # recently used source is evicted.
+    registry.get(ISDWeatherSource, "724838", tmp_url)
+    assert registry.stats()["evictions"] == 1
+    assert registry.stats()["n_sources"] == 1
+    assert registry.get(ISDWeatherSource, "724838", tmp_url) is ws2
+    assert registry.get(ISDWeatherSource, "722880", tmp_url) is not ws1
+
+
+def test_key_includes_environment(tmp_url, monkeypatch):
+    registry = WeatherSourceRegistry()
+    ws1 = registry.get(ISDWeatherSource, "722880", tmp_url)
+
+    monkeypatch.setenv("EEMETER_WEATHER_CACHE_BACKEND", "json")
+    ws2 = registry.get(ISDWeatherSource, "722880", tmp_url)
+    assert ws2 is not ws1
+    assert registry.get(ISDWeatherSource, "722880", tmp_url,
+                        cache_backend="json") is ws2
+
+    monkeypatch.setenv("EEMETER_WEATHER_REFRESH", "offline")
+    ws3 = registry.get(ISDWeatherSource, "722880", tmp_url)
+    assert ws3 is not ws2
+    assert ws3.refresh == "offline"
+
+
+def test_sources_created_outside_registry_lock(tmp_url, monkeypatch):
+    registry = WeatherSourceRegistry()
+    started = threading.Event()
+    release = threading.Event()
+    n_created = []
+
+    class SlowISDWeatherSource(ISDWeatherSource):
+        def __init__(self, *args, **kwargs):
+            n_created.append(1)
+            started.set()
+            release.wait(5)
+            super(SlowISDWeatherSource, self).__init__(*args, **kwargs)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            registry.get(SlowISDWeatherSource, "722880", tmp_url)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+
+    # other sources are handed out while one is being created.
+    ws = registry.get(ISDWeatherSource, "724838", tmp_url)
+    assert isinstance(ws, ISDWeatherSource)
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(n_created) == 1
+    assert len(results) == 3
+    assert results[0] is results[1] is results[2]
+    assert registry._key_locks == {}
+
+
+def test_creation_locks_released(tmp_url):
+    registry = WeatherSourceRegistry()
+    for station in ["722880", "724838", "725300"]:
+        registry.get(ISDWeatherSource, station, tmp_url)
+    with pytest.raises(ValueError):
+        registry.get(ISDWeatherSource, "INVALID", tmp_url)
+    assert registry._key_locks == {}
+
+
+def test_recheck_for_recent_data(tmp_url):
+    registry = WeatherSourceRegistry(recheck_interval=timedelta(0))
+    ws = registry.get(ISDWeatherSource, "722880", tmp_url)
+
+    checks = []
+    ws._check_for_recent_data = lambda: checks.append(1)
+    assert registry.get(ISDWeatherSource, "722880", tmp_url) is ws
+    assert len(checks) == 1
+
+    registry.recheck_interval = timedelta(hours=1)
+    registry.get(ISDWeatherSource, "722880", tmp_url)
+    assert len(checks) == 1
+
+
+def test_concurrent_loads(tmp_url):
+    ws = ISDWeatherSource("722880", tmp_url)
+    ws.client = MockWeatherClient()
+    index = pd.date_range('2011-01-01', periods=365 * 2, freq='D', tz='UTC')
+    errors = []
+
+    def _load():
+        try:
+            temps = ws.indexed_temperatures(index, 'degF')
+            assert temps.notnull().all()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
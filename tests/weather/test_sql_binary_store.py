@@ -0,0 +1,291 @@
+from datetime import datetime, timedelta
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+import pytz
+from sqlalchemy.sql import select
+
+from eemeter.weather.cache import (
+    SqlBinaryStore,
+    SqlJSONStore,
+    get_weather_cache_store,
+)
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+
+@pytest.fixture
+def hourly_series():
+    index = pd.date_range('2011-01-01', periods=48, freq='H', tz=pytz.UTC)
+    values = np.arange(48, dtype=float) / 10.
+    values[5] = np.nan
+    return pd.Series(values, index=index)
+
+
+def test_basic_usage(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    assert str(s) == 'SqlBinaryStore("{}")'.format(tmp_url)
+    assert s.key_exists("a") is False
+    assert s.retrieve_series("a", "H", "%Y%m%d%H") is None
+    assert s.retrieve_datetime("a") is None
+
+    s.save_series("a", hourly_series, "H", "%Y%m%d%H")
+    assert s.key_exists("a") is True
+    assert s.retrieve_datetime("a") is not None
+
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert all(series.index == hourly_series.index)
+    assert_allclose(series.values, hourly_series.values, equal_nan=True)
+
+    # update
+    s.save_series("a", hourly_series * 2, "H", "%Y%m%d%H")
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert_allclose(series.values, hourly_series.values * 2, equal_nan=True)
+
+    s.clear("a")
+    assert s.key_exists("a") is False
+
+
+@pytest.mark.parametrize('dtype,compress', [
+    ('float64', False),
+    ('float32', True),
+])
+def test_storage_options(tmp_url, hourly_series, dtype, compress):
+    s = SqlBinaryStore(tmp_url, dtype=dtype, compress=compress)
+    s.save_series("a", hourly_series, "H", "%Y%m%d%H")
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert_allclose(series.values, hourly_series.values, rtol=1e-6,
+                    equal_nan=True)
+
+
+def test_empty_series(tmp_url):
+    s = SqlBinaryStore(tmp_url)
+    s.save_series("a", pd.Series([], dtype=float), "H", "%Y%m%d%H")
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert series.shape == (0,)
+
+
+def test_migrate_json_series(tmp_url, hourly_series):
+    json_store = SqlJSONStore(tmp_url)
+    json_store.save_series("a", hourly_series, "H", "%Y%m%d%H")
+
+    s = SqlBinaryStore(tmp_url)
+    assert s.key_exists("a") is True
+    assert s.retrieve_datetime("a") is not None
+
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert_allclose(series.values, hourly_series.values, equal_nan=True)
+
+    # migrated row is served from binary storage from now on.
+    assert json_store.key_exists("a") is False
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert_allclose(series.values, hourly_series.values, equal_nan=True)
+
+
+def test_migrate_json_series_keeps_fetch_time(tmp_url, hourly_series):
+    json_store = SqlJSONStore(tmp_url)
+    json_store.save_series("a", hourly_series, "H", "%Y%m%d%H")
+    fetched = datetime(2011, 1, 1)
+    json_store.engine.execute(json_store.items.update().where(
+        json_store.items.c.key == "a").values(dt=fetched))
+
+    s = SqlBinaryStore(tmp_url)
+    s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert json_store.key_exists("a") is False
+    assert s.retrieve_datetime("a") == fetched
+
+
+def test_get_weather_cache_store(tmp_url, monkeypatch):
+    assert isinstance(get_weather_cache_store(tmp_url), SqlBinaryStore)
+
+    store = get_weather_cache_store(tmp_url, 'json')
+    assert type(store) is SqlJSONStore
+
+    monkeypatch.setenv('EEMETER_WEATHER_CACHE_BACKEND', 'json')
+    assert type(get_weather_cache_store(tmp_url)) is SqlJSONStore
+
+    with pytest.raises(ValueError):
+        get_weather_cache_store(tmp_url, 'BAD')
+
+
+def test_trailing_nulls_not_stored(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    hourly_series[40:] = np.nan
+    s.save_series("a", hourly_series, "H", "%Y%m%d%H")
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert series.shape == (40,)
+    assert_allclose(series.values, hourly_series.values[:40], equal_nan=True)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_append_series(tmp_url, hourly_series, compress):
+    s = SqlBinaryStore(tmp_url, compress=compress)
+    s.save_series("a", hourly_series[:30], "H", "%Y%m%d%H")
+    s.append_series("a", hourly_series[30:40], "H", "%Y%m%d%H")
+    s.append_series("a", hourly_series[40:], "H", "%Y%m%d%H")
+
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert all(series.index == hourly_series.index)
+    assert_allclose(series.values, hourly_series.values, equal_nan=True)
+
+    # appended in place
+    row = select([s.series.c.length]).where(s.series.c.key == "a") \
+        .execute().fetchone()
+    assert row[0] == 48
+
+
+def test_append_series_overlapping(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    s.save_series("a", hourly_series[:30], "H", "%Y%m%d%H")
+    s.append_series("a", hourly_series[20:] * 2, "H", "%Y%m%d%H")
+
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    expected = np.concatenate([hourly_series.values[:20],
+                               hourly_series.values[20:] * 2])
+    assert_allclose(series.values, expected, equal_nan=True)
+
+
+def test_append_empty_series_touches(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    s.save_series("a", hourly_series, "H", "%Y%m%d%H")
+    s.series.update().values(dt=datetime(2000, 1, 1)).execute()
+    s.append_series("a", hourly_series[:0], "H", "%Y%m%d%H")
+    assert s.retrieve_datetime("a") > datetime(2000, 1, 1)
+    series = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert_allclose(series.values, hourly_series.values, equal_nan=True)
+
+
+@pytest.mark.parametrize('store_class', [SqlBinaryStore, SqlJSONStore])
+def test_save_series_many(tmp_url, hourly_series, store_class):
+    s = store_class(tmp_url)
+    s.save_series("a", hourly_series * 0, "H", "%Y%m%d%H")
+    s.save_series_many([
+        ("a", hourly_series),
+        ("b", hourly_series + 1),
+    ], "H", "%Y%m%d%H")
+
+    assert s.existing_keys(["a", "b", "c"]) == {"a", "b"}
+    assert s.retrieve_datetime("b") is not None
+    assert_allclose(s.retrieve_series("a", "H", "%Y%m%d%H").values,
+                    hourly_series.values)
+    assert_allclose(s.retrieve_series("b", "H", "%Y%m%d%H").values,
+                    hourly_series.values + 1)
+
+
+def test_save_json_many(tmp_url):
+    s = SqlJSONStore(tmp_url)
+    s.save_json("a", [0])
+    s.save_json_many([("a", [1]), ("b", {"c": 2})])
+    assert s.retrieve_json_many(["a", "b", "c"]) == {"a": [1], "b": {"c": 2}}
+
+
+def _set_accessed(store, key, accessed):
+    for table in store.tables:
+        store.engine.execute(
+            table.update().where(table.c.key == key)
+            .values(accessed=accessed))
+
+
+def test_record_access(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    s.save_series("a", hourly_series, "H", "%Y%m%d%H")
+    _set_accessed(s, "a", datetime(2000, 1, 1))
+
+    s.retrieve_series("a", "H", "%Y%m%d%H")
+    accessed = s.engine.execute(
+        select([s.series.c.accessed]).where(s.series.c.key == "a")).scalar()
+    assert accessed > datetime(2000, 1, 1)
+
+
+def test_evict(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    s.save_series("ISD-722880-2011.json", hourly_series, "H", "%Y%m%d%H")
+    s.save_series("ISD-722880-2011-daily.json", hourly_series, "D",
+                  "%Y%m%d")
+    s.save_json("import-ISD-722880-2011.json", {"size": 1})
+    s.save_series("ISD-722880-2012.json", hourly_series, "H", "%Y%m%d%H")
+    s.save_series("TMY3-724838.json", hourly_series, "H", "%Y%m%d%H")
+
+    for key in ["ISD-722880-2011.json", "ISD-722880-2011-daily.json",
+                "import-ISD-722880-2011.json", "TMY3-724838.json"]:
+        _set_accessed(s, key, datetime(2000, 1, 1))
+
+    assert s.evict() == {"evicted": [], "bytes_freed": 0}
+
+    size = s.size()
+    report = s.evict(max_size=size - 1)
+    assert sorted(report["evicted"]) == [
+        "ISD-722880-2011-daily.json",
+        "ISD-722880-2011.json",
+        "import-ISD-722880-2011.json",
+    ]
+    assert s.size() == size - report["bytes_freed"]
+    assert s.key_exists("ISD-722880-2012.json")
+    assert s.key_exists("TMY3-724838.json")
+
+    # normals are never evicted.
+    report = s.evict(max_size=0)
+    assert report["evicted"] == ["ISD-722880-2012.json"]
+    assert s.key_exists("TMY3-724838.json")
+
+
+def test_evict_max_age(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url)
+    s.save_series("ISD-722880-2011.json", hourly_series, "H", "%Y%m%d%H")
+    s.save_series("ISD-722880-2012.json", hourly_series, "H", "%Y%m%d%H")
+    _set_accessed(s, "ISD-722880-2011.json", datetime(2000, 1, 1))
+
+    report = s.evict(max_age=timedelta(days=30))
+    assert report["evicted"] == ["ISD-722880-2011.json"]
+    assert s.key_exists("ISD-722880-2012.json")
+
+
+def test_evict_automatically(tmp_url, hourly_series, monkeypatch):
+    monkeypatch.setenv("EEMETER_WEATHER_CACHE_MAX_SIZE_MB", "0")
+    s = SqlBinaryStore(tmp_url)
+    assert s.max_size == 0
+    s.eviction_interval = 2
+    s.save_series("ISD-722880-2011.json", hourly_series, "H", "%Y%m%d%H")
+    assert s.key_exists("ISD-722880-2011.json")
+    s.save_series("TMY3-724838.json", hourly_series, "H", "%Y%m%d%H")
+    assert not s.key_exists("ISD-722880-2011.json")
+    assert s.key_exists("TMY3-724838.json")
+
+
+def test_add_missing_columns(tmp_url):
+    engine = SqlJSONStore(tmp_url).engine
+    engine.execute("DROP TABLE items")
+    engine.execute(
+        "CREATE TABLE items (id INTEGER PRIMARY KEY, data VARCHAR,"
+        " key VARCHAR UNIQUE, dt DATETIME)")
+    engine.execute(
+        "INSERT INTO items (data, key, dt) VALUES"
+        " ('1', 'a', '2011-01-01 00:00:00')")
+
+    s = SqlJSONStore(tmp_url)
+    assert "accessed" in s.items.c
+    # falls back to the fetch time for rows without an access time.
+    assert s.evict(max_age=timedelta(days=1))["evicted"] == ["a"]
+    s.save_json("b", 2)
+    assert s.retrieve_json("b") == 2
+
+
+def test_compact(tmp_url, hourly_series):
+    s = SqlBinaryStore(tmp_url, compress=False)
+    for year in range(2000, 2010):
+        s.save_series("ISD-722880-{}.json".format(year),
+                      pd.Series(np.random.randn(8760), index=pd.date_range(
+                          '{}-01-01'.format(year), periods=8760, freq='H',
+                          tz=pytz.UTC)),
+                      "H", "%Y%m%d%H")
+
+    report = s.compact(max_size=0)
+    assert len(report["evicted"]) == 10
+    assert report["bytes_freed"] == 10 * 8760 * 8
+    assert report["size_after"] < report["size_before"]
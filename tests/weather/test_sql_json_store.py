@@ -1,6 +1,9 @@
 import tempfile
 from eemeter.weather.cache import SqlJSONStore
 from datetime import datetime
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
 import pytz
 
 
@@ -44,3 +47,17 @@ def test_basic_usage():
     s.clear("b")
     assert s.key_exists("a") is True
     assert s.key_exists("b") is False
+
+
+def test_append_series():
+    tmpdir = tempfile.mkdtemp()
+    url = "sqlite:///{}/weather_cache.db".format(tmpdir)
+    s = SqlJSONStore(url)
+
+    index = pd.date_range('2011-01-01', periods=48, freq='H', tz=pytz.UTC)
+    series = pd.Series(np.arange(48, dtype=float), index=index)
+    s.save_series("a", series[:30], "H", "%Y%m%d%H")
+    s.append_series("a", series[30:], "H", "%Y%m%d%H")
+
+    retrieved = s.retrieve_series("a", "H", "%Y%m%d%H")
+    assert_allclose(retrieved.values, series.values)
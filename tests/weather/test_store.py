@@ -0,0 +1,86 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+import pytz
+
+from eemeter.weather.store import TemperatureStore
+
+
+def _hourly_year(year, offset=0.):
+    index = pd.date_range('{}-01-01'.format(year), '{}-12-31 23:00'
+                          .format(year), freq='H', tz=pytz.UTC)
+    values = offset + np.sin(np.arange(index.shape[0]) / 50.) * 10
+    values[::7] = np.nan
+    return pd.Series(values, index=index)
+
+
+def _merged(series_list, freq):
+    # merge strategy used before temperatures were stored in arrays.
+    merged = pd.Series(dtype=float)
+    for series in series_list:
+        merged = pd.concat([merged, series]).sort_index().resample(freq) \
+            .mean()
+    return merged
+
+
+def test_bad_freq():
+    with pytest.raises(ValueError):
+        TemperatureStore('5T')
+
+
+def test_empty():
+    store = TemperatureStore('H')
+    assert store.empty
+    assert store.to_series().empty
+    index = pd.date_range('2011-01-01', periods=2, freq='D', tz=pytz.UTC)
+    assert np.isnan(store.values_at(index)).all()
+    assert np.isnan(store.values_at(index, 'D')).all()
+
+
+def test_write_out_of_order_years():
+    years = [2012, 2010, 2015, 2011]
+    series_list = [_hourly_year(year, year - 2010) for year in years]
+    store = TemperatureStore('H')
+    for series in series_list:
+        store.write(series)
+
+    expected = _merged(series_list, 'H')
+    series = store.to_series()
+    assert all(series.index == expected.index)
+    assert_allclose(series.values, expected.values, equal_nan=True)
+
+    hourly_index = pd.date_range('2011-12-31', '2012-01-02', freq='H',
+                                 tz=pytz.UTC)
+    assert_allclose(store.values_at(hourly_index),
+                    expected[hourly_index].values, equal_nan=True)
+
+    daily_index = pd.date_range('2009-12-30', '2016-01-03', freq='D',
+                                tz=pytz.UTC)
+    expected_daily = expected.resample('D').mean().reindex(daily_index)
+    assert_allclose(store.values_at(daily_index, 'D'),
+                    expected_daily.values, equal_nan=True)
+
+
+def test_overwrite_keeps_existing_values():
+    store = TemperatureStore('D')
+    index = pd.date_range('2011-01-01', periods=4, freq='D', tz=pytz.UTC)
+    store.write(pd.Series([1., 2., 3., 4.], index=index))
+    store.write(pd.Series([10., np.nan, 30., np.nan], index=index))
+    assert_allclose(store.values_at(index), [10., 2., 30., 4.])
+
+
+def test_aggregates_cached_until_write():
+    store = TemperatureStore('H')
+    store.write(_hourly_year(2011))
+
+    daily_degF = store.aggregate('D', 'degF')
+    assert store.aggregate('D', 'degF') is daily_degF
+    assert_allclose(daily_degF, store.aggregate('D', 'degC') * 1.8 + 32)
+
+    with pytest.raises(ValueError):
+        store.aggregate('D', 'BAD')
+
+    store.write(_hourly_year(2012))
+    assert store.aggregate('D', 'degF') is not daily_degF
+    assert store.aggregate('D', 'degF').shape == (731,)
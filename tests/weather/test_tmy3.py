@@ -66,3 +66,36 @@ def test_real_load():
     ws = TMY3WeatherSource("725090")
     assert ws.tempC.shape == (8760,)
     assert ws.tempC.notnull().sum() == 8760
+
+
+def test_aggregates_cached_until_reload(mock_tmy3_weather_source):
+    ws = mock_tmy3_weather_source
+    index = pd.date_range('2000-01-01 00:00:00Z', periods=2, freq='H')
+    ws.indexed_temperatures(index, 'degF')
+    hourly_degF = ws._aggregate('H', 'degF')
+    assert ws._aggregate('H', 'degF') is hourly_degF
+
+    ws._load_data()
+    assert ws._aggregate('H', 'degF') is not hourly_degF
+
+
+def test_hourly_normal_year_mapping(mock_tmy3_weather_source):
+    ws = mock_tmy3_weather_source
+    index = pd.date_range('2001-01-01 00:00:00Z', periods=8760 * 2, freq='H')
+    temps = ws.indexed_temperatures(index, 'degC')
+    assert_allclose(temps.values[:8760], ws.tempC.values)
+    assert_allclose(temps.values[8760:], ws.tempC.values)
+
+
+def test_daily_non_utc_index(mock_tmy3_weather_source):
+    index = pd.date_range('2001-01-01', periods=2, freq='D',
+                          tz='US/Pacific')
+    temps = mock_tmy3_weather_source.indexed_temperatures(index, 'degF')
+    assert all(temps.index == index)
+    assert_allclose(temps.values, [35.507046, 35.281477])
+
+
+def test_leap_day_not_supported(mock_tmy3_weather_source):
+    index = pd.date_range('2000-02-29 00:00:00Z', periods=2, freq='H')
+    with pytest.raises(ValueError):
+        mock_tmy3_weather_source.indexed_temperatures(index, 'degF')
@@ -0,0 +1,164 @@
+import gzip
+import os
+import tempfile
+
+import pandas as pd
+import pytest
+
+from eemeter.weather import ISDWeatherSource, TMY3WeatherSource
+from eemeter.weather.clients import NOAAClient, TMY3Client
+from eemeter.weather.warm import (
+    plan_weather_cache_warmup,
+    warm_weather_cache,
+)
+from eemeter.testing import MockWeatherClient
+
+
+class MockNOAAClient(MockWeatherClient):
+
+    def __init__(self):
+        self.bytes_transferred = 0
+        self.station_index = NOAAClient()._load_station_index()
+
+    def _load_station_index(self):
+        return self.station_index
+
+    def get_isd_data(self, station, year):
+        if year == 1900:
+            raise RuntimeError("No data.")
+        self.bytes_transferred += 1000
+        return super(MockNOAAClient, self).get_isd_data(station, year)
+
+
+class MockTMY3Client(MockWeatherClient):
+
+    def __init__(self):
+        self.bytes_transferred = 0
+        self.station_index = TMY3Client()._load_station_index()
+
+    def _load_station_index(self):
+        return self.station_index
+
+
+class UnusedClient(object):
+
+    def __getattr__(self, name):
+        raise AssertionError("Class-level client used.")
+
+
+@pytest.fixture
+def mock_clients(monkeypatch):
+    monkeypatch.setattr(ISDWeatherSource, 'client', MockNOAAClient())
+    monkeypatch.setattr(TMY3WeatherSource, 'client', MockTMY3Client())
+
+
+@pytest.fixture
+def tmp_url():
+    return "sqlite:///{}/weather_cache.db".format(tempfile.mkdtemp())
+
+
+def test_plan_weather_cache_warmup():
+    isd_station_years, normal_stations, unresolved = \
+        plan_weather_cache_warmup([
+            ("60640", 2014, 2015),
+            ("997338", 2015, 2016),
+            ("725300", 2012, 2012),
+            ("00000", 2015, 2015),
+        ])
+    assert isd_station_years == {
+        "997338": [2014, 2015, 2016],
+        "725300": [2012],
+    }
+    assert normal_stations == ["725340", "725300"]
+    assert unresolved == ["00000"]
+
+    _, normal_stations, _ = plan_weather_cache_warmup(
+        [("60640", 2014, 2015)], normals=False)
+    assert normal_stations == []
+
+
+def test_warm_weather_cache(mock_clients, tmp_url):
+    progress = []
+
+    def _progress(item, n_done, n_total, error):
+        progress.append((item, n_done, n_total, error is None))
+
+    report = warm_weather_cache({"722880": [2014, 2015]}, ["725300"],
+                                cache_url=tmp_url, max_workers=2,
+                                progress=_progress)
+    assert sorted(report["fetched"]) == [
+        ("ISD", "722880", 2014),
+        ("ISD", "722880", 2015),
+        ("TMY3", "725300"),
+    ]
+    assert report["cached"] == []
+    assert report["failures"] == {}
+    assert report["bytes_transferred"] == 2000
+    assert [p[1:] for p in progress] == \
+        [(1, 3, True), (2, 3, True), (3, 3, True)]
+
+    ws = ISDWeatherSource("722880", tmp_url)
+    assert ws._year_saved(2014) and ws._year_saved(2015)
+    ws = TMY3WeatherSource("725300", tmp_url, preload=False)
+    assert ws.cache_store.key_exists(ws._get_cache_key())
+
+    report = warm_weather_cache({"722880": [2015, 2016]}, ["725300"],
+                                cache_url=tmp_url)
+    assert report["fetched"] == [("ISD", "722880", 2016)]
+    assert sorted(report["cached"]) == [
+        ("ISD", "722880", 2015),
+        ("TMY3", "725300"),
+    ]
+
+
+def test_warm_weather_cache_failures(mock_clients, tmp_url):
+    report = warm_weather_cache({"INVALID": [2015], "722880": [1900]}, [],
+                                cache_url=tmp_url)
+    assert report["fetched"] == []
+    assert list(report["failures"]) == [
+        ("ISD", "INVALID"),
+        ("ISD", "722880", 1900),
+    ]
+
+
+def _isd_line(date_str, temp_str):
+    line = bytearray(b'0' * 105)
+    line[15:27] = date_str.encode('utf-8')
+    line[87:92] = temp_str.encode('utf-8')
+    return bytes(line) + b'ADDAA101000091\n'
+
+
+def _tmy3_text():
+    lines = ['722880,"BURBANK",CA,-8.0,34.2,-118.35,236',
+             ','.join('col{}'.format(i) for i in range(68))]
+    for dt in pd.date_range('1900-01-01 01:00', periods=8760, freq='H'):
+        row = ['0'] * 68
+        row[0] = '{:02d}/{:02d}/1988'.format(dt.month, dt.day)
+        row[1] = '{:02d}:00'.format(dt.hour or 24)
+        row[31] = '10.0'
+        lines.append(','.join(row))
+    return '\r\n'.join(lines)
+
+
+def test_warm_weather_cache_mirror(tmp_url, monkeypatch):
+    directory = tempfile.mkdtemp()
+    os.makedirs(os.path.join(directory, 'noaa', '2011'))
+    path = os.path.join(directory, 'noaa', '2011', '722880-23152-2011.gz')
+    with gzip.open(path, 'wb') as f:
+        f.write(_isd_line('201101010000', '-0020'))
+    os.makedirs(os.path.join(directory, 'tmy3'))
+    with open(os.path.join(directory, 'tmy3', '722880TYA.CSV'), 'w') as f:
+        f.write(_tmy3_text())
+
+    monkeypatch.setattr(ISDWeatherSource, 'client', UnusedClient())
+    monkeypatch.setattr(TMY3WeatherSource, 'client', UnusedClient())
+
+    report = warm_weather_cache({"722880": [2011]}, ["722880"],
+                                cache_url=tmp_url,
+                                mirror_directory=directory)
+    assert sorted(report["fetched"]) == [
+        ("ISD", "722880", 2011),
+        ("TMY3", "722880"),
+    ]
+    assert report["failures"] == {}
+    assert report["bytes_transferred"] > 0